@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
+import hashlib
+import json
 import os
 import re
 import sys
+import time
 
 
 RED = '\033[0;31m'
@@ -34,9 +37,44 @@ def get_project_name():
         print(f"Please run this command from the root of a Flutter project.")
         exit(1)
 
+SERVICE_LOCATOR_PATH = "lib/core/di/service_locator.dart"
+# Everything update_service_locator needs from service_locator.dart, matched in one scan
+SERVICE_LOCATOR_TOKENS = re.compile(
+    r"^import\s+(?P<quote>['\"])(?P<import>.+?)(?P=quote)[^;]*;"
+    r"|^[ \t]*(?P<anchor>//Feature DI setup)[ \t]*\n"
+    r"|^[ \t]*await\s+(?P<setup>\w+)\.setup\(_serviceLocator\);[ \t]*\n",
+    re.MULTILINE,
+)
+
+# Valid feature names: snake_case Dart identifiers
+PAGE_NAME_PATTERN = re.compile(r'^[a-z][a-z0-9_]*$')
+
+FEATURE_DIRECTORIES = [
+    "data/datasource",
+    "data/models",
+    "data/repositories",
+    "domain/datasource",
+    "domain/repositories",
+    "domain/entities",
+    "domain/usecase",
+    "presentation/presenter",
+    "presentation/ui",
+    "presentation/widgets",
+    "di",
+]
+
 def update_service_locator(project_name, class_prefix, page_name):
     """Update service_locator.dart with the new feature DI"""
-    service_locator_path = "lib/core/di/service_locator.dart"
+    update_service_locator_batch(project_name, [(class_prefix, page_name)])
+
+def update_service_locator_batch(project_name, features):
+    """
+    Update service_locator.dart with the DI of several features in one write
+    Parameters:
+        project_name: Package name from pubspec.yaml
+        features: List of (class_prefix, page_name) tuples
+    """
+    service_locator_path = SERVICE_LOCATOR_PATH
     
     if not os.path.isfile(service_locator_path):
         print(f"{YELLOW}Warning: Could not find service_locator.dart at {service_locator_path}.{NC}")
@@ -46,200 +84,391 @@ def update_service_locator(project_name, class_prefix, page_name):
     with open(service_locator_path, 'r') as file:
         content = file.read()
     
-    # Add import statement
-    import_statement = f"import 'package:{project_name}/features/{page_name}/di/{page_name}_di.dart';"
-    if import_statement not in content:
-        # Find the last import statement and add after it
-        import_matches = re.findall(r'import [^;]+;', content)
-        if import_matches:
-            last_import = import_matches[-1]
-            content = content.replace(last_import, f"{last_import}\n{import_statement}")
+    index = index_service_locator(content)
+    if index["import_end"] is None or index["di_anchor"] is None:
+        print(f"{YELLOW}Warning: Could not find the import block or setUp calls in {service_locator_path}.{NC}")
+        print("Feature DI registration in service locator skipped.")
+        return
     
-    # Add DI setup call in setUp method
-    di_call = f"    await {class_prefix}Di.setup(_serviceLocator);"
+    edits, added, skipped = plan_feature_di(index, project_name, features)
+    if edits:
+        # Write to a temp file and rename so the locator is never left half written
+        temp_path = f"{service_locator_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as file:
+            file.write(splice_edits(content, edits))
+        os.replace(temp_path, service_locator_path)
     
-    # Find the feature DI setup comment and add after it
-    feature_comment_pattern = r'//Feature DI setup'
-    if feature_comment_pattern in content:
-        content = re.sub(
-            r'(//Feature DI setup\s*\n)',
-            f'\\1{di_call}\n',
-            content
-        )
-    else:
-        # If comment doesn't exist, add before the closing brace of setUp method
-        setup_pattern = r'(\s+await\s+\w+\.setup\(_serviceLocator\);\s*\n)(\s*})'
-        match = re.search(setup_pattern, content)
-        if match:
-            content = re.sub(
-                setup_pattern,
-                f'\\1\n    //Feature DI setup\n{di_call}\n\\2',
-                content
-            )
-    
-    with open(service_locator_path, 'w') as file:
-        file.write(content)
+    for class_prefix, di_call in added:
+        print(f"{GREEN}✓ Updated service_locator.dart with {class_prefix}Di registration.{NC}")
+        print(f"{BLUE}  Added: {NC}{di_call}")
+    for class_prefix in skipped:
+        print(f"{YELLOW}{class_prefix}Di is already registered in service_locator.dart.{NC}")
+
+def index_service_locator(content):
+    """
+    Build a structural index of service_locator.dart in a single scan
+    Returns:
+        Dict with:
+            imports: Set of imported URIs
+            import_end: Offset just after the last import statement (None if there are none)
+            di_anchor: Offset where new DI setup calls go (None if setUp has no calls)
+            needs_anchor: True when the '//Feature DI setup' comment is missing
+            registered: Set of class names with an 'await <Name>.setup(_serviceLocator);' call
+    """
+    index = {
+        "imports": set(),
+        "import_end": None,
+        "di_anchor": None,
+        "needs_anchor": True,
+        "registered": set(),
+    }
+    last_setup_end = None
+    for match in SERVICE_LOCATOR_TOKENS.finditer(content):
+        if match.group("import"):
+            index["imports"].add(match.group("import"))
+            index["import_end"] = match.end()
+        elif match.group("anchor"):
+            # New calls go directly under the last anchor
+            index["di_anchor"] = match.end()
+            index["needs_anchor"] = False
+        else:
+            index["registered"].add(match.group("setup"))
+            last_setup_end = match.end()
+    if index["needs_anchor"]:
+        index["di_anchor"] = last_setup_end
+    return index
+
+def plan_feature_di(index, project_name, features):
+    """
+    Work out the edits that register features, skipping anything already present
+    Returns:
+        (edits, added, skipped): edits is a list of (offset, text) insertions,
+        added lists (class_prefix, di_call) and skipped lists class prefixes
+    """
+    new_imports = []
+    new_calls = []
+    added = []
+    skipped = []
+    for class_prefix, page_name in features:
+        import_uri = f"package:{project_name}/features/{page_name}/di/{page_name}_di.dart"
+        if import_uri not in index["imports"]:
+            index["imports"].add(import_uri)
+            new_imports.append(f"\nimport '{import_uri}';")
+        if f"{class_prefix}Di" in index["registered"]:
+            skipped.append(class_prefix)
+            continue
+        index["registered"].add(f"{class_prefix}Di")
+        di_call = f"    await {class_prefix}Di.setup(_serviceLocator);"
+        new_calls.append(f"{di_call}\n")
+        added.append((class_prefix, di_call))
     
-    print(f"{GREEN}✓ Updated service_locator.dart with {class_prefix}Di registration.{NC}")
-    print(f"{BLUE}  Added: {NC}{di_call}")
+    edits = []
+    if new_imports:
+        edits.append((index["import_end"], ''.join(new_imports)))
+    if new_calls:
+        anchor = "\n    //Feature DI setup\n" if index["needs_anchor"] else ""
+        edits.append((index["di_anchor"], anchor + ''.join(new_calls)))
+    return edits, added, skipped
 
-def generate_page(page_name):
-    """Generate Flutter feature structure and files"""
-    if not page_name:
-        print(f"{RED}Error: Page name is required.{NC}")
-        print(f"Usage: {sys.argv[0]} page <page_name>")
+def splice_edits(content, edits):
+    """Apply (offset, text) insertions to content in one pass"""
+    parts = []
+    position = 0
+    for offset, text in sorted(edits, key=lambda edit: edit[0]):
+        parts.append(content[position:offset])
+        parts.append(text)
+        position = offset
+    parts.append(content[position:])
+    return ''.join(parts)
+
+def read_feature_list(path):
+    """Read feature names from a manifest: one or more per line, '#' starts a comment"""
+    try:
+        with open(path, 'r') as file:
+            lines = file.readlines()
+    except OSError as e:
+        print(f"{RED}Error: Could not read feature list {path}: {e}{NC}")
         exit(1)
-    
-    project_name = get_project_name()
-    
-    # Convert page name to lowercase
-    page_name = page_name.lower()
-    
-    # Create class prefix - convert snake_case to PascalCase
-    class_prefix = ''.join(word.capitalize() for word in page_name.split('_'))
-    
-    print(f"{YELLOW}Creating feature structure for {class_prefix} in {project_name} project...{NC}\n")
-    
-    # Create folder structure
-    base_path = f"lib/features/{page_name}"
-    os.makedirs(f"{base_path}/data/datasource", exist_ok=True)
-    os.makedirs(f"{base_path}/data/models", exist_ok=True)
-    os.makedirs(f"{base_path}/data/repositories", exist_ok=True)
-    os.makedirs(f"{base_path}/domain/datasource", exist_ok=True)
-    os.makedirs(f"{base_path}/domain/repositories", exist_ok=True)
-    os.makedirs(f"{base_path}/domain/entities", exist_ok=True)
-    os.makedirs(f"{base_path}/domain/usecase", exist_ok=True)
-    os.makedirs(f"{base_path}/presentation/presenter", exist_ok=True)
-    os.makedirs(f"{base_path}/presentation/ui", exist_ok=True)
-    os.makedirs(f"{base_path}/presentation/widgets", exist_ok=True)
-    os.makedirs(f"{base_path}/di", exist_ok=True)
-    
-    # Generate Domain Repository content
-    domain_repository_content = f'''abstract class {class_prefix}Repository {{
+    names = []
+    for line in lines:
+        line = line.split('#', 1)[0]
+        names.extend(name for name in re.split(r'[\s,]+', line) if name)
+    return names
+
+# Default template pack. Placeholders: {{project_name}}, {{page_name}}, {{class_prefix}}
+DEFAULT_TEMPLATES = {
+    "repository": '''abstract class {{class_prefix}}Repository {
   
-}}
-'''
-    
-    # Generate Data Repository Implementation content
-    data_repository_content = f'''import 'package:{project_name}/features/{page_name}/domain/repositories/{page_name}_repository.dart';
+}
+''',
+    "repository_impl": '''import 'package:{{project_name}}/features/{{page_name}}/domain/repositories/{{page_name}}_repository.dart';
 
-class {class_prefix}RepositoryImpl implements {class_prefix}Repository {{
+class {{class_prefix}}RepositoryImpl implements {{class_prefix}}Repository {
   
-}}
-'''
-    
-    # Generate DI file content
-    di_content = f'''import 'package:{project_name}/core/base/base_presenter.dart';
-import 'package:{project_name}/features/{page_name}/data/repositories/{page_name}_repository_impl.dart';
-import 'package:{project_name}/features/{page_name}/domain/repositories/{page_name}_repository.dart';
-import 'package:{project_name}/features/{page_name}/presentation/presenter/{page_name}_presenter.dart';
+}
+''',
+    "di": '''import 'package:{{project_name}}/core/base/base_presenter.dart';
+import 'package:{{project_name}}/features/{{page_name}}/data/repositories/{{page_name}}_repository_impl.dart';
+import 'package:{{project_name}}/features/{{page_name}}/domain/repositories/{{page_name}}_repository.dart';
+import 'package:{{project_name}}/features/{{page_name}}/presentation/presenter/{{page_name}}_presenter.dart';
 
 import 'package:get_it/get_it.dart';
 
-class {class_prefix}Di {{
-  static Future<void> setup(GetIt serviceLocator) async {{
+class {{class_prefix}}Di {
+  static Future<void> setup(GetIt serviceLocator) async {
     //  Data Source
 
     //  Repository
-    serviceLocator.registerLazySingleton<{class_prefix}Repository>(
-      () => {class_prefix}RepositoryImpl(),
+    serviceLocator.registerLazySingleton<{{class_prefix}}Repository>(
+      () => {{class_prefix}}RepositoryImpl(),
     );
 
     // Use Cases
 
     // Presenters
     serviceLocator.registerFactory(
-      () => loadPresenter({class_prefix}Presenter()),
+      () => loadPresenter({{class_prefix}}Presenter()),
     );
-  }}
-}}
-'''
-
-    # Generate presenter content
-    presenter_content = f'''import 'dart:async';
-import 'package:{project_name}/core/base/base_presenter.dart';
-import 'package:{project_name}/core/utility/navigation_helpers.dart';
-import 'package:{project_name}/features/{page_name}/presentation/presenter/{page_name}_ui_state.dart';
+  }
+}
+''',
+    "presenter": '''import 'dart:async';
+import 'package:{{project_name}}/core/base/base_presenter.dart';
+import 'package:{{project_name}}/core/utility/navigation_helpers.dart';
+import 'package:{{project_name}}/features/{{page_name}}/presentation/presenter/{{page_name}}_ui_state.dart';
 
-class {class_prefix}Presenter extends BasePresenter<{class_prefix}UiState> {{
-  final Obs<{class_prefix}UiState> uiState = Obs<{class_prefix}UiState>({class_prefix}UiState.empty());
-  {class_prefix}UiState get currentUiState => uiState.value;
+class {{class_prefix}}Presenter extends BasePresenter<{{class_prefix}}UiState> {
+  final Obs<{{class_prefix}}UiState> uiState = Obs<{{class_prefix}}UiState>({{class_prefix}}UiState.empty());
+  {{class_prefix}}UiState get currentUiState => uiState.value;
 
   @override
-  Future<void> addUserMessage(String message) async {{
+  Future<void> addUserMessage(String message) async {
     uiState.value = currentUiState.copyWith(userMessage: message);
     showMessage(message: currentUiState.userMessage);
-  }}
+  }
 
   @override
-  Future<void> toggleLoading({{required bool loading}}) async {{
+  Future<void> toggleLoading({required bool loading}) async {
     uiState.value = currentUiState.copyWith(isLoading: loading);
-  }}
-}}
-'''
-    
-    # Generate UI state content
-    ui_state_content = f'''import 'package:{project_name}/core/base/base_ui_state.dart';
+  }
+}
+''',
+    "ui_state": '''import 'package:{{project_name}}/core/base/base_ui_state.dart';
 
-class {class_prefix}UiState extends BaseUiState {{
-  const {class_prefix}UiState({{required super.isLoading, required super.userMessage}});
+class {{class_prefix}}UiState extends BaseUiState {
+  const {{class_prefix}}UiState({required super.isLoading, required super.userMessage});
 
-  factory {class_prefix}UiState.empty() {{
-    return {class_prefix}UiState(isLoading: false, userMessage: '');
-  }}
+  factory {{class_prefix}}UiState.empty() {
+    return {{class_prefix}}UiState(isLoading: false, userMessage: '');
+  }
 
   @override
   List<Object?> get props => [isLoading, userMessage];
 
   //Add more properties to the state
 
-  {class_prefix}UiState copyWith({{bool? isLoading, String? userMessage}}) {{
-    return {class_prefix}UiState(
+  {{class_prefix}}UiState copyWith({bool? isLoading, String? userMessage}) {
+    return {{class_prefix}}UiState(
       isLoading: isLoading ?? this.isLoading,
       userMessage: userMessage ?? this.userMessage,
     );
-  }}
-}}
-'''
-    
-    # Generate page content
-    page_content = f'''import 'package:flutter/material.dart';
+  }
+}
+''',
+    "page": '''import 'package:flutter/material.dart';
 
-class {class_prefix}Page extends StatelessWidget {{
-  const {class_prefix}Page({{super.key}});
+class {{class_prefix}}Page extends StatelessWidget {
+  const {{class_prefix}}Page({super.key});
 
   @override
-  Widget build(BuildContext context) {{
+  Widget build(BuildContext context) {
     return Scaffold(
-      appBar: AppBar(title: Text('{class_prefix}')),
-      body: Center(child: Text('{class_prefix}')),
+      appBar: AppBar(title: Text('{{class_prefix}}')),
+      body: Center(child: Text('{{class_prefix}}')),
     );
-  }}
-}}
-'''
-    
-    # Write files
-    with open(f"{base_path}/domain/repositories/{page_name}_repository.dart", 'w') as file:
-        file.write(domain_repository_content)
-    
-    with open(f"{base_path}/data/repositories/{page_name}_repository_impl.dart", 'w') as file:
-        file.write(data_repository_content)
-    
-    with open(f"{base_path}/di/{page_name}_di.dart", 'w') as file:
-        file.write(di_content)
-    
-    with open(f"{base_path}/presentation/presenter/{page_name}_presenter.dart", 'w') as file:
-        file.write(presenter_content)
+  }
+}
+''',
+}
+
+# Where each template is written, relative to lib/features/<page_name>
+TEMPLATE_OUTPUTS = {
+    "repository": "domain/repositories/{page_name}_repository.dart",
+    "repository_impl": "data/repositories/{page_name}_repository_impl.dart",
+    "di": "di/{page_name}_di.dart",
+    "presenter": "presentation/presenter/{page_name}_presenter.dart",
+    "ui_state": "presentation/presenter/{page_name}_ui_state.dart",
+    "page": "presentation/ui/{page_name}_page.dart",
+    # Optional templates, only generated when a template pack provides them
+    "datasource": "domain/datasource/{page_name}_datasource.dart",
+    "datasource_impl": "data/datasource/{page_name}_datasource_impl.dart",
+    "usecase": "domain/usecase/{page_name}_usecase.dart",
+    "entity": "domain/entities/{page_name}_entity.dart",
+    "model": "data/models/{page_name}_model.dart",
+}
+
+# Project-local template pack: <template>.dart.tmpl files that replace or add to the default pack
+TEMPLATE_PACK_DIR = "page_templates"
+TEMPLATE_EXTENSION = ".dart.tmpl"
+# Compiled templates, keyed by the hash of their source
+TEMPLATE_CACHE_DIR = ".flutter_build/template_cache"
+TEMPLATE_PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+TEMPLATE_VARIABLES = ("project_name", "page_name", "class_prefix")
+
+_compiled_templates = {}
+
+def compile_template(name, source):
+    """
+    Compile a template into alternating literal/placeholder segments.
+    The result is cached in memory and on disk under the hash of the source,
+    so a template is only parsed the first time it is seen.
+    """
+    digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    if digest in _compiled_templates:
+        return _compiled_templates[digest]
+    cache_path = os.path.join(TEMPLATE_CACHE_DIR, f"{digest}.json")
+    try:
+        with open(cache_path, 'r') as file:
+            segments = json.load(file)
+    except (OSError, ValueError):
+        # re.split with one group gives [literal, placeholder, literal, ...]
+        segments = TEMPLATE_PLACEHOLDER.split(source)
+        unknown = sorted(set(segments[1::2]) - set(TEMPLATE_VARIABLES))
+        if unknown:
+            print(f"{RED}Error: Template '{name}' uses unknown placeholder(s): {', '.join(unknown)}.{NC}")
+            print(f"Available placeholders: {', '.join(TEMPLATE_VARIABLES)}")
+            exit(1)
+        try:
+            os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(segments, file)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+    _compiled_templates[digest] = segments
+    return segments
+
+def render_template(name, segments, values):
+    """Render a compiled template with the feature's values"""
+    parts = list(segments)
+    parts[1::2] = [values[placeholder] for placeholder in segments[1::2]]
+    return ''.join(parts)
+
+def load_template_pack(directory=TEMPLATE_PACK_DIR):
+    """
+    Load the default pack overlaid with the <template>.dart.tmpl files in directory
+    Returns:
+        Dict of template name → compiled template
+    """
+    sources = dict(DEFAULT_TEMPLATES)
+    if directory and os.path.isdir(directory):
+        for entry in sorted(os.listdir(directory)):
+            if not entry.endswith(TEMPLATE_EXTENSION):
+                continue
+            name = entry[:-len(TEMPLATE_EXTENSION)]
+            if name not in TEMPLATE_OUTPUTS:
+                print(f"{YELLOW}Warning: Ignoring unknown template {os.path.join(directory, entry)}.{NC}")
+                print(f"Known templates: {', '.join(TEMPLATE_OUTPUTS)}")
+                continue
+            with open(os.path.join(directory, entry), 'r') as file:
+                sources[name] = file.read()
+    return {name: compile_template(name, source) for name, source in sources.items()}
+
+def init_templates(directory=TEMPLATE_PACK_DIR):
+    """Write the default pack to directory as a starting point for a custom pack"""
+    os.makedirs(directory, exist_ok=True)
+    for name, source in DEFAULT_TEMPLATES.items():
+        path = os.path.join(directory, f"{name}{TEMPLATE_EXTENSION}")
+        if os.path.exists(path):
+            print(f"{YELLOW}Skipped {path} (already exists){NC}")
+            continue
+        with open(path, 'w') as file:
+            file.write(source)
+        print(f"{GREEN}✓ Wrote {path}{NC}")
+    optional = [name for name in TEMPLATE_OUTPUTS if name not in DEFAULT_TEMPLATES]
+    print(f"\n{BLUE}Optional templates you can add: {', '.join(name + TEMPLATE_EXTENSION for name in optional)}{NC}")
+
+def render_feature_files(project_name, page_name, class_prefix, templates=None):
+    """
+    Render the Dart files of one feature, keyed by path
+    Parameters:
+        templates: Compiled template pack from load_template_pack(); the default pack if omitted
+    """
+    if templates is None:
+        templates = load_template_pack()
+    base_path = f"lib/features/{page_name}"
+    values = {"project_name": project_name, "page_name": page_name, "class_prefix": class_prefix}
+    files = {}
+    for name, compiled in templates.items():
+        output_path = TEMPLATE_OUTPUTS[name].format(page_name=page_name)
+        files[f"{base_path}/{output_path}"] = render_template(name, compiled, values)
+    return files
+
+def generate_page(page_name):
+    """Generate Flutter feature structure and files"""
+    if not page_name:
+        print(f"{RED}Error: Page name is required.{NC}")
+        print(f"Usage: {sys.argv[0]} page <page_name>")
+        exit(1)
+    generate_pages([page_name])
+
+def generate_pages(page_names, template_dir=TEMPLATE_PACK_DIR):
+    """
+    Generate several features in one pass: pubspec.yaml is parsed once, every
+    feature's folders and files are written, then all DI registrations go into
+    service_locator.dart in a single write.
+    Parameters:
+        page_names: Feature names (snake_case)
+        template_dir: Template pack directory; missing templates use the default pack
+    """
+    project_name = get_project_name()
+    templates = load_template_pack(template_dir)
+    if template_dir and os.path.isdir(template_dir):
+        print(f"{BLUE}Using template pack {template_dir}/{NC}")
     
-    with open(f"{base_path}/presentation/presenter/{page_name}_ui_state.dart", 'w') as file:
-        file.write(ui_state_content)
+    features = []
+    for page_name in page_names:
+        # Convert page name to lowercase
+        page_name = page_name.lower()
+        if not PAGE_NAME_PATTERN.match(page_name):
+            print(f"{RED}Error: '{page_name}' is not a valid feature name (use snake_case).{NC}")
+            exit(1)
+        # Create class prefix - convert snake_case to PascalCase
+        class_prefix = ''.join(word.capitalize() for word in page_name.split('_'))
+        if (class_prefix, page_name) not in features:
+            features.append((class_prefix, page_name))
     
-    with open(f"{base_path}/presentation/ui/{page_name}_page.dart", 'w') as file:
-        file.write(page_content)
+    for class_prefix, page_name in features:
+        print(f"{YELLOW}Creating feature structure for {class_prefix} in {project_name} project...{NC}")
+        
+        # Create folder structure
+        base_path = f"lib/features/{page_name}"
+        for directory in FEATURE_DIRECTORIES:
+            os.makedirs(f"{base_path}/{directory}", exist_ok=True)
+        
+        # Write files
+        for path, content in render_feature_files(project_name, page_name, class_prefix, templates).items():
+            with open(path, 'w') as file:
+                file.write(content)
+    print()
     
     # Update service locator
-    update_service_locator(project_name, class_prefix, page_name)
+    update_service_locator_batch(project_name, features)
     
+    if len(features) == 1:
+        print_feature_tree(*features[0])
+    else:
+        print(f"\n{GREEN}✓ {len(features)} features created successfully!{NC}")
+        for class_prefix, page_name in features:
+            print(f"    {BLUE}lib/features/{page_name}{NC}  ({class_prefix})")
+    
+    extra_templates = [name for name in templates if name not in DEFAULT_TEMPLATES]
+    if extra_templates:
+        print(f"  {BLUE}Also generated from the template pack:{NC} {', '.join(extra_templates)}")
+
+def print_feature_tree(class_prefix, page_name):
+    """Print the structure of a newly created feature"""
     # Print success message
     print(f"\n{GREEN}✓ Feature '{class_prefix}' created successfully!{NC}")
     print(f"  {BLUE}Structure:{NC}")
@@ -264,24 +493,250 @@ class {class_prefix}Page extends StatelessWidget {{
     print(f"        └── {BLUE}di{NC}")
     print(f"            └── {GREEN}{page_name}_di.dart{NC}")
 
+FEATURES_DIR = "lib/features"
+# Per-feature scan results, reused while the mtimes they were read at still match
+FEATURE_INDEX_FILE = ".flutter_build/feature_index.json"
+FEATURE_INDEX_VERSION = 1
+DI_CLASS_PATTERN = re.compile(r'^class\s+(\w+Di)\b', re.MULTILINE)
+FEATURE_IMPORT_PATTERN = re.compile(r'/features/(\w+)/di/')
+
+def path_mtime(path):
+    """mtime of path in nanoseconds, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def feature_signature(feature_path, page_name):
+    """
+    mtimes of everything the index records about a feature. Directory mtimes
+    change when files are added or removed, the DI file's when it is edited.
+    """
+    return [
+        path_mtime(os.path.join(feature_path, relative_path))
+        for relative_path in ("", "di", f"di/{page_name}_di.dart", "presentation/presenter", "presentation/ui")
+    ]
+
+def scan_feature(feature_path, page_name):
+    """Record which of a feature's wiring files exist and the name of its DI class"""
+    record = {"di": False, "di_class": None}
+    try:
+        with open(os.path.join(feature_path, "di", f"{page_name}_di.dart"), 'r') as file:
+            match = DI_CLASS_PATTERN.search(file.read())
+        record["di"] = True
+        record["di_class"] = match.group(1) if match else None
+    except OSError:
+        pass
+    presenter_dir = os.path.join(feature_path, "presentation", "presenter")
+    record["presenter"] = os.path.isfile(os.path.join(presenter_dir, f"{page_name}_presenter.dart"))
+    record["ui_state"] = os.path.isfile(os.path.join(presenter_dir, f"{page_name}_ui_state.dart"))
+    record["page"] = os.path.isfile(os.path.join(feature_path, "presentation", "ui", f"{page_name}_page.dart"))
+    return record
+
+def scan_service_locator():
+    """Registered DI classes and imported feature DI files from service_locator.dart"""
+    try:
+        with open(SERVICE_LOCATOR_PATH, 'r') as file:
+            index = index_service_locator(file.read())
+    except OSError:
+        return None
+    imported = set()
+    for uri in index["imports"]:
+        match = FEATURE_IMPORT_PATTERN.search(uri)
+        if match:
+            imported.add(match.group(1))
+    return {"registered": sorted(index["registered"]), "imported": sorted(imported)}
+
+def load_feature_index():
+    """
+    Scan lib/features with os.scandir, rescanning only features whose mtimes
+    changed since the index was last written
+    Returns:
+        (features, locator, rescanned): features maps name → record, locator is
+        the service locator record (None if the file is missing) and rescanned
+        is the number of entries that had to be read again
+    """
+    try:
+        with open(FEATURE_INDEX_FILE, 'r') as file:
+            cache = json.load(file)
+        if cache.get("version") != FEATURE_INDEX_VERSION:
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    cached_features = cache.get("features", {})
+    
+    features = {}
+    rescanned = 0
+    with os.scandir(FEATURES_DIR) as entries:
+        for entry in entries:
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            signature = feature_signature(entry.path, entry.name)
+            record = cached_features.get(entry.name)
+            if record is None or record["signature"] != signature:
+                record = scan_feature(entry.path, entry.name)
+                record["signature"] = signature
+                rescanned += 1
+            features[entry.name] = record
+    
+    locator_signature = path_mtime(SERVICE_LOCATOR_PATH)
+    locator = cache.get("locator")
+    if locator is None or cache.get("locator_signature") != locator_signature:
+        locator = scan_service_locator()
+        rescanned += 1
+    
+    if rescanned or set(features) != set(cached_features):
+        cache = {
+            "version": FEATURE_INDEX_VERSION,
+            "features": features,
+            "locator": locator,
+            "locator_signature": locator_signature,
+        }
+        try:
+            os.makedirs(os.path.dirname(FEATURE_INDEX_FILE), exist_ok=True)
+            temp_path = f"{FEATURE_INDEX_FILE}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(cache, file)
+            os.replace(temp_path, FEATURE_INDEX_FILE)
+        except OSError:
+            pass
+    return features, locator, rescanned
+
+def feature_issues(record, locator):
+    """Wiring problems of one feature"""
+    issues = []
+    if not record["di"]:
+        issues.append("missing DI file")
+    elif not record["di_class"]:
+        issues.append("no *Di class in DI file")
+    elif locator is not None and record["di_class"] not in locator["registered"]:
+        issues.append(f"{record['di_class']} not registered in service locator")
+    if not record["presenter"]:
+        issues.append("missing presenter")
+    if not record["ui_state"]:
+        issues.append("missing ui_state")
+    return issues
+
+def orphaned_registrations(features, locator):
+    """Service locator registrations and imports that no longer match a feature"""
+    if locator is None:
+        return []
+    di_classes = {record["di_class"] for record in features.values()}
+    orphans = [f"{name}.setup registered but no feature defines {name}"
+               for name in locator["registered"] if name not in di_classes]
+    orphans.extend(f"imports DI of missing feature '{name}'"
+                   for name in locator["imported"] if name not in features)
+    return orphans
+
+def list_features(args):
+    """
+    List the features under lib/features and how they are wired
+    Parameters:
+        args: `--json` to print the index as JSON, `--check` to exit 1 on any issue
+    """
+    if not os.path.isdir(FEATURES_DIR):
+        print(f"{RED}Error: {FEATURES_DIR} not found.{NC}")
+        print("Please run this command from the root of a Flutter project.")
+        exit(1)
+    started = time.perf_counter()
+    features, locator, rescanned = load_feature_index()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    issues = {name: feature_issues(record, locator) for name, record in features.items()}
+    orphans = orphaned_registrations(features, locator)
+    
+    if "--json" in args:
+        report = {
+            "features": {
+                name: dict(
+                    {key: value for key, value in record.items() if key != "signature"},
+                    issues=issues[name],
+                )
+                for name, record in sorted(features.items())
+            },
+            "orphans": orphans,
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        def mark(ok):
+            return f"{GREEN}✓{NC}" if ok else f"{RED}✗{NC}"
+        width = max([len(name) for name in features] + [len("Feature")])
+        print(f"{BLUE}{'Feature'.ljust(width)}  DI  Registered  Presenter  UI state  Page{NC}")
+        for name in sorted(features):
+            record = features[name]
+            registered = locator is not None and record["di_class"] in locator["registered"]
+            print(f"{name.ljust(width)}  {mark(record['di'])}       {mark(registered)}          "
+                  f"{mark(record['presenter'])}         {mark(record['ui_state'])}    {mark(record['page'])}")
+        if locator is None:
+            print(f"\n{YELLOW}Warning: Could not find service_locator.dart at {SERVICE_LOCATOR_PATH}.{NC}")
+        problems = [(name, issue) for name in sorted(issues) for issue in issues[name]]
+        if problems or orphans:
+            print(f"\n{YELLOW}Issues:{NC}")
+            for name, issue in problems:
+                print(f"  {RED}✗{NC} {name}: {issue}")
+            for orphan in orphans:
+                print(f"  {RED}✗{NC} service_locator.dart: {orphan}")
+        source = f"rescanned {rescanned}" if rescanned else "from cache"
+        print(f"\n{len(features)} features, {sum(1 for name in issues if issues[name])} with issues, "
+              f"{len(orphans)} orphaned registrations ({source}, {elapsed_ms:.1f} ms)")
+    
+    if "--check" in args and (orphans or any(issues.values())):
+        exit(1)
+
+def parse_page_args(args):
+    """
+    Parse `page` arguments: names, `--from <file>` and `--templates <dir>`
+    Returns:
+        (page_names, template_dir)
+    """
+    names = []
+    template_dir = TEMPLATE_PACK_DIR
+    index = 0
+    while index < len(args):
+        if args[index] in ("--from", "--templates"):
+            if index + 1 >= len(args):
+                print(f"{RED}Error: {args[index]} requires a value.{NC}")
+                exit(1)
+            if args[index] == "--from":
+                names.extend(read_feature_list(args[index + 1]))
+            else:
+                template_dir = args[index + 1]
+                if not os.path.isdir(template_dir):
+                    print(f"{RED}Error: Template directory {template_dir} not found.{NC}")
+                    exit(1)
+            index += 2
+        else:
+            names.append(args[index])
+            index += 1
+    return names, template_dir
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1].lower() == "init-templates":
+        init_templates(sys.argv[2] if len(sys.argv) >= 3 else TEMPLATE_PACK_DIR)
+        return
+    if len(sys.argv) >= 2 and sys.argv[1].lower() == "features":
+        list_features(sys.argv[2:])
+        return
+    
     if len(sys.argv) < 3:
         print(f"{RED}Error: Insufficient arguments.{NC}")
-        print(f"Usage: {sys.argv[0]} page <page_name>")
+        print(f"Usage: {sys.argv[0]} page <page_name> [<page_name> ...] | page --from <features.txt> [--templates <dir>]")
+        print(f"       {sys.argv[0]} init-templates [<dir>]")
+        print(f"       {sys.argv[0]} features [--json] [--check]")
         exit(1)
     
     command = sys.argv[1].lower()
     
     if command == "page":
-        if len(sys.argv) >= 3:
-            generate_page(sys.argv[2])
+        page_names, template_dir = parse_page_args(sys.argv[2:])
+        if page_names:
+            generate_pages(page_names, template_dir)
         else:
             print(f"{RED}Error: Page name is required.{NC}")
             print(f"Usage: {sys.argv[0]} page <page_name>")
             exit(1)
     else:
         print(f"{RED}Error: Unknown command '{command}'.{NC}")
-        print(f"Available commands: page")
+        print("Available commands: page, features, init-templates")
         exit(1)
 
 if __name__ == "__main__":
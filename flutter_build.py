@@ -7,6 +7,22 @@ import platform
 import subprocess
 import glob
 import re  # Added for git tag functionality
+import io
+import json
+import shutil
+import tempfile
+import contextlib
+import importlib
+import hashlib
+import struct
+import threading
+import queue
+import sqlite3
+import zipfile
+import gzip
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from functools import wraps
 
 # Cross-platform color support
@@ -26,6 +42,16 @@ NC = '\033[0m'
 MAGENTA = '\033[0;35m'  
 CHECKMARK = '\033[32m✓\033[0m' 
 CROSS = '\033[31m𐄂\033[0m'
+# Use different spinners based on OS
+SPINNER_FRAMES = '|/-\\' if platform.system() == "Windows" else '⡿⣟⣯⣷⣾⣽⣻⢿'
+SPINNER_INTERVAL = 0.1
+
+# Lines of stdout/stderr kept per command; older lines are dropped
+OUTPUT_BUFFER_LINES = 500
+
+# Turned on with --tail: print command output live while it runs
+live_tail = False
+print_lock = threading.Lock()
 
 def timer_decorator(func):
     """
@@ -34,9 +60,13 @@ def timer_decorator(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.time()
+        span = begin_span(func.__name__, "command", {"description": (func.__doc__ or "").strip()})
         
         # Execute the original function
-        result = func(*args, **kwargs)
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            end_span(span)
         
         end_time = time.time()
         total_seconds = end_time - start_time
@@ -49,27 +79,35 @@ def timer_decorator(func):
         return result
     return wrapper
 
-def show_loading(description, process):
+def show_loading(description, process, on_line=None):
     """
     Displays a loading spinner with a custom message while a process is running
     Parameters:
         description: Description message to display
         process: Process object to monitor
+        on_line: Optional callback(stream_name, line) that sees every output line
     """
     spinner_index = 0
-    # Use different spinners based on OS
-    if platform.system() == "Windows":
-        braille_spinner_list = '|/-\\'
-    else:
-        braille_spinner_list = '⡿⣟⣯⣷⣾⣽⣻⢿'
+    braille_spinner_list = SPINNER_FRAMES
     
-    print(description, end='', flush=True)
-    # Continue spinning while the process is running
-    while process.poll() is None:
-        print(f"\b{MAGENTA}{braille_spinner_list[spinner_index]}{NC}", end='', flush=True)
-        spinner_index = (spinner_index + 1) % len(braille_spinner_list)
-        time.sleep(0.1 if platform.system() == "Windows" else 0.025)
-    stdout, stderr = process.communicate()
+    if live_tail:
+        # Output lines and a spinner can't share the terminal line
+        print(description.rstrip(), flush=True)
+        def tail_line(stream_name, line):
+            print_tail_line(stream_name, line)
+            if on_line:
+                on_line(stream_name, line)
+        capture = capture_output(process, on_line=tail_line)
+        capture["exited"].wait()
+        print(description, end='', flush=True)
+    else:
+        print(description, end='', flush=True)
+        capture = capture_output(process, on_line=on_line)
+        # Redraw each frame until the exit event fires; it wakes us as soon as the process ends
+        while not capture["exited"].wait(SPINNER_INTERVAL):
+            print(f"\b{MAGENTA}{braille_spinner_list[spinner_index]}{NC}", end='', flush=True)
+            spinner_index = (spinner_index + 1) % len(braille_spinner_list)
+    stdout, stderr = finish_capture(capture)
     # Display success or failure icon based on the process exit status
     if process.returncode == 0:
         print(f"\b{CHECKMARK} ", flush=True)
@@ -80,40 +118,463 @@ def show_loading(description, process):
     else:
         print(f"\b{CROSS} ", flush=True)
         # Nicher ei stdout statement ta comment out korle r command er out put dekha jabe na.
-        if stdout:
-            try:
-                print(f"\n{GREEN}Output:\n{stdout.decode('utf-8', errors='ignore')}{NC}")
-            except:
-                print(f"\n{GREEN}Output:\n{stdout}{NC}")
-        if stderr:
-            try:
-                print(f"\n{RED}Error Output:\n{stderr.decode('utf-8', errors='ignore')}{NC}")
-            except:
-                print(f"\n{RED}Error Output:\n{stderr}{NC}")
+        print_process_output(stdout, stderr)
         return False
 
+def wait_with_spinner(description, func):
+    """Shows the loading spinner while func runs in a background thread, then returns its result"""
+    done = threading.Event()
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = func()
+        finally:
+            done.set()
+
+    threading.Thread(target=runner, daemon=True).start()
+    spinner_index = 0
+    print(description, end='', flush=True)
+    while not done.wait(SPINNER_INTERVAL):
+        print(f"\b{MAGENTA}{SPINNER_FRAMES[spinner_index]}{NC}", end='', flush=True)
+        spinner_index = (spinner_index + 1) % len(SPINNER_FRAMES)
+    value = result.get("value")
+    print(f"\b{CHECKMARK if value else CROSS} ", flush=True)
+    return value
+
+def print_process_output(stdout, stderr):
+    """Prints the captured output of a failed process"""
+    if stdout:
+        try:
+            print(f"\n{GREEN}Output:\n{stdout.decode('utf-8', errors='ignore')}{NC}")
+        except:
+            print(f"\n{GREEN}Output:\n{stdout}{NC}")
+    if stderr:
+        try:
+            print(f"\n{RED}Error Output:\n{stderr.decode('utf-8', errors='ignore')}{NC}")
+        except:
+            print(f"\n{RED}Error Output:\n{stderr}{NC}")
+
+# ============================================================================
+# OUTPUT STREAMING
+# ============================================================================
+
+def capture_output(process, on_line=None):
+    """
+    Starts reader threads that drain a process's stdout and stderr as it runs.
+    Both pipes are read continuously so a chatty command never blocks on a
+    full pipe, and only the last OUTPUT_BUFFER_LINES lines of each are kept.
+    Parameters:
+        process: Process started with stdout/stderr pipes
+        on_line: Optional callback(stream_name, line) for live output
+    Returns:
+        Capture dict for finish_capture(); capture["exited"] is an Event set
+        when the process exits
+    """
+    capture = {
+        "stdout": deque(maxlen=OUTPUT_BUFFER_LINES),
+        "stderr": deque(maxlen=OUTPUT_BUFFER_LINES),
+        "line_counts": {"stdout": 0, "stderr": 0},
+        "exited": threading.Event(),
+        "readers": [],
+    }
+
+    def reader(stream, name):
+        try:
+            for line in iter(stream.readline, '' if isinstance(stream, io.TextIOBase) else b''):
+                capture[name].append(line)
+                capture["line_counts"][name] += 1
+                if on_line:
+                    on_line(name, line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+
+    def waiter():
+        process.wait()
+        capture["exited"].set()
+
+    for name in ("stdout", "stderr"):
+        stream = getattr(process, name)
+        if stream is not None:
+            thread = threading.Thread(target=reader, args=(stream, name), daemon=True)
+            thread.start()
+            capture["readers"].append(thread)
+    threading.Thread(target=waiter, daemon=True).start()
+    return capture
+
+def finish_capture(capture):
+    """
+    Waits for the process and its reader threads, then returns the buffered output.
+    Returns:
+        (stdout, stderr) holding at most the last OUTPUT_BUFFER_LINES lines each
+    """
+    capture["exited"].wait()
+    for thread in capture["readers"]:
+        # A leftover grandchild (e.g. a daemon) can hold the pipe open after exit
+        thread.join(timeout=5)
+    output = []
+    for name in ("stdout", "stderr"):
+        lines = list(capture[name])
+        dropped = capture["line_counts"][name] - len(lines)
+        text = "".join(line if isinstance(line, str) else line.decode('utf-8', errors='ignore') for line in lines)
+        if dropped > 0:
+            text = f"... {dropped} earlier lines omitted ...\n{text}"
+        output.append(text)
+    return output[0], output[1]
+
+def print_tail_line(stream_name, line, prefix=""):
+    """Prints one line of live command output (--tail)"""
+    if not isinstance(line, str):
+        line = line.decode('utf-8', errors='ignore')
+    color = RED if stream_name == "stderr" else NC
+    with print_lock:
+        print(f"  {prefix}{color}{line.rstrip()}{NC}", flush=True)
+
+# ============================================================================
+# TRACING
+# ============================================================================
+
+# Every command, pipeline and step run is recorded as a span; --trace <file> exports them
+trace_spans = []
+trace_local = threading.local()
+trace_lock = threading.Lock()
+trace_lanes = {}
+trace_file = None
+
+def current_span():
+    """Innermost open span on the calling thread, if any"""
+    stack = getattr(trace_local, "stack", None)
+    return stack[-1] if stack else None
+
+def begin_span(name, category, args=None, parent=None):
+    """
+    Opens a timed span and makes it the current span of the calling thread.
+    Parameters:
+        name: Span name (step description or function name)
+        category: "command", "pipeline" or "step"
+        args: Extra details stored with the span (command line, ...)
+        parent: Parent span; defaults to the current span of this thread
+    """
+    with trace_lock:
+        # One lane per thread, so overlapping pipeline stages show up side by side
+        lane = trace_lanes.setdefault(threading.get_ident(), len(trace_lanes))
+        span = {
+            "id": len(trace_spans) + 1,
+            "parent": (parent or current_span() or {}).get("id"),
+            "name": name,
+            "category": category,
+            "lane": lane,
+            "start": time.time(),
+            "end": None,
+            "args": dict(args or {}),
+        }
+        trace_spans.append(span)
+    if not hasattr(trace_local, "stack"):
+        trace_local.stack = []
+    trace_local.stack.append(span)
+    return span
+
+def end_span(span, **args):
+    """Closes a span opened by begin_span(), recording any extra args (exit code, status)"""
+    span["end"] = time.time()
+    span["args"].update(args)
+    stack = getattr(trace_local, "stack", [])
+    if span in stack:
+        stack.remove(span)
+
+def export_trace(path):
+    """
+    Writes the recorded spans as a Chrome trace (chrome://tracing, ui.perfetto.dev)
+    to path and a compact nested summary to <path>.summary.json.
+    """
+    if not trace_spans:
+        return
+    origin = min(span["start"] for span in trace_spans)
+    events = []
+    for lane in sorted(set(trace_lanes.values())):
+        events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": lane,
+                       "args": {"name": "main" if lane == 0 else f"worker {lane}"}})
+    for span in trace_spans:
+        end = span["end"] or time.time()
+        events.append({
+            "name": span["name"],
+            "cat": span["category"],
+            "ph": "X",
+            "ts": round((span["start"] - origin) * 1e6),
+            "dur": round((end - span["start"]) * 1e6),
+            "pid": os.getpid(),
+            "tid": span["lane"],
+            "args": span["args"],
+        })
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def summarize(span):
+        end = span["end"] or time.time()
+        node = {"name": span["name"], "category": span["category"], "seconds": round(end - span["start"], 3)}
+        node.update(span["args"])
+        children = [summarize(child) for child in trace_spans if child["parent"] == span["id"]]
+        if children:
+            node["children"] = children
+        return node
+
+    summary = {
+        "argv": sys.argv[1:],
+        "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(origin)),
+        "spans": [summarize(span) for span in trace_spans if span["parent"] is None],
+    }
+    summary_path = os.path.splitext(path)[0] + ".summary.json"
+    with open(summary_path, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+    print(f"{BLUE}Trace written to {path} (summary: {summary_path}){NC}")
+
 def display_apk_size():
     """Function to display APK size"""
-    apk_files = glob.glob("build/app/outputs/flutter-apk/*.apk")
+    apk_files = sorted(glob.glob("build/app/outputs/flutter-apk/*.apk"))
     if apk_files:
-        for apk_path in apk_files:
-            size_bytes = os.path.getsize(apk_path)
-            size_mb = round(size_bytes / 1048576, 2)
-            print(f"{BLUE}APK: {os.path.basename(apk_path)} | Size: {size_mb} MB{NC}")
+        report_artifact_sizes(apk_files)
     else:
         print(f"{RED}APK file not found in build/app/outputs/flutter-apk/{NC}")
 
-def run_flutter_command(cmd_list, description):
+# ============================================================================
+# STEP CACHE
+# ============================================================================
+
+# Tool state lives outside build/ and .dart_tool/ so `flutter clean` keeps it
+STATE_DIR = ".flutter_build"
+STEP_CACHE_FILE = os.path.join(STATE_DIR, "step_cache.json")
+# Parallel stages record their steps concurrently; each read-modify-write holds this
+step_cache_lock = threading.Lock()
+
+# Turned off with --force / --no-cache
+use_step_cache = True
+
+# Inputs each cacheable step depends on (glob patterns). `flutter clean` is not
+# cached: it is a side effect rather than a product, and release builds rely on it.
+CLEAN_CMD = ["flutter", "clean"]
+PUB_GET_INPUTS = ["pubspec.yaml", "pubspec.lock"]
+PUB_GET_OUTPUTS = [".dart_tool/package_config.json"]
+# Never searched for workspace packages (hidden directories are skipped too)
+PUB_PACKAGE_EXCLUDED_DIRS = {"build", ".dart_tool", "node_modules", "Pods"}
+# Directories of the workspace's local packages, found once per run
+pub_packages = None
+
+# part 'foo.g.dart'; / part 'foo.freezed.dart'; directives produced by build_runner
+GENERATED_PART_PATTERN = re.compile(r"^part\s+['\"]([^'\"]+\.\w+\.dart)['\"];", re.MULTILINE)
+
+def read_l10n_config():
+    """Reads the gen-l10n directories from l10n.yaml, falling back to Flutter defaults"""
+    config = {"arb-dir": "lib/l10n", "output-dir": "", "output-localization-file": "app_localizations.dart"}
+    synthetic = False
+    if os.path.isfile("l10n.yaml"):
+        with open("l10n.yaml", 'r', encoding='utf-8') as file:
+            content = file.read()
+        for key in config:
+            match = re.search(rf'^{key}:\s*(.+)$', content, re.MULTILINE)
+            if match:
+                config[key] = match.group(1).strip().strip('"\'')
+        synthetic = re.search(r'^synthetic-package:\s*true', content, re.MULTILINE) is not None
+    if synthetic:
+        config["output-dir"] = ".dart_tool/flutter_gen/gen_l10n"
+    elif not config["output-dir"]:
+        config["output-dir"] = config["arb-dir"]
+    return config
+
+def gen_l10n_inputs():
+    """Input globs of the gen-l10n step"""
+    return ["pubspec.yaml", "l10n.yaml", f"{read_l10n_config()['arb-dir']}/*.arb"]
+
+def gen_l10n_outputs():
+    """Files gen-l10n is expected to produce"""
+    config = read_l10n_config()
+    return [os.path.join(config["output-dir"], config["output-localization-file"])]
+
+def build_runner_sources():
+    """
+    Finds the annotated Dart sources build_runner generates parts for.
+    Returns:
+        (sources, outputs): source files with generated part directives and
+        the generated files they expect
+    """
+    sources = []
+    outputs = []
+    for path in sorted(glob.glob("lib/**/*.dart", recursive=True)):
+        if re.search(r'\.\w+\.dart$', os.path.basename(path)):
+            # Skip generated files themselves (foo.g.dart, foo.freezed.dart)
+            continue
+        with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+            parts = GENERATED_PART_PATTERN.findall(file.read())
+        if parts:
+            sources.append(path)
+            outputs.extend(os.path.normpath(os.path.join(os.path.dirname(path), part)) for part in parts)
+    return sources, outputs
+
+def build_runner_inputs():
+    """Input globs of the build_runner step"""
+    sources, _ = build_runner_sources()
+    return ["pubspec.lock", "build.yaml"] + sources
+
+def build_runner_outputs():
+    """Files build_runner is expected to produce"""
+    _, outputs = build_runner_sources()
+    return outputs
+
+def fingerprint_inputs(cmd_list, inputs):
+    """Hashes the command line and the content of every file matched by the input globs"""
+    digest = hashlib.sha256(" ".join(cmd_list).encode('utf-8'))
+    for pattern in inputs:
+        digest.update(f"\0{pattern}".encode('utf-8'))
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if not os.path.isfile(path):
+                continue
+            digest.update(f"\0{path}\0".encode('utf-8'))
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def find_pub_packages():
+    """
+    Finds every local package in the workspace: directories below the root with
+    their own pubspec.yaml, excluding build output and tool directories.
+    Returns:
+        Sorted package directories relative to the root (the root itself excluded)
+    """
+    global pub_packages
+    if pub_packages is None:
+        packages = []
+        for directory, subdirs, files in os.walk("."):
+            subdirs[:] = sorted(d for d in subdirs if d not in PUB_PACKAGE_EXCLUDED_DIRS and not d.startswith('.'))
+            if directory != "." and "pubspec.yaml" in files:
+                packages.append(os.path.relpath(directory))
+        pub_packages = packages
+    return pub_packages
+
+def pub_stages(name, cmd_list, description, deps=None, cached=False):
+    """
+    Runs a `flutter pub` command in every package of the workspace: the root
+    package as stage name and each local package as name:<dir>. The stages share
+    deps, so they resolve side by side on the pipeline's worker pool.
+    Parameters:
+        cached: Skip packages whose pubspec.yaml and pubspec.lock are unchanged
+                since their last successful run (for pub get)
+    """
+    stages = [stage(name, cmd_list, description, deps,
+                    inputs=PUB_GET_INPUTS if cached else None,
+                    outputs=PUB_GET_OUTPUTS if cached else None)]
+    for package in find_pub_packages():
+        stages.append(stage(
+            f"{name}:{package}", cmd_list + ["--directory", package],
+            f"{description.rstrip('.')} ({package})...", deps,
+            inputs=[os.path.join(package, path) for path in PUB_GET_INPUTS] if cached else None,
+            outputs=[os.path.join(package, path) for path in PUB_GET_OUTPUTS] if cached else None,
+        ))
+    return stages
+
+def pub_stage_names(name):
+    """Names of the stages pub_stages(name, ...) creates, for use in deps"""
+    return [name] + [f"{name}:{package}" for package in find_pub_packages()]
+
+def read_json(path, default):
+    """Loads a JSON state file, returning default if it is missing or corrupt"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return default
+
+def write_json_atomic(path, data):
+    """Writes a JSON state file through a temp file and rename, so readers never see half a file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def load_step_cache():
+    """Loads the step cache, returning an empty cache if it is missing or corrupt"""
+    return read_json(STEP_CACHE_FILE, {})
+
+def save_step_cache(cache):
+    """Writes the step cache atomically"""
+    write_json_atomic(STEP_CACHE_FILE, cache)
+
+def is_step_cached(cmd_list, inputs, outputs):
+    """Checks whether a step's inputs and outputs match its last successful run"""
+    entry = load_step_cache().get(" ".join(cmd_list))
+    if not entry or entry.get("fingerprint") != fingerprint_inputs(cmd_list, inputs):
+        return False
+    return all(os.path.exists(path) for path in outputs or [])
+
+def record_step(cmd_list, inputs):
+    """Stores the fingerprint of a step that just succeeded"""
+    fingerprint = fingerprint_inputs(cmd_list, inputs)
+    with step_cache_lock:
+        cache = load_step_cache()
+        cache[" ".join(cmd_list)] = {
+            "fingerprint": fingerprint,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        save_step_cache(cache)
+
+def forget_cleaned_steps():
+    """
+    Drops the step cache entries of the root package after `flutter clean` wiped
+    what they produced. Steps run in other packages are unaffected.
+    """
+    with step_cache_lock:
+        cache = load_step_cache()
+        save_step_cache({key: entry for key, entry in cache.items() if " --directory " in key})
+
+def run_flutter_command(cmd_list, description, inputs=None, outputs=None):
     """
     Runs a flutter/dart command with a loading spinner.
     Parameters:
         cmd_list: List of command arguments
         description: Description to show with spinner
+        inputs: Optional glob patterns the step depends on. When given, the step
+                is skipped if their content hash matches the last successful run
+        outputs: Optional files the step produces; a cached step is only
+                 skipped while all of them still exist
     """
+    span = begin_span(description.strip(), "step", {"cmd": " ".join(cmd_list)})
+    if inputs is not None and use_step_cache and is_step_cached(cmd_list, inputs, outputs):
+        print(f"{description}\b{CHECKMARK} {BLUE}(cached){NC}", flush=True)
+        end_span(span, status="cached", exit_code=0)
+        return True
+
+    log = open_step_log(" ".join(cmd_list), description.strip(), cmd_list)
+    try:
+        process = start_process(cmd_list)
+        success = show_loading(description, process,
+                               on_line=(lambda stream_name, line: write_step_log(log, line)) if log else None)
+    except BaseException:
+        end_span(span, status="failed", exit_code=None)
+        close_step_log(log, "failed", None, span)
+        raise
+    end_span(span, status="done" if success else "failed", exit_code=process.returncode)
+    entry = close_step_log(log, "done" if success else "failed", process.returncode, span)
+    if not success:
+        show_step_errors(entry)
+    if success and cmd_list == CLEAN_CMD:
+        forget_cleaned_steps()
+    if success and inputs is not None:
+        record_step(cmd_list, inputs)
+    return success
+
+def start_process(cmd_list):
+    """Starts a command with stdout/stderr captured"""
     # Windows compatibility for shell commands
     shell_needed = platform.system() == "Windows" and cmd_list[0] in ['timeout', 'start', 'flutter', 'dart']
     
-    process = subprocess.Popen(
+    return subprocess.Popen(
         cmd_list,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -122,7 +583,401 @@ def run_flutter_command(cmd_list, description):
         encoding='utf-8' if sys.version_info >= (3, 6) else None,
         errors='ignore' if sys.version_info >= (3, 6) else None
     )
-    return show_loading(description, process)
+
+# ============================================================================
+# PIPELINE EXECUTOR
+# ============================================================================
+
+BUILD_RUNNER_CMD = ["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"]
+
+# Release artifacts the build commands produce, keyed by command name
+BUILD_TARGETS = {
+    "apk": {
+        "cmd": ["flutter", "build", "apk", "--release", "--obfuscate", "--target-platform", "android-arm64", "--split-debug-info=build/symbols/apk"],
+        "description": "Building APK...",
+        "outputs": "build/app/outputs/flutter-apk/app-release.apk",
+        "directory": "build/app/outputs/flutter-apk/",
+    },
+    "apk-split": {
+        "cmd": ["flutter", "build", "apk", "--release", "--split-per-abi", "--obfuscate", "--split-debug-info=build/symbols/apk-split"],
+        "description": "Building APK (split-per-abi)...",
+        "outputs": "build/app/outputs/flutter-apk/app-*-release.apk",
+        "directory": "build/app/outputs/flutter-apk/",
+    },
+    "aab": {
+        "cmd": ["flutter", "build", "appbundle", "--release", "--obfuscate", "--split-debug-info=build/symbols/aab"],
+        "description": "Building AAB...",
+        "outputs": "build/app/outputs/bundle/release/*.aab",
+        "directory": "build/app/outputs/bundle/release/",
+    },
+}
+
+CHECKPOINT_FILE = os.path.join(STATE_DIR, "checkpoint.json")
+
+# Turned on with --resume: skip stages the last failed run already completed
+resume_pipeline = False
+
+# Upper bound on stages running at the same time (--jobs N overrides it)
+max_parallel_stages = min(4, os.cpu_count() or 1)
+
+def stage(name, cmd_list, description, deps=None, inputs=None, outputs=None, action=None):
+    """
+    Describes one pipeline stage.
+    Parameters:
+        name: Unique stage name other stages refer to in deps
+        cmd_list: List of command arguments
+        description: Description shown in the progress display
+        deps: Names of stages that must finish before this one starts
+        inputs/outputs: Step cache declarations, as for run_flutter_command
+        action: Optional callable run instead of cmd_list, returning (status, output)
+                with status "done", "cached" or "failed"
+    """
+    return {
+        "name": name,
+        "cmd": cmd_list,
+        "description": description,
+        "deps": list(deps or []),
+        "inputs": inputs,
+        "outputs": outputs,
+        "action": action,
+    }
+
+def prepare_stages(with_l10n=False):
+    """Clean → pub get → build_runner (and gen-l10n alongside it) shared by the build pipelines"""
+    daemon = build_runner_daemon_status()
+    if daemon:
+        # `flutter clean` would delete the daemon's asset graph under .dart_tool
+        print(f"{BLUE}Using build_runner daemon (PID {daemon['pid']}); skipping clean. Stop it with `db --stop` for a clean build.{NC}\n")
+        stages = pub_stages("pub_get", ["flutter", "pub", "get"], "Getting dependencies...", cached=True)
+    else:
+        stages = [stage("clean", CLEAN_CMD, "Cleaning project...")]
+        stages += pub_stages("pub_get", ["flutter", "pub", "get"], "Getting dependencies...", deps=["clean"], cached=True)
+    if with_l10n:
+        stages.append(stage("gen_l10n", ["flutter", "gen-l10n"], "Generating localizations...", deps=pub_stage_names("pub_get"),
+                            inputs=gen_l10n_inputs(), outputs=gen_l10n_outputs()))
+    if daemon:
+        stages.append(stage("build_runner", BUILD_RUNNER_CMD, "Waiting for build_runner daemon...", deps=pub_stage_names("pub_get"),
+                            action=build_runner_via_daemon))
+    else:
+        stages.append(stage("build_runner", BUILD_RUNNER_CMD, "Generating build files...", deps=pub_stage_names("pub_get"),
+                            inputs=build_runner_inputs(), outputs=build_runner_outputs()))
+    return stages
+
+def validate_pipeline(stages):
+    """Checks stage names are unique, deps exist and the graph has no cycle"""
+    names = [s["name"] for s in stages]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate stage names in pipeline: {names}")
+    by_name = {s["name"]: s for s in stages}
+    for s in stages:
+        for dep in s["deps"]:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{s['name']}' depends on unknown stage '{dep}'")
+    # Kahn's algorithm: every stage must become ready at some point
+    remaining = {s["name"]: len(s["deps"]) for s in stages}
+    ready = [name for name, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        name = ready.pop()
+        visited += 1
+        for s in stages:
+            if name in s["deps"]:
+                remaining[s["name"]] -= 1
+                if remaining[s["name"]] == 0:
+                    ready.append(s["name"])
+    if visited != len(stages):
+        raise ValueError("Pipeline has a dependency cycle")
+
+def command_line(cmd_list, max_args=8):
+    """A command for display, with the arguments past max_args (e.g. long path lists) elided"""
+    if len(cmd_list) <= max_args:
+        return " ".join(cmd_list)
+    return f"{' '.join(cmd_list[:max_args])} ... (+{len(cmd_list) - max_args} more)"
+
+def run_stage(pipeline_stage, parent=None):
+    """
+    Runs one stage to completion without a spinner (used by the worker pool).
+    Parameters:
+        pipeline_stage: stage() dict
+        parent: Pipeline span the stage's span is nested under
+    Returns:
+        (status, stdout, stderr) where status is "done", "cached" or "failed"
+    """
+    cmd_list = pipeline_stage["cmd"]
+    inputs = pipeline_stage["inputs"]
+    span = begin_span(pipeline_stage["description"], "step",
+                      {"stage": pipeline_stage["name"], "cmd": " ".join(cmd_list)}, parent=parent)
+    if inputs is not None and use_step_cache and is_step_cached(cmd_list, inputs, pipeline_stage["outputs"]):
+        end_span(span, status="cached", exit_code=0)
+        return "cached", "", ""
+    log = open_step_log(pipeline_stage["name"], pipeline_stage["description"], cmd_list)
+    if pipeline_stage["action"]:
+        status, output = pipeline_stage["action"]()
+        end_span(span, status=status, exit_code=1 if status == "failed" else 0)
+        if log and output:
+            write_step_log(log, output)
+        close_step_log(log, status, 1 if status == "failed" else 0, span)
+        return status, output, ""
+    try:
+        process = start_process(cmd_list)
+    except OSError as e:
+        end_span(span, status="failed", exit_code=None)
+        if log:
+            write_step_log(log, str(e))
+        close_step_log(log, "failed", None, span)
+        return "failed", "", str(e)
+
+    def on_line(stream_name, line):
+        if live_tail:
+            print_tail_line(stream_name, line, prefix=f"[{pipeline_stage['name']}] ")
+        if log:
+            write_step_log(log, line)
+
+    stdout, stderr = finish_capture(capture_output(process, on_line=on_line))
+    end_span(span, status="done" if process.returncode == 0 else "failed", exit_code=process.returncode)
+    close_step_log(log, "done" if process.returncode == 0 else "failed", process.returncode, span)
+    if process.returncode != 0:
+        return "failed", stdout, stderr
+    if cmd_list == CLEAN_CMD:
+        forget_cleaned_steps()
+    if inputs is not None:
+        record_step(cmd_list, inputs)
+    return "done", stdout, stderr
+
+def format_stage_line(pipeline_stage, state, now):
+    """Renders one row of the live pipeline display"""
+    description = pipeline_stage["description"].ljust(49) + " "
+    status = state["status"]
+    if status == "pending":
+        return f"  {description}{YELLOW}·{NC}"
+    if status == "running":
+        frame = SPINNER_FRAMES[int(now * 10) % len(SPINNER_FRAMES)]
+        return f"  {description}{MAGENTA}{frame}{NC} {now - state['start']:.1f}s"
+    if status == "skipped":
+        return f"  {description}{YELLOW}- skipped{NC}"
+    if status == "resumed":
+        return f"  {description}{CHECKMARK} {BLUE}(done in previous run){NC}"
+    elapsed = f"{state['end'] - state['start']:.1f}s"
+    if status == "cached":
+        return f"  {description}{CHECKMARK} {BLUE}(cached){NC}"
+    if status == "done":
+        return f"  {description}{CHECKMARK} {elapsed}"
+    return f"  {description}{CROSS} {elapsed}"
+
+def render_pipeline(stages, states, redraw, stream=None):
+    """Draws the multi-line progress display, moving the cursor back up to redraw it in place"""
+    stream = stream or sys.stdout
+    now = time.time()
+    if redraw:
+        stream.write(f"\033[{len(stages)}A")
+    for pipeline_stage in stages:
+        line = format_stage_line(pipeline_stage, states[pipeline_stage["name"]], now)
+        stream.write(f"\033[2K{line}\n")
+    stream.flush()
+
+class LiveDisplayOutput(io.TextIOBase):
+    """
+    Stands in for sys.stdout while the live pipeline display is on screen.
+    Whole lines printed by stage actions (warnings, install or build_runner
+    messages) are written above the display, which is then redrawn under them.
+    """
+    def __init__(self, stages, states, stream):
+        super().__init__()
+        self.stages = stages
+        self.states = states
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.pending = ""
+        self.drawn = False
+
+    def render(self):
+        with self.lock:
+            render_pipeline(self.stages, self.states, redraw=self.drawn, stream=self.stream)
+            self.drawn = True
+
+    def write(self, text):
+        with self.lock:
+            self.pending += text
+            if "\n" in self.pending:
+                lines, self.pending = self.pending.rsplit("\n", 1)
+                if self.drawn:
+                    # Clear the display, print in its place and draw it again below
+                    self.stream.write(f"\033[{len(self.stages)}A\033[J")
+                self.stream.write(lines + "\n")
+                render_pipeline(self.stages, self.states, redraw=False, stream=self.stream)
+                self.drawn = True
+        return len(text)
+
+    def close_display(self):
+        """Writes out a trailing partial line once the display is final"""
+        with self.lock:
+            if self.pending:
+                self.stream.write(self.pending + "\n")
+                self.pending = ""
+            self.stream.flush()
+
+    @property
+    def encoding(self):
+        return self.stream.encoding
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def flush(self):
+        with self.lock:
+            self.stream.flush()
+
+def stage_fingerprint(pipeline_stage):
+    """Fingerprint a checkpointed stage is compared against on --resume"""
+    if pipeline_stage["inputs"] is None:
+        # Without declared inputs only the command line is known
+        return hashlib.sha256(" ".join(pipeline_stage["cmd"]).encode('utf-8')).hexdigest()
+    return fingerprint_inputs(pipeline_stage["cmd"], pipeline_stage["inputs"])
+
+def save_checkpoint(checkpoint_name, completed, failed):
+    """Records which stages of a pipeline completed and which one failed"""
+    checkpoints = read_json(CHECKPOINT_FILE, {})
+    if failed is None and completed is None:
+        checkpoints.pop(checkpoint_name, None)
+    else:
+        checkpoints[checkpoint_name] = {
+            "completed": completed,
+            "failed": failed,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    write_json_atomic(CHECKPOINT_FILE, checkpoints)
+
+def plan_resume(stages, checkpoint_name):
+    """
+    Picks the stages --resume can skip: those the checkpoint lists as completed
+    whose inputs are unchanged and whose deps are skipped as well.
+    Returns:
+        Dict of skippable stage name → fingerprint
+    """
+    checkpoint = read_json(CHECKPOINT_FILE, {}).get(checkpoint_name)
+    if not checkpoint:
+        print(f"{YELLOW}No checkpoint for '{checkpoint_name}', running the full pipeline.{NC}\n")
+        return {}
+    completed = checkpoint.get("completed", {})
+    skippable = {}
+    pending = list(stages)
+    visited = set()
+    # Stages are visited in dependency order so a rerun stage also reruns its dependents
+    while pending:
+        pipeline_stage = next(s for s in pending if all(dep in visited for dep in s["deps"]))
+        pending.remove(pipeline_stage)
+        name = pipeline_stage["name"]
+        visited.add(name)
+        if name in completed and all(dep in skippable for dep in pipeline_stage["deps"]):
+            fingerprint = stage_fingerprint(pipeline_stage)
+            if completed[name] == fingerprint:
+                skippable[name] = fingerprint
+    if checkpoint.get("failed"):
+        print(f"{BLUE}Resuming '{checkpoint_name}' from the failed step ({checkpoint['failed']}).{NC}\n")
+    return skippable
+
+def run_pipeline(stages, max_workers=None, states=None, checkpoint_name=None, fail_fast=True):
+    """
+    Runs pipeline stages as a dependency graph on a bounded worker pool.
+    A stage starts as soon as all of its deps have finished, so independent
+    stages overlap and the pipeline takes critical-path time. The pipeline
+    fails fast: after the first failure no new stage is started.
+    Parameters:
+        stages: List of stage() dicts
+        max_workers: Pool size, defaults to max_parallel_stages
+        states: Optional dict that receives each stage's status/start/end by name
+        checkpoint_name: Name the completed stages are checkpointed under, so
+                         --resume can restart from the failed step
+        fail_fast: Set to False for independent stages that should all run
+    Returns:
+        True if every stage succeeded
+    """
+    validate_pipeline(stages)
+    max_workers = max_workers or max_parallel_stages
+    if states is None:
+        states = {}
+    states.update({s["name"]: {"status": "pending", "start": None, "end": None} for s in stages})
+    results = {}
+    completed = {}
+    if checkpoint_name and resume_pipeline:
+        completed = plan_resume(stages, checkpoint_name)
+        for name in completed:
+            states[name].update(status="resumed", start=time.time(), end=time.time())
+            results[name] = ("resumed", "", "")
+    # With --tail the stage output is printed line by line instead of the live display; a
+    # pipeline started from another pipeline's stage prints plain lines into the outer display
+    live = sys.stdout.isatty() and not live_tail and not isinstance(sys.stdout, LiveDisplayOutput)
+    lock = threading.Lock()
+    pipeline_span = begin_span("pipeline", "pipeline", {"stages": [s["name"] for s in stages]})
+
+    def worker(pipeline_stage):
+        with lock:
+            states[pipeline_stage["name"]].update(status="running", start=time.time())
+        status, stdout, stderr = run_stage(pipeline_stage, parent=pipeline_span)
+        with lock:
+            states[pipeline_stage["name"]].update(status=status, end=time.time())
+        return status, stdout, stderr
+
+    # While the display is live, anything the stages print goes through it
+    display = LiveDisplayOutput(stages, states, sys.stdout) if live else None
+    with contextlib.redirect_stdout(display) if live else contextlib.nullcontext():
+        if live:
+            display.render()
+        else:
+            for pipeline_stage in stages:
+                if pipeline_stage["name"] in completed:
+                    print(format_stage_line(pipeline_stage, states[pipeline_stage["name"]], time.time()), flush=True)
+        running = {}
+        failed = None
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while len(results) < len(stages) and (running or failed is None or not fail_fast):
+                # Submit every stage whose deps have all finished, until something fails
+                for pipeline_stage in stages:
+                    name = pipeline_stage["name"]
+                    if (failed is not None and fail_fast) or name in results or name in running.values():
+                        continue
+                    if all(dep in results for dep in pipeline_stage["deps"]):
+                        running[pool.submit(worker, pipeline_stage)] = name
+                finished, _ = wait(list(running), timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if results[name][0] == "failed":
+                        failed = failed or name
+                    else:
+                        completed[name] = stage_fingerprint(next(s for s in stages if s["name"] == name))
+                    if checkpoint_name:
+                        save_checkpoint(checkpoint_name, completed, failed)
+                    if not live:
+                        state = states[name]
+                        with print_lock:
+                            print(format_stage_line(next(s for s in stages if s["name"] == name), state, state["end"]), flush=True)
+                if live:
+                    display.render()
+        # Stages that never started because of the failure
+        for pipeline_stage in stages:
+            if pipeline_stage["name"] not in results:
+                states[pipeline_stage["name"]]["status"] = "skipped"
+                results[pipeline_stage["name"]] = ("skipped", "", "")
+                if not live:
+                    print(format_stage_line(pipeline_stage, states[pipeline_stage["name"]], time.time()), flush=True)
+        if live:
+            display.render()
+            display.close_display()
+    end_span(pipeline_span, status="failed" if failed else "done")
+    if checkpoint_name and not failed:
+        save_checkpoint(checkpoint_name, None, None)
+
+    # Show the output of failed stages once the display has settled
+    for pipeline_stage in stages:
+        status, stdout, stderr = results[pipeline_stage["name"]]
+        if status == "failed":
+            print(f"\n{RED}{pipeline_stage['description']} failed: {command_line(pipeline_stage['cmd'])}{NC}")
+            print_process_output(stdout, stderr)
+            show_step_errors(archived_step(pipeline_stage["name"]))
+    if failed and checkpoint_name:
+        print(f"\n{YELLOW}Fix the problem and rerun with --resume to continue from '{failed}'.{NC}")
+    return failed is None
 
 def open_directory(directory_path):
     """Opens a directory based on the operating system"""
@@ -154,20 +1009,17 @@ def build_apk():
     """Build APK (Full Process)"""
     print(f"{YELLOW}Building APK (Full Process)...{NC}\n")
 
-    # Clean the project
-    run_flutter_command(["flutter", "clean"], "Cleaning project...                                   ")
-    
-    # Get dependencies
-    run_flutter_command(["flutter", "pub", "get"], "Getting dependencies...                              ")
-    
-    # Generate build files
-    run_flutter_command(["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"], "Generating build files...                            ")
-    
-    # Build the APK
-    run_flutter_command([
-        "flutter", "build", "apk", "--release", "--obfuscate", "--target-platform", "android-arm64", "--split-debug-info=./"
-    ], "Building APK...                                      ")
+    keys = artifact_cache_keys(["apk"])
+    if not restore_artifacts(keys):
+        # Clean → pub get → build_runner, then build the APK
+        if not run_pipeline(prepare_stages() + [
+            stage("build_apk", BUILD_TARGETS["apk"]["cmd"], BUILD_TARGETS["apk"]["description"], deps=["build_runner"]),
+        ], checkpoint_name="apk"):
+            print(f"\n{RED}✗ APK build failed!{NC}")
+            return False
+        store_artifacts(keys)
     print(f"\n{GREEN}✓ APK built successfully!{NC}")
+    store_target_symbols(["apk"])
     
     # Display APK size
     display_apk_size()
@@ -179,17 +1031,17 @@ def build_apk():
 def build_apk_split_per_abi():
     """Build APK with --split-per-abi"""
     print(f"{YELLOW}Building APK (split-per-abi)...{NC}\n")
-    # Clean the project
-    run_flutter_command(["flutter", "clean"], "Cleaning project...                                   ")
-    # Get dependencies
-    run_flutter_command(["flutter", "pub", "get"], "Getting dependencies...                              ")
-    # Generate build files
-    run_flutter_command(["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"], "Generating build files...                            ")
-    # Build APK with split-per-abi
-    run_flutter_command([
-        "flutter", "build", "apk", "--release", "--split-per-abi", "--obfuscate", "--split-debug-info=./"
-    ], "Building APK (split-per-abi)...                      ")
+    keys = artifact_cache_keys(["apk-split"])
+    if not restore_artifacts(keys):
+        # Clean → pub get → build_runner, then build APK with split-per-abi
+        if not run_pipeline(prepare_stages() + [
+            stage("build_apk_split", BUILD_TARGETS["apk-split"]["cmd"], BUILD_TARGETS["apk-split"]["description"], deps=["build_runner"]),
+        ], checkpoint_name="apk-split"):
+            print(f"\n{RED}✗ APK (split-per-abi) build failed!{NC}")
+            return False
+        store_artifacts(keys)
     print(f"\n{GREEN}✓ APK (split-per-abi) built successfully!{NC}")
+    store_target_symbols(["apk-split"])
     # Display APK size
     display_apk_size()
     # Open the directory containing the APK
@@ -199,122 +1051,362 @@ def build_apk_split_per_abi():
 def build_aab():
     """Build AAB"""
     print(f"{YELLOW}Building AAB...{NC}\n")
-    # Clean the project
-    run_flutter_command(["flutter", "clean"], "Cleaning project...                                   ")
-    # Get dependencies
-    run_flutter_command(["flutter", "pub", "get"], "Getting dependencies...                              ")
-    # Generate build files
-    run_flutter_command(["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"], "Generating build files...                            ")
-    # Build AAB
-    run_flutter_command(["flutter", "build", "appbundle", "--release", "--obfuscate", "--split-debug-info=./"], "Building AAB...                                      ")
+    keys = artifact_cache_keys(["aab"])
+    if not restore_artifacts(keys):
+        # Clean → pub get → build_runner, then build AAB
+        if not run_pipeline(prepare_stages() + [
+            stage("build_aab", BUILD_TARGETS["aab"]["cmd"], BUILD_TARGETS["aab"]["description"], deps=["build_runner"]),
+        ], checkpoint_name="aab"):
+            print(f"\n{RED}✗ AAB build failed!{NC}")
+            return False
+        store_artifacts(keys)
     print(f"\n{GREEN}✓ AAB built successfully!{NC}")
+    store_target_symbols(["aab"])
+    report_artifact_sizes(sorted(glob.glob(BUILD_TARGETS["aab"]["outputs"])))
     # Open the directory containing the AAB
     open_directory("build/app/outputs/bundle/release/")
 
+@timer_decorator
+def build_targets(targets):
+    """
+    Builds several release artifacts in one call, e.g. `apk aab apk-split`.
+    Clean → pub get → build_runner runs once and the artifacts are built after it.
+    Parameters:
+        targets: List of BUILD_TARGETS keys, in build order
+    """
+    print(f"{YELLOW}Building {', '.join(targets)}...{NC}\n")
+    keys = artifact_cache_keys(targets)
+    states = {}
+    hits = cached_targets(keys)
+    remaining = [target for target in targets if target not in hits]
+    success = True
+    if remaining:
+        stages = prepare_stages()
+        previous = "build_runner"
+        for target in remaining:
+            # Artifacts share build/ and the Gradle daemon, so they run one after another
+            stages.append(stage(f"build_{target}", BUILD_TARGETS[target]["cmd"], BUILD_TARGETS[target]["description"], deps=[previous]))
+            previous = f"build_{target}"
+        success = run_pipeline(stages, states=states, checkpoint_name="+".join(remaining))
+        store_artifacts({target: keys[target] for target in remaining
+                         if target in keys and states[f"build_{target}"]["status"] in ("done", "cached")})
+    # Restored only now: the pipeline's `flutter clean` would delete them
+    restored = restore_artifacts({target: keys[target] for target in hits})
+    for target in hits:
+        restored_at = time.time()
+        states[f"build_{target}"] = {"status": "cached" if target in restored else "failed",
+                                     "start": restored_at, "end": restored_at}
+        if target not in restored:
+            print(f"  {CROSS} {target:<10} {RED}could not be restored from the artifact cache, rerun with --force{NC}")
+            success = False
+    display_target_report(targets, states)
+    store_target_symbols([target for target in targets if states[f"build_{target}"]["status"] in ("done", "cached")])
+    if not success:
+        return False
+    for directory in dict.fromkeys(BUILD_TARGETS[target]["directory"] for target in targets):
+        open_directory(directory)
+
+def display_target_report(targets, states):
+    """Prints build time and output sizes for each artifact of a batch build"""
+    print(f"\n{BLUE}Artifacts:{NC}")
+    for target in targets:
+        state = states[f"build_{target}"]
+        if state["status"] == "skipped":
+            print(f"  {YELLOW}- {target:<10} {'':>10}  not built{NC}")
+            continue
+        minutes, seconds = divmod(state["end"] - state["start"], 60)
+        duration = f"{int(minutes)}m {seconds:.1f}s"
+        if state["status"] == "failed":
+            print(f"  {RED}{CROSS} {target:<10} {duration:>10}  build failed{NC}")
+            continue
+        output_files = sorted(glob.glob(BUILD_TARGETS[target]["outputs"]))
+        if not output_files:
+            print(f"  {RED}{CROSS} {target:<10} {duration:>10}  no output in {BUILD_TARGETS[target]['directory']}{NC}")
+            continue
+        for index, path in enumerate(output_files):
+            size_mb = round(os.path.getsize(path) / 1048576, 2)
+            label = f"{CHECKMARK} {target:<10} {duration:>10}" if index == 0 else " " * 24
+            print(f"  {label}  {BLUE}{os.path.basename(path)} | Size: {size_mb} MB{NC}")
+    built = [path for target in targets if states[f"build_{target}"]["status"] in ("done", "cached")
+             for path in sorted(glob.glob(BUILD_TARGETS[target]["outputs"]))]
+    if built:
+        report_artifact_sizes(list(dict.fromkeys(built)))
+
 def generate_lang():
     """Generate localization files"""
     # Run flutter gen-l10n to generate localization files
-    run_flutter_command(["flutter", "gen-l10n"], "Generating localizations                              ")
+    if not run_flutter_command(["flutter", "gen-l10n"], "Generating localizations                              ", inputs=gen_l10n_inputs(), outputs=gen_l10n_outputs()):
+        print(f"\n{RED}✗ Localization generation failed!{NC}")
+        return False
     print(f"\n{CHECKMARK}  Localizations generated successfully.")
 
-def run_build_runner():
-    """Run build_runner to generate Dart code"""
+def run_build_runner(watch=False, stop=False):
+    """
+    Run build_runner to generate Dart code
+    Parameters:
+        watch: Start a background `build_runner watch` daemon first (db --watch)
+        stop: Stop the daemon instead of building (db --stop)
+    """
+    if stop:
+        return stop_build_runner_daemon()
+    if watch:
+        start_build_runner_daemon()
+    if build_runner_daemon_status():
+        print(f"{YELLOW}Waiting for build_runner daemon...{NC}  \n")
+        result = wait_with_spinner("Running build_runner     ", wait_for_build_runner_daemon)
+        if result is not None:
+            if not result:
+                print_process_output(build_runner_daemon_log_tail(), "")
+            return result
+        print(f"{YELLOW}build_runner daemon exited, running a normal build.{NC}")
     print(f"{YELLOW}Executing build_runner...{NC}  \n")
-    run_flutter_command(["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"], "Running build_runner     ")
+    return run_flutter_command(BUILD_RUNNER_CMD, "Running build_runner     ", inputs=build_runner_inputs(), outputs=build_runner_outputs())
 
 @timer_decorator
-def full_setup():
-    """Perform full project setup"""
+def full_setup(changed=None):
+    """
+    Perform full project setup
+    Parameters:
+        changed: Dart files to analyze and format (--changed); None for the whole tree
+    """
     print(f"{YELLOW}Performing full setup...{NC}  \n")
-    # Clean the project
-    run_flutter_command(["flutter", "clean"], "Cleaning project...                                  ")
-    # Upgrade dependencies
-    run_flutter_command(["flutter", "pub", "upgrade"], "Upgrading dependencies...                            ")
-    # Run build_runner
-    run_flutter_command(["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"], "Running build_runner...                              ")
-    # Generate localizations
-    run_flutter_command(["flutter", "gen-l10n"], "Generating localizations...                          ")
-    # Refresh dependencies
-    run_flutter_command(["flutter", "pub", "upgrade"], "Refreshing dependencies...                           ")
-    # Analyze code
-    run_flutter_command(["flutter", "analyze"], "Analyzing code...                                    ")
-    # Format code
-    run_flutter_command(["dart", "format", "."], "Formatting code...                                   ")
+    if not run_pipeline([
+        stage("clean", CLEAN_CMD, "Cleaning project..."),
+        *pub_stages("pub_upgrade", ["flutter", "pub", "upgrade"], "Upgrading dependencies...", deps=["clean"]),
+        # Code generation and localizations don't depend on each other
+        stage("build_runner", BUILD_RUNNER_CMD, "Running build_runner...", deps=pub_stage_names("pub_upgrade"),
+              inputs=build_runner_inputs(), outputs=build_runner_outputs()),
+        stage("gen_l10n", ["flutter", "gen-l10n"], "Generating localizations...", deps=pub_stage_names("pub_upgrade"),
+              inputs=gen_l10n_inputs(), outputs=gen_l10n_outputs()),
+        *pub_stages("pub_refresh", ["flutter", "pub", "upgrade"], "Refreshing dependencies...", deps=["build_runner", "gen_l10n"]),
+        # Analyze and format run side by side
+        code_stage("analyze", "analyze", "Analyzing code...", deps=pub_stage_names("pub_refresh"), files=changed),
+        code_stage("format", "format", "Formatting code...", deps=pub_stage_names("pub_refresh"), files=changed),
+    ], checkpoint_name="setup"):
+        print(f"\n{RED}✗ Full setup failed!{NC}")
+        return False
     print(f"\n {GREEN}✓  Full setup completed successfully.  {NC}")
 
 def repair_cache():
     """Repair pub cache"""
     print(f"{YELLOW}Repairing pub cache...{NC}\n")
-    run_flutter_command(["flutter", "pub", "cache", "repair"], "Repairing pub cache...                               ")
+    if not run_flutter_command(["flutter", "pub", "cache", "repair"], "Repairing pub cache...                               "):
+        print(f"\n{RED}✗ Pub cache repair failed!{NC}")
+        return False
     print(f"\n {GREEN}✓  Pub cache repaired successfully.  {NC}")
 
 @timer_decorator
-def cleanup_project():
-    """Clean up project"""
+def cleanup_project(changed=None):
+    """
+    Clean up project
+    Parameters:
+        changed: Dart files to fix and format (--changed); None for the whole tree
+    """
     print(f"{YELLOW}Cleaning up project...{NC}\n")
-    run_flutter_command(["flutter", "clean"], "Cleaning project...                                   ")
-    # Get dependencies
-    run_flutter_command(["flutter", "pub", "get"], "Getting dependencies...                              ")
-
-    #fix code Issues
-    run_flutter_command(["dart", "fix", "--apply"], "Fixing code issues...                                   ")
-
-    # Format code
-    run_flutter_command(["dart", "format", "."], "Following dart guidelines...                                   ")
-
-    #Upgrade with major version
-    run_flutter_command(["flutter", "pub", "upgrade", "--major-versions"], "Upgrading major versions...                            ")
+    if not run_pipeline([
+        stage("clean", CLEAN_CMD, "Cleaning project..."),
+        *pub_stages("pub_get", ["flutter", "pub", "get"], "Getting dependencies...", deps=["clean"], cached=True),
+        # fix and format both rewrite sources, so they stay in sequence
+        code_stage("fix", "fix", "Fixing code issues...", deps=pub_stage_names("pub_get"), files=changed),
+        code_stage("format", "format", "Following dart guidelines...", deps=["fix"], files=changed),
+        # The major upgrade only touches pubspec files and runs alongside format
+        *pub_stages("pub_upgrade_major", ["flutter", "pub", "upgrade", "--major-versions"], "Upgrading major versions...", deps=["fix"]),
+    ], checkpoint_name="cleanup"):
+        print(f"\n{RED}✗ Project cleanup failed!{NC}")
+        return False
     print(f"\n{GREEN}✓ Project cleaned successfully!{NC}")
 
 @timer_decorator
 def release_run():
     """Build & Install Release APK"""
     print(f"{YELLOW}Building & Installing Release APK...{NC}\n")
-    run_flutter_command(["flutter", "clean"], "Cleaning project...                                   ")
-    run_flutter_command(["flutter", "pub", "get"], "Getting dependencies...                              ")
-    run_flutter_command(["flutter", "gen-l10n"], "Generating localizations...                          ")
-    run_flutter_command(["dart", "run", "build_runner", "build", "--delete-conflicting-outputs"], "Generating build files...                            ")
-    run_flutter_command(["flutter", "build", "apk", "--release", "--obfuscate", "--target-platform", "android-arm64", "--split-debug-info=./"], "Building APK...                                      ")
+    keys = artifact_cache_keys(["apk"])
+    if not restore_artifacts(keys):
+        if not run_pipeline(prepare_stages(with_l10n=True) + [
+            stage("build_apk", BUILD_TARGETS["apk"]["cmd"], BUILD_TARGETS["apk"]["description"], deps=["gen_l10n", "build_runner"]),
+        ], checkpoint_name="release-run"):
+            print(f"\n{RED}✗ APK build failed, nothing was installed!{NC}")
+            return False
+        store_artifacts(keys)
+    store_target_symbols(["apk"])
     display_apk_size()
     install_result = install_apk()
     if install_result:
         print(f"\n{GREEN}✓ APK built and installed successfully!{NC}")
     else:
         print(f"\n{RED}✗ APK built but install failed!{NC}")
+        return False
+
+# ============================================================================
+# DEVICE INSTALL FUNCTIONS
+# ============================================================================
+
+APP_PACKAGE = "com.royalcourtbd.dhaka_bus"
+APK_OUTPUT_DIR = "build/app/outputs/flutter-apk"
+
+# Per device serial: SHA-256 and on-device version of the last APK installed
+INSTALL_CACHE_FILE = os.path.join(STATE_DIR, "install_cache.json")
+install_cache_lock = threading.Lock()
+
+def run_adb(cmd_list, include_stderr=True):
+    """
+    Runs an adb command and captures its output.
+    Parameters:
+        include_stderr: Append stderr to the output; off for output that is parsed,
+                        since adb reports daemon start-up ("* daemon started ...") there
+    Returns:
+        (success, output); `adb install` can exit 0 while printing "Failure [...]"
+    """
+    try:
+        process = start_process(cmd_list)
+    except OSError as e:
+        return False, str(e)
+    stdout, stderr = finish_capture(capture_output(process))
+    output = (stdout or "") + ((stderr or "") if include_stderr else "")
+    return process.returncode == 0 and "Failure [" not in output, output
+
+def list_adb_devices():
+    """
+    Lists attached devices from `adb devices`.
+    Returns:
+        (ready, unavailable): serials in the "device" state, and (serial, state)
+        pairs for unauthorized/offline ones
+    """
+    success, output = run_adb(["adb", "devices"], include_stderr=False)
+    ready, unavailable = [], []
+    if not success:
+        return ready, unavailable
+    for line in output.splitlines():
+        # Skip the header and daemon notices ("* daemon not running; starting now")
+        if not line.strip() or line.startswith(("*", "List of devices")):
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            if parts[1] == "device":
+                ready.append(parts[0])
+            else:
+                unavailable.append((parts[0], parts[1]))
+    return ready, unavailable
+
+def get_device_abis(serial):
+    """ABIs a device supports, most preferred first"""
+    for prop in ("ro.product.cpu.abilist", "ro.product.cpu.abi"):
+        success, output = run_adb(["adb", "-s", serial, "shell", "getprop", prop])
+        abis = [abi.strip() for abi in output.strip().split(",") if abi.strip()] if success else []
+        if abis:
+            return abis
+    return []
+
+def select_apk_for_abis(apk_files, abis):
+    """Picks the split APK matching the first supported ABI, else the universal app-release.apk"""
+    by_name = {os.path.basename(path): path for path in apk_files}
+    for abi in abis:
+        if f"app-{abi}-release.apk" in by_name:
+            return by_name[f"app-{abi}-release.apk"]
+    return by_name.get("app-release.apk")
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_installed_package_info(serial):
+    """
+    Reads the installed app's version and last update time from `dumpsys package`.
+    Returns:
+        Dict with version_code/version_name/last_update_time, or None if the app isn't installed
+    """
+    success, output = run_adb(["adb", "-s", serial, "shell", "dumpsys", "package", APP_PACKAGE])
+    if not success:
+        return None
+    info = {}
+    for key, field in (("version_code", "versionCode"), ("version_name", "versionName"), ("last_update_time", "lastUpdateTime")):
+        match = re.search(rf'{field}=(\S+(?: \d\d:\d\d:\d\d)?)', output)
+        if match:
+            info[key] = match.group(1)
+    return info if "last_update_time" in info else None
+
+def install_on_device(serial, apk_path, apk_digest=None):
+    """
+    Installs an APK on one device, uninstalling the app and retrying on failure
+    (e.g. signature mismatch). Skipped when the install cache shows this exact
+    APK is already on the device and the device still reports the same install.
+    Returns:
+        (status, output) with status "done", "cached" or "failed"
+    """
+    apk_digest = apk_digest or file_sha256(apk_path)
+    entry = read_json(INSTALL_CACHE_FILE, {}).get(serial)
+    if use_step_cache and entry and entry.get("apk_sha256") == apk_digest:
+        # Cheap on-device check: catches uninstalls and installs made outside this script
+        info = get_installed_package_info(serial)
+        if info and all(info.get(key) == entry.get(key) for key in ("version_code", "last_update_time")):
+            return "cached", ""
+
+    success, output = run_adb(["adb", "-s", serial, "install", "-r", apk_path])
+    if not success:
+        _, uninstall_output = run_adb(["adb", "-s", serial, "uninstall", APP_PACKAGE])
+        success, retry_output = run_adb(["adb", "-s", serial, "install", apk_path])
+        output = "\n".join([output, "[uninstall and retry]", uninstall_output, retry_output])
+    if not success:
+        return "failed", output
+
+    info = get_installed_package_info(serial) or {}
+    with install_cache_lock:
+        cache = read_json(INSTALL_CACHE_FILE, {})
+        cache[serial] = dict(info, apk=os.path.basename(apk_path), apk_sha256=apk_digest,
+                             time=time.strftime("%Y-%m-%d %H:%M:%S"))
+        write_json_atomic(INSTALL_CACHE_FILE, cache)
+    return "done", output
 
 def install_apk():
     """
-    Installs the built APK on a connected Android device using adb.
-    Tries to install arm64-v8a APK first if available.
-    Handles signature mismatch by uninstalling existing app first.
+    Installs the built APK on every connected Android device using adb.
+    Each device gets the split APK matching its ABI (or the universal APK),
+    and all devices are installed concurrently.
+    Handles signature mismatch by uninstalling existing app first, per device.
     """
-    apk_files = glob.glob("build/app/outputs/flutter-apk/*.apk")
+    apk_files = glob.glob(f"{APK_OUTPUT_DIR}/*.apk")
     if not apk_files:
         print(f"{RED}No APK found to install!{NC}")
         return False
-    
-    # Try to install arm64-v8a APK first, otherwise use the first apk
-    target_apk = None
-    for apk_path in apk_files:
-        if "arm64-v8a" in apk_path:
-            target_apk = apk_path
-            break
-    if not target_apk:
-        target_apk = apk_files[0]
-    
-    print(f"{YELLOW}Installing {target_apk}...{NC}")
-    
-    # First try normal install
-    success = run_flutter_command(["adb", "install", "-r", target_apk], "Installing on device...                              ")
-    
-    if not success:
-        print(f"{YELLOW}Installation failed, trying to uninstall existing app first...{NC}")
-        # Try to uninstall existing app first
-        run_flutter_command(["adb", "uninstall", "com.royalcourtbd.dhaka_bus"], "Uninstalling existing app...                        ")
-        # Then try to install again
-        success = run_flutter_command(["adb", "install", target_apk], "Reinstalling on device...                           ")
-    
-    return success
+
+    devices, unavailable = list_adb_devices()
+    for serial, state in unavailable:
+        print(f"{YELLOW}Skipping {serial}: device is {state}.{NC}")
+    if not devices:
+        print(f"{RED}No connected device found (adb devices)!{NC}")
+        return False
+
+    with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+        device_abis = dict(zip(devices, pool.map(get_device_abis, devices)))
+
+    stages = []
+    missing = []
+    digests = {}
+    for serial in devices:
+        target_apk = select_apk_for_abis(apk_files, device_abis[serial])
+        if not target_apk:
+            missing.append(serial)
+            print(f"{RED}No APK for {serial} (ABIs: {', '.join(device_abis[serial]) or 'unknown'}).{NC}")
+            continue
+        if target_apk not in digests:
+            digests[target_apk] = file_sha256(target_apk)
+        abi = device_abis[serial][0] if device_abis[serial] else "unknown ABI"
+        stages.append(stage(
+            f"install_{serial}", ["adb", "-s", serial, "install", "-r", target_apk],
+            f"{serial} ({abi}) ← {os.path.basename(target_apk)}",
+            action=lambda serial=serial, target_apk=target_apk: install_on_device(serial, target_apk, digests[target_apk]),
+        ))
+    if not stages:
+        return False
+
+    print(f"{YELLOW}Installing on {len(stages)} device(s)...{NC}")
+    # Installs are independent, so a failed device does not stop the others
+    success = run_pipeline(stages, max_workers=len(stages), fail_fast=False)
+    return success and not missing
 
 @timer_decorator
 def update_pods():
@@ -333,59 +1425,1164 @@ def update_pods():
             run_flutter_command(["sleep", "0.1"], "Removing Podfile.lock                                 ")
     except FileNotFoundError:
         pass
-    # Update pod repo
-    run_flutter_command(["pod", "repo", "update"], "Updating pod repository                               ")
-    # Install pods
-    run_flutter_command(["pod", "install"], "Installing pods                                       ")
+    # Update pod repo, then install pods; stop at the first failure
+    success = (run_flutter_command(["pod", "repo", "update"], "Updating pod repository                               ")
+               and run_flutter_command(["pod", "install"], "Installing pods                                       "))
     # Return to root directory
     os.chdir(current_dir)
+    if not success:
+        print(f"\n{RED}✗ Updating iOS pods failed!{NC}")
+        return False
     print(f"\n{GREEN}✓ iOS pods updated successfully!{NC}")
 
 # ============================================================================
-# GIT TAG FUNCTIONS
+# ARTIFACT SIZE ANALYSIS
 # ============================================================================
 
-def get_version_from_pubspec():
-    """Get the version from pubspec.yaml using regex"""
-    if os.path.isfile("pubspec.yaml"):
+# Size history lives with the other tool state: the pipelines run `flutter clean`,
+# which would wipe anything kept under build/
+SIZE_HISTORY_FILE = os.path.join(STATE_DIR, "size_history.json")
+SIZE_HISTORY_LIMIT = 200
+SIZE_REPORT_FILE = "build/size_report.json"
+
+# Growth (in percent of the previous build) flagged as a size regression (--size-threshold)
+size_growth_threshold = 5.0
+# Category changes smaller than this are noise and never flagged
+SIZE_MIN_FLAGGED_BYTES = 10 * 1024
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".woff", ".woff2")
+
+def pubspec_full_version():
+    """version from pubspec.yaml including the build number (e.g. 1.0.0+1), or None"""
+    try:
         with open("pubspec.yaml", 'r', encoding='utf-8') as file:
-            try:
-                content = file.read()
-                # Use regex to find the version field in pubspec.yaml
-                version_match = re.search(r'^version:\s*(.+)$', content, re.MULTILINE)
-                if version_match:
-                    version = version_match.group(1).strip()
-                    # Remove quotes if present and split by + to get only version number
-                    version = version.strip('"\'').split('+')[0]
-                    return version
-                else:
-                    print(f"{RED}Error: Could not find 'version' field in pubspec.yaml.{NC}")
-                    return None
-            except Exception as e:
-                print(f"{RED}Error: Could not read pubspec.yaml: {e}{NC}")
-                return None
-    else:
-        print(f"{RED}Error: pubspec.yaml not found in the current directory.{NC}")
-        print(f"Please run this command from the root of a Flutter project.")
+            match = re.search(r'^version:\s*(.+)$', file.read(), re.MULTILINE)
+    except OSError:
         return None
+    return match.group(1).strip().strip('"\'') if match else None
 
-def create_and_push_tag():
-    """Create git tag from pubspec version and push to remote"""
-    print(f"{YELLOW}Creating and pushing git tag...{NC}\n")
-    
-    # Get version from pubspec.yaml
-    version = get_version_from_pubspec()
-    if not version:
-        return False
-    
-    tag_name = f"v{version}"
-    
-    print(f"{BLUE}Version found: {version}{NC}")
-    print(f"{BLUE}Tag name: {tag_name}{NC}\n")
-    
-    # Check if tag already exists
+def size_category(entry_name, bundle=False):
+    """
+    Category of one APK/AAB entry
+    Parameters:
+        bundle: The entry is from an AAB, where files live under their module (base/dex/...)
+    """
+    parts = entry_name.split("/")
+    if bundle and len(parts) > 1:
+        parts = parts[1:]
+    name = parts[-1]
+    if name.lower().endswith(FONT_EXTENSIONS):
+        return "fonts"
+    if parts[0] == "dex" or (len(parts) == 1 and name.endswith(".dex")):
+        return "dex"
+    if parts[0] == "lib" and len(parts) > 2:
+        return f"native/{parts[1]}"
+    if parts[0] == "assets" and len(parts) > 1 and parts[1] == "flutter_assets":
+        return "flutter assets"
+    if parts[0] in ("res", "manifest") or name in ("resources.arsc", "resources.pb", "AndroidManifest.xml"):
+        return "resources"
+    return "other"
+
+def analyze_artifact(path):
+    """
+    Breaks an APK/AAB down by category using only the zip central directory
+    (nothing is extracted).
+    Returns:
+        Dict with the file size and, per category, compressed/uncompressed bytes
+        and file count. None if the file is not a valid zip.
+    """
+    bundle = path.endswith(".aab")
     try:
-        result = subprocess.run(["git", "tag", "-l", tag_name], 
+        with zipfile.ZipFile(path) as archive:
+            entries = archive.infolist()
+    except (OSError, zipfile.BadZipFile):
+        return None
+    categories = {}
+    for entry in entries:
+        if entry.is_dir():
+            continue
+        totals = categories.setdefault(size_category(entry.filename, bundle), {"compressed": 0, "uncompressed": 0, "files": 0})
+        totals["compressed"] += entry.compress_size
+        totals["uncompressed"] += entry.file_size
+        totals["files"] += 1
+    return {"size": os.path.getsize(path), "categories": dict(sorted(categories.items()))}
+
+def format_bytes(size):
+    """Human readable size, signed sizes keep their sign"""
+    sign = "-" if size < 0 else ""
+    size = abs(size)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{sign}{size:.0f} {unit}" if unit == "B" else f"{sign}{size:.2f} {unit}"
+        size /= 1024
+
+def format_delta(size):
+    """Size change with an explicit sign"""
+    return f"+{format_bytes(size)}" if size > 0 else format_bytes(size)
+
+def diff_artifact(current, previous):
+    """
+    Size changes of an artifact against its previous build
+    Returns:
+        (total_delta, category_deltas, regressions) where regressions lists
+        descriptions of growth above size_growth_threshold
+    """
+    regressions = []
+    total_delta = current["size"] - previous["size"]
+    if previous["size"] and total_delta * 100 / previous["size"] > size_growth_threshold:
+        regressions.append(f"total grew {total_delta * 100 / previous['size']:.1f}% ({format_delta(total_delta)})")
+    category_deltas = {}
+    for category in sorted(set(current["categories"]) | set(previous["categories"])):
+        now = current["categories"].get(category, {}).get("compressed", 0)
+        before = previous["categories"].get(category, {}).get("compressed", 0)
+        if now == before:
+            continue
+        category_deltas[category] = now - before
+        growth = (now - before) * 100 / before if before else float("inf")
+        if now - before >= SIZE_MIN_FLAGGED_BYTES and growth > size_growth_threshold:
+            label = "new" if not before else f"{growth:.1f}%"
+            regressions.append(f"{category} grew {label} ({format_delta(now - before)})")
+    return total_delta, category_deltas, regressions
+
+def report_artifact_sizes(paths, record=True):
+    """
+    Prints the size breakdown of each artifact and its diff against the previous
+    build of the same file, flags growth above the threshold and writes
+    build/size_report.json.
+    Parameters:
+        paths: APK/AAB files to analyze
+        record: Append this build to the size history
+    Returns:
+        False if any artifact grew above the threshold
+    """
+    history = read_json(SIZE_HISTORY_FILE, [])
+    version = pubspec_full_version()
+    report = {"version": version, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "threshold_percent": size_growth_threshold, "artifacts": {}}
+    for path in paths:
+        name = os.path.basename(path)
+        analysis = analyze_artifact(path)
+        if analysis is None:
+            print(f"{BLUE}{name} | Size: {round(os.path.getsize(path) / 1048576, 2)} MB{NC} {YELLOW}(not a zip, no breakdown){NC}")
+            continue
+        previous = next((entry for entry in reversed(history) if name in entry["artifacts"]), None)
+        print(f"\n{BLUE}{name} | Size: {format_bytes(analysis['size'])}{NC}"
+              + (f"  (previous build {previous['version']}, {previous['time']})" if previous else ""))
+        deltas, regressions, total_delta = {}, [], None
+        if previous:
+            total_delta, deltas, regressions = diff_artifact(analysis, previous["artifacts"][name])
+        for category, totals in analysis["categories"].items():
+            change = f"  {format_delta(deltas[category]):>10}" if category in deltas else ""
+            print(f"  {category:<22} {format_bytes(totals['compressed']):>10}  "
+                  f"({totals['files']} files, {format_bytes(totals['uncompressed'])} uncompressed){change}")
+        for category in deltas:
+            if category not in analysis["categories"]:
+                print(f"  {category:<22} {'removed':>10}  {format_delta(deltas[category]):>10}")
+        if total_delta is not None:
+            color = RED if regressions else (GREEN if total_delta <= 0 else YELLOW)
+            print(f"  {'total change':<22} {color}{format_delta(total_delta):>10}{NC}")
+        for regression in regressions:
+            print(f"  {CROSS} {RED}Size regression: {regression} (threshold {size_growth_threshold}%){NC}")
+        report["artifacts"][name] = dict(analysis, path=path, previous=previous["artifacts"][name] if previous else None,
+                                         total_delta=total_delta, category_deltas=deltas, regressions=regressions)
+    if not report["artifacts"]:
+        return True
+    write_json_atomic(SIZE_REPORT_FILE, report)
+    print(f"\n{BLUE}Size report written to {SIZE_REPORT_FILE}{NC}")
+    if record:
+        history.append({"version": version, "time": report["time"],
+                        "artifacts": {name: {"size": artifact["size"], "categories": artifact["categories"]}
+                                      for name, artifact in report["artifacts"].items()}})
+        write_json_atomic(SIZE_HISTORY_FILE, history[-SIZE_HISTORY_LIMIT:])
+    return not any(artifact["regressions"] for artifact in report["artifacts"].values())
+
+def show_artifact_sizes():
+    """Breaks down the artifacts currently in build/ against the last recorded build (size command)"""
+    paths = sorted(set(path for target in BUILD_TARGETS.values() for path in glob.glob(target["outputs"])))
+    if not paths:
+        print(f"{RED}No APK or AAB found in build/app/outputs/. Build one first.{NC}")
+        return False
+    return report_artifact_sizes(paths, record=False)
+
+# ============================================================================
+# ARTIFACT CACHE
+# ============================================================================
+
+# Release outputs (and their split-debug-info symbols) keyed by source tree,
+# build flags and toolchain. Outside the project by default so every checkout
+# shares it; point it at a shared filesystem to serve a whole team.
+artifact_cache_dir = os.environ.get("FLUTTER_BUILD_ARTIFACT_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".cache", "flutter_build", "artifacts")
+# Least recently used entries are evicted above this size (--artifact-cache-size or
+# FLUTTER_BUILD_ARTIFACT_CACHE_MB, in MB); resolved on first use by artifact_cache_limit()
+ARTIFACT_CACHE_DEFAULT_MB = 4096
+artifact_cache_max_bytes = None
+
+# Not part of the source tree hash: build output, tool and IDE state, other
+# platforms, tests and machine-specific files. Other dot-files (e.g. a bundled
+# .env asset) are hashed like any source.
+ARTIFACT_CACHE_EXCLUDED_DIRS = {"build", ".dart_tool", "node_modules", "Pods", "ios", "macos", "linux",
+                                "windows", "web", "test", "integration_test", ".git", ".github", ".idea",
+                                ".vscode", ".gradle", ".cxx", ".fvm", ".pub-cache", "__pycache__", STATE_DIR}
+ARTIFACT_CACHE_EXCLUDED_FILES = ("local.properties", ".symbols", ".iml")
+# Written by pub get with machine-specific paths
+ARTIFACT_CACHE_GENERATED_FILES = {".flutter-plugins", ".flutter-plugins-dependencies", ".packages", ".DS_Store"}
+
+# `flutter --version --machine`, read once per run
+toolchain_version_info = None
+
+def artifact_cache_limit():
+    """Size limit of the artifact cache in bytes, falling back to the default on a malformed environment value"""
+    global artifact_cache_max_bytes
+    if artifact_cache_max_bytes is None:
+        value = os.environ.get("FLUTTER_BUILD_ARTIFACT_CACHE_MB", str(ARTIFACT_CACHE_DEFAULT_MB))
+        if not value.strip().isdigit():
+            print(f"{YELLOW}Warning: FLUTTER_BUILD_ARTIFACT_CACHE_MB={value!r} is not a size in MB; "
+                  f"using {ARTIFACT_CACHE_DEFAULT_MB}.{NC}")
+            value = str(ARTIFACT_CACHE_DEFAULT_MB)
+        artifact_cache_max_bytes = int(value) * 1048576
+    return artifact_cache_max_bytes
+
+def toolchain_version():
+    """Flutter framework/engine revisions and Dart SDK version, or None if flutter can't report them"""
+    global toolchain_version_info
+    if toolchain_version_info is None:
+        toolchain_version_info = ""
+        try:
+            process = start_process(["flutter", "--version", "--machine"])
+            stdout, _ = finish_capture(capture_output(process))
+            info = json.loads(stdout[stdout.index("{"):])
+            toolchain_version_info = " ".join(
+                str(info.get(key)) for key in ("frameworkRevision", "engineRevision", "dartSdkVersion"))
+        except (OSError, ValueError):
+            print(f"{YELLOW}Warning: Could not read the Flutter version; the artifact cache is disabled.{NC}")
+    return toolchain_version_info or None
+
+def source_tree_hash():
+    """Hashes the path and content of every file that goes into an Android release build"""
+    digest = hashlib.sha256()
+    for directory, subdirs, files in os.walk("."):
+        subdirs[:] = sorted(d for d in subdirs if d not in ARTIFACT_CACHE_EXCLUDED_DIRS)
+        for name in sorted(files):
+            if name in ARTIFACT_CACHE_GENERATED_FILES or name.endswith(ARTIFACT_CACHE_EXCLUDED_FILES):
+                continue
+            path = os.path.join(directory, name)
+            digest.update(f"\0{os.path.relpath(path)}\0".encode('utf-8'))
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def artifact_cache_keys(targets):
+    """
+    Cache key of each target, computed from the tree as it is before the build
+    Returns:
+        Dict of target → key (empty when the cache is off)
+    """
+    if not artifact_cache_dir:
+        return {}
+    toolchain = toolchain_version()
+    if toolchain is None:
+        return {}
+    tree = source_tree_hash()
+    return {
+        target: hashlib.sha256(f"{tree}\0{toolchain}\0{' '.join(BUILD_TARGETS[target]['cmd'])}".encode('utf-8')).hexdigest()
+        for target in targets
+    }
+
+def artifact_entry_dir(key):
+    """Directory of one cache entry"""
+    return os.path.join(artifact_cache_dir, key[:2], key)
+
+def symbol_files(target):
+    """split-debug-info symbol files written by a target's build command"""
+    for arg in BUILD_TARGETS[target]["cmd"]:
+        if arg.startswith("--split-debug-info="):
+            return sorted(glob.glob(os.path.join(arg.split("=", 1)[1], "*.symbols")))
+    return []
+
+def cached_artifact(key):
+    """
+    Manifest of a complete cache entry, or None if the entry is missing or a
+    blob doesn't have its recorded size
+    """
+    entry = artifact_entry_dir(key)
+    manifest = read_json(os.path.join(entry, "manifest.json"), None)
+    if not manifest:
+        return None
+    try:
+        if any(os.path.getsize(os.path.join(entry, file["blob"])) != file["size"] for file in manifest["files"]):
+            return None
+    except OSError:
+        return None
+    return manifest
+
+def cached_targets(keys):
+    """Targets with a complete cache entry, without restoring anything yet"""
+    if not use_step_cache:
+        return []
+    return [target for target, key in keys.items() if cached_artifact(key)]
+
+def restore_artifacts(keys):
+    """
+    Copies the cached outputs and symbols of each target back into place.
+    Run it after any `flutter clean`, which would delete what it restores.
+    Returns:
+        Targets that were restored; the others need a build
+    """
+    if not use_step_cache:
+        return []
+    restored = []
+    for target, key in keys.items():
+        entry = artifact_entry_dir(key)
+        manifest = cached_artifact(key)
+        if not manifest:
+            continue
+        try:
+            for file in manifest["files"]:
+                directory = os.path.dirname(file["path"])
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                shutil.copyfile(os.path.join(entry, file["blob"]), file["path"])
+            if not all(os.path.isfile(file["path"]) for file in manifest["files"]):
+                continue
+            # The manifest's mtime is the entry's last use for LRU eviction
+            os.utime(os.path.join(entry, "manifest.json"))
+        except OSError:
+            continue
+        print(f"  {CHECKMARK} {target:<10} restored from artifact cache ({key[:12]}, built {manifest['created']})")
+        restored.append(target)
+    return restored
+
+def store_artifacts(keys):
+    """Adds the outputs and symbols of freshly built targets to the cache, then evicts"""
+    if not keys:
+        return
+    for target, key in keys.items():
+        entry = artifact_entry_dir(key)
+        outputs = sorted(glob.glob(BUILD_TARGETS[target]["outputs"]))
+        if os.path.isdir(entry) or not outputs:
+            continue
+        # Built in a private directory and renamed into place, so concurrent
+        # builds sharing the cache never see a partial entry
+        staging = os.path.join(artifact_cache_dir, "tmp", f"{key}.{os.getpid()}")
+        try:
+            os.makedirs(staging)
+            files = []
+            for index, path in enumerate(outputs + symbol_files(target)):
+                blob = f"{index}-{os.path.basename(path)}"
+                shutil.copyfile(path, os.path.join(staging, blob))
+                files.append({"path": os.path.normpath(path), "blob": blob, "size": os.path.getsize(path)})
+            write_json_atomic(os.path.join(staging, "manifest.json"), {
+                "target": target,
+                "version": pubspec_full_version(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "files": files,
+            })
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            os.rename(staging, entry)
+        except OSError as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(entry):
+                print(f"{YELLOW}Warning: Could not cache {target} artifacts: {e}{NC}")
+    evict_artifacts()
+
+def evict_artifacts():
+    """Removes least recently used entries until the cache fits artifact_cache_limit()"""
+    entries = []
+    total = 0
+    for manifest_path in glob.glob(os.path.join(artifact_cache_dir, "??", "*", "manifest.json")):
+        manifest = read_json(manifest_path, None)
+        try:
+            last_used = os.path.getmtime(manifest_path)
+        except OSError:
+            continue
+        size = sum(file["size"] for file in manifest["files"]) if manifest else 0
+        entries.append((last_used, size, os.path.dirname(manifest_path)))
+        total += size
+    for _, size, entry in sorted(entries):
+        if total <= artifact_cache_limit():
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+# ============================================================================
+# SYMBOL STORE
+# ============================================================================
+
+# split-debug-info output of every release build, kept per version and ABI so
+# crash traces from older releases can still be symbolized. Each symbols file
+# is gzipped and stored once per content hash; index.json maps version, ABI
+# and build ID to it. Point FLUTTER_BUILD_SYMBOL_STORE at a shared or backed-up
+# directory to keep the symbols of every release a team ships.
+symbol_store_dir = os.environ.get("FLUTTER_BUILD_SYMBOL_STORE") or os.path.join(STATE_DIR, "symbols")
+SYMBOL_INDEX_NAME = "index.json"
+# ELF section type and note type carrying the GNU build ID
+ELF_SECTION_NOTE = 7
+ELF_NOTE_GNU_BUILD_ID = 3
+# First line of every obfuscated Dart stack trace, followed by its build_id and arch
+STACK_TRACE_HEADER = "*** *** *** *** *** *** *** *** *** *** *** *** *** *** *** ***"
+STACK_TRACE_BUILD_ID = re.compile(r"build_id: '([0-9a-fA-F]+)'")
+STACK_TRACE_ARCH = re.compile(r"\bos: (\w+) arch: (\w+)")
+symbol_store_lock = threading.Lock()
+
+def elf_build_id(path):
+    """
+    GNU build ID of an ELF file (split-debug-info writes ELF), read from its
+    note sections without loading the file
+    Returns:
+        The build ID as hex, or None if the file has none
+    """
+    try:
+        with open(path, 'rb') as file:
+            ident = file.read(16)
+            if len(ident) < 16 or ident[:4] != b"\x7fELF":
+                return None
+            is_64 = ident[4] == 2
+            endian = "<" if ident[5] == 1 else ">"
+            file.seek(0x28 if is_64 else 0x20)
+            section_offset, = struct.unpack(endian + ("Q" if is_64 else "I"), file.read(8 if is_64 else 4))
+            file.seek(0x3A if is_64 else 0x2E)
+            entry_size, entry_count = struct.unpack(endian + "HH", file.read(4))
+            for index in range(entry_count):
+                file.seek(section_offset + index * entry_size)
+                header = file.read(40 if is_64 else 24)
+                _, section_type, _, _, offset, size = struct.unpack(endian + ("IIQQQQ" if is_64 else "IIIIII"), header)
+                if section_type != ELF_SECTION_NOTE:
+                    continue
+                file.seek(offset)
+                notes = file.read(size)
+                position = 0
+                while position + 12 <= len(notes):
+                    name_size, desc_size, note_type = struct.unpack(endian + "III", notes[position:position + 12])
+                    desc_start = position + 12 + ((name_size + 3) & ~3)
+                    if note_type == ELF_NOTE_GNU_BUILD_ID and notes[position + 12:position + 12 + name_size].rstrip(b"\0") == b"GNU":
+                        return notes[desc_start:desc_start + desc_size].hex()
+                    position = desc_start + ((desc_size + 3) & ~3)
+    except (OSError, struct.error):
+        return None
+    return None
+
+def symbol_abi(file_name):
+    """ABI of a split-debug-info file: app.android-arm64.symbols → android-arm64"""
+    name = os.path.basename(file_name)
+    if name.endswith(".symbols"):
+        name = name[:-len(".symbols")]
+    return name.split(".", 1)[1] if "." in name else name
+
+def load_symbol_index():
+    """Entries of the symbol store, oldest first"""
+    return read_json(os.path.join(symbol_store_dir, SYMBOL_INDEX_NAME), {"entries": []}).get("entries", [])
+
+def symbol_blob_path(sha256):
+    """Compressed blob of a symbols file with the given content hash"""
+    return os.path.join(symbol_store_dir, "blobs", sha256[:2], f"{sha256}.symbols.gz")
+
+def store_symbols(directory, target, version=None):
+    """
+    Adds the split-debug-info files in directory to the symbol store
+    Parameters:
+        directory: Directory the build wrote its .symbols files to
+        target: Build target (or matrix entry) the symbols belong to
+        version: Version to file them under; defaults to pubspec.yaml's
+    Returns:
+        Index entries added (files already stored for this version are skipped)
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.symbols")))
+    if not paths:
+        return []
+    # An explicit version (imported symbols) doesn't belong to pubspec.yaml's build
+    build_name = version or pubspec_full_version()
+    version = version or get_version_from_pubspec()
+    commit, _ = git_revision()
+    added = []
+    for path in paths:
+        sha256 = file_sha256(path)
+        blob = symbol_blob_path(sha256)
+        try:
+            if not os.path.isfile(blob):
+                # Compressed into a temp file and renamed, so a crash never leaves a truncated blob
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                temp_path = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(path, 'rb') as source, gzip.open(temp_path, 'wb', compresslevel=9) as target_file:
+                    shutil.copyfileobj(source, target_file, 1 << 20)
+                os.replace(temp_path, blob)
+            added.append({
+                "version": version,
+                "build_name": build_name,
+                "target": target,
+                "abi": symbol_abi(path),
+                "build_id": elf_build_id(path),
+                "sha256": sha256,
+                "file": os.path.basename(path),
+                "size": os.path.getsize(path),
+                "compressed": os.path.getsize(blob),
+                "commit": commit,
+                "stored": time.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        except OSError as e:
+            print(f"{YELLOW}Warning: Could not store {path} in the symbol store: {e}{NC}")
+    with symbol_store_lock:
+        entries = load_symbol_index()
+        known = {(entry["version"], entry["target"], entry["sha256"]) for entry in entries}
+        added = [entry for entry in added if (entry["version"], entry["target"], entry["sha256"]) not in known]
+        if added:
+            write_json_atomic(os.path.join(symbol_store_dir, SYMBOL_INDEX_NAME), {"entries": entries + added})
+    return added
+
+def store_target_symbols(targets):
+    """Stores the symbols of freshly built (or restored) BUILD_TARGETS and reports them"""
+    for target in targets:
+        for arg in BUILD_TARGETS[target]["cmd"]:
+            if arg.startswith("--split-debug-info="):
+                for entry in store_symbols(arg.split("=", 1)[1], target):
+                    build_id = (entry["build_id"] or "no build id")[:16]
+                    print(f"{BLUE}Symbols stored: {entry['build_name'] or entry['version']} {entry['abi']} "
+                          f"({build_id}, {format_bytes(entry['compressed'])} compressed){NC}")
+
+def find_symbol_entry(entries, build_id=None, version=None, abi=None):
+    """Newest store entry with the build ID, or else matching version (with or without build number) and ABI"""
+    for entry in reversed(entries):
+        if build_id and entry["build_id"] and entry["build_id"].lower() == build_id.lower():
+            return entry
+    if not version:
+        return None
+    for entry in reversed(entries):
+        if version in (entry["version"], entry["build_name"]) and (not abi or entry["abi"] == abi):
+            return entry
+    return None
+
+def split_stack_traces(text):
+    """Splits text into chunks that each start at a stack trace header (the first may have none)"""
+    chunks = [[]]
+    for line in text.splitlines(keepends=True):
+        if line.strip() == STACK_TRACE_HEADER and chunks[-1]:
+            chunks.append([])
+        chunks[-1].append(line)
+    return ["".join(chunk) for chunk in chunks if chunk]
+
+def plan_symbolize(text, entries, version=None, abi=None):
+    """
+    Matches each stack trace in text to its symbols, by build ID or else by --version
+    Returns:
+        List of (entry or None, chunk), consecutive chunks of one entry merged
+    """
+    jobs = []
+    for chunk in split_stack_traces(text):
+        entry = None
+        if STACK_TRACE_HEADER in chunk:
+            build_id = STACK_TRACE_BUILD_ID.search(chunk)
+            arch = STACK_TRACE_ARCH.search(chunk)
+            entry = find_symbol_entry(entries, build_id.group(1) if build_id else None, version,
+                                      abi or (f"{arch.group(1)}-{arch.group(2)}" if arch else None))
+        if jobs and jobs[-1][0] is entry:
+            jobs[-1] = (entry, jobs[-1][1] + chunk)
+        else:
+            jobs.append((entry, chunk))
+    return jobs
+
+def extract_symbols(entry, directory):
+    """Decompresses an entry's symbols file into directory (once per run) and returns its path"""
+    path = os.path.join(directory, f"{entry['sha256']}.symbols")
+    if not os.path.isfile(path):
+        with gzip.open(symbol_blob_path(entry["sha256"]), 'rb') as source, open(path, 'wb') as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+    return path
+
+def run_symbolize(symbols_path, chunk, directory):
+    """Decodes one run of stack traces with `flutter symbolize`; returns (ok, text)"""
+    handle, input_path = tempfile.mkstemp(suffix=".txt", dir=directory)
+    with os.fdopen(handle, 'w', encoding='utf-8') as file:
+        file.write(chunk)
+    output_path = f"{input_path}.out"
+    returncode, stdout, stderr = run_batch(["flutter", "symbolize", "--debug-info", symbols_path,
+                                            "--input", input_path, "--output", output_path])
+    if returncode != 0 or not os.path.isfile(output_path):
+        return False, (stderr or stdout).strip()
+    with open(output_path, 'r', encoding='utf-8', errors='replace') as file:
+        return True, file.read()
+
+def list_symbols():
+    """Prints the symbol store's versions, ABIs and build IDs"""
+    entries = load_symbol_index()
+    if not entries:
+        print(f"{YELLOW}The symbol store is empty. Release builds add their split-debug-info symbols to {symbol_store_dir}.{NC}")
+        return True
+    for entry in reversed(entries):
+        print(f"  {(entry['build_name'] or entry['version'] or '?'):<14} {entry['abi']:<16} {entry['target']:<12} "
+              f"{(entry['build_id'] or '-')[:20]:<20}  {format_bytes(entry['compressed']):>10}  {entry['stored']}")
+    blobs = {entry["sha256"]: entry["compressed"] for entry in entries}
+    print(f"\n{BLUE}{len(entries)} symbol files, {len(blobs)} distinct, {format_bytes(sum(blobs.values()))} on disk "
+          f"({format_bytes(sum(entry['size'] for entry in entries))} uncompressed) in {symbol_store_dir}{NC}")
+    return True
+
+def symbolize(symbolize_args):
+    """
+    Decodes obfuscated stack traces with the stored symbols of the build that
+    produced them (symbolize <trace file|->... [--out <dir>] [--version <v>] [--abi <abi>]
+    | symbolize --list | symbolize --import <dir> [--version <v>])
+    Returns:
+        True if every stack trace was decoded
+    """
+    out_dir = pop_option(symbolize_args, "--out")
+    version = pop_option(symbolize_args, "--version")
+    abi = pop_option(symbolize_args, "--abi")
+    import_dir = pop_option(symbolize_args, "--import")
+    if pop_flag(symbolize_args, "--list"):
+        return list_symbols()
+    if import_dir:
+        # e.g. the .symbols files older builds left in the project root
+        added = store_symbols(import_dir, "import", version)
+        print(f"{GREEN}Imported {len(added)} symbol file(s) from {import_dir} as {version or get_version_from_pubspec()}.{NC}")
+        return True
+    if not symbolize_args:
+        print(f"{RED}Error: symbolize needs stack trace files (or - for stdin).{NC}")
+        sys.exit(1)
+    entries = load_symbol_index()
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="flutter_build_symbolize_")
+    # With stdin as input, stdout carries the decoded traces
+    report = sys.stderr if "-" in symbolize_args else sys.stdout
+    success = True
+    try:
+        inputs = []
+        for path in symbolize_args:
+            try:
+                if path == "-":
+                    text = sys.stdin.read()
+                else:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                        text = file.read()
+            except OSError as e:
+                print(f"{CROSS} {RED}{path}: {e}{NC}", file=report)
+                success = False
+                continue
+            inputs.append((path, plan_symbolize(text, entries, version, abi)))
+        symbol_paths = {}
+        for _, jobs in inputs:
+            for entry, _ in jobs:
+                if entry and entry["sha256"] not in symbol_paths:
+                    symbol_paths[entry["sha256"]] = extract_symbols(entry, work_dir)
+        # Every run of traces is decoded side by side, then reassembled per file in order
+        with ThreadPoolExecutor(max_workers=max_parallel_stages) as pool:
+            decoded = [[pool.submit(run_symbolize, symbol_paths[entry["sha256"]], chunk, work_dir) if entry else None
+                        for entry, chunk in jobs] for _, jobs in inputs]
+            for (path, jobs), futures in zip(inputs, decoded):
+                parts = []
+                problems = []
+                for (entry, chunk), future in zip(jobs, futures):
+                    if future is None:
+                        parts.append(chunk)
+                        if STACK_TRACE_HEADER in chunk:
+                            build_id = STACK_TRACE_BUILD_ID.search(chunk)
+                            problems.append(f"no symbols for build id {build_id.group(1)}" if build_id
+                                            else "trace has no build id (pass --version)")
+                        continue
+                    ok, text = future.result()
+                    parts.append(text if ok else chunk)
+                    if not ok:
+                        problems.append(f"flutter symbolize failed: {text}")
+                if path == "-":
+                    sys.stdout.write("".join(parts))
+                    destination = "stdout"
+                else:
+                    base = os.path.splitext(os.path.basename(path))[0]
+                    destination = os.path.join(out_dir or os.path.dirname(path), f"{base}.symbolized.txt")
+                    with open(destination, 'w', encoding='utf-8') as file:
+                        file.write("".join(parts))
+                versions = sorted({f"{entry['build_name'] or entry['version']} {entry['abi']}" for entry, _ in jobs if entry})
+                if problems:
+                    success = False
+                    print(f"{CROSS} {path}: {'; '.join(dict.fromkeys(problems))}", file=report)
+                else:
+                    print(f"{CHECKMARK} {path} → {destination} ({', '.join(versions) or 'no stack traces'})", file=report)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return success
+
+# ============================================================================
+# GRADLE TUNING
+# ============================================================================
+
+GRADLE_PROPERTIES_FILE = "android/gradle.properties"
+GRADLE_TUNE_BEGIN = "# BEGIN flutter_build.py gradle-tune (managed block, rerun gradle-tune instead of editing)"
+GRADLE_TUNE_END = "# END flutter_build.py gradle-tune"
+# Prefix of user settings the managed block overrides, so --reset can restore them
+GRADLE_TUNE_DISABLED = "# disabled by gradle-tune: "
+GRADLE_TUNE_STATE_FILE = os.path.join(STATE_DIR, "gradle_tune.json")
+GRADLE_PREWARM_LOG = os.path.join(STATE_DIR, "gradle_prewarm.log")
+
+def read_proc_value(path, pattern):
+    """All matches of pattern (one group) in a /proc or /sys file; empty if it can't be read"""
+    try:
+        with open(path, 'r') as file:
+            return re.findall(pattern, file.read(), re.MULTILINE)
+    except OSError:
+        return []
+
+def detect_host_resources():
+    """
+    Usable cores and memory of this host, honouring container (cgroup) limits
+    Returns:
+        (cores, memory_mb); memory_mb is None if it can't be read
+    """
+    cores = len(read_proc_value("/proc/cpuinfo", r"^(processor)\s*:")) or os.cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        cores = min(cores, len(os.sched_getaffinity(0)))
+    # cgroup v2 (cpu.max: "<quota> <period>", "max" when unlimited), then v1 (quota -1 when unlimited)
+    for quota, period in read_proc_value("/sys/fs/cgroup/cpu.max", r"^(\d+) (\d+)$"):
+        cores = min(cores, max(1, int(quota) // int(period)))
+    for directory in ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        quota = read_proc_value(os.path.join(directory, "cpu.cfs_quota_us"), r"^(\d+)$")
+        period = read_proc_value(os.path.join(directory, "cpu.cfs_period_us"), r"^(\d+)$")
+        if quota and period and int(period[0]):
+            cores = min(cores, max(1, int(quota[0]) // int(period[0])))
+            break
+
+    memory_kb = read_proc_value("/proc/meminfo", r"^MemTotal:\s+(\d+) kB")
+    memory_mb = int(memory_kb[0]) // 1024 if memory_kb else None
+    for cgroup_file in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        for limit in read_proc_value(cgroup_file, r"^(\d+)$"):
+            if memory_mb:
+                memory_mb = min(memory_mb, int(limit) // 1048576)
+    return cores, memory_mb
+
+def gradle_tuned_properties(cores, memory_mb):
+    """Gradle/Kotlin settings for a host with the given cores and memory"""
+    def clamp_mb(value, low, high):
+        return int(max(low, min(high, value)) // 256 * 256)
+    memory_mb = memory_mb or 4096
+    # Gradle, the Kotlin daemon and the Flutter tool run side by side
+    gradle_heap = clamp_mb(memory_mb * 0.35, 1536, 8192)
+    kotlin_heap = clamp_mb(memory_mb * 0.15, 512, 4096)
+    return {
+        "org.gradle.jvmargs": f"-Xmx{gradle_heap}m -XX:MaxMetaspaceSize=1g -XX:ReservedCodeCacheSize=512m "
+                              f"-XX:+HeapDumpOnOutOfMemoryError -XX:+UseParallelGC -Dfile.encoding=UTF-8",
+        "org.gradle.parallel": "true" if cores > 1 else "false",
+        "org.gradle.workers.max": str(cores),
+        "org.gradle.caching": "true",
+        "org.gradle.daemon": "true",
+        "kotlin.daemon.jvmargs": f"-Xmx{kotlin_heap}m",
+    }
+
+def write_gradle_properties(properties, path=GRADLE_PROPERTIES_FILE):
+    """
+    Replaces the managed block of gradle.properties (properties=None removes it)
+    and comments out user settings it overrides, restoring them when removed
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    kept = []
+    inside = False
+    for line in lines:
+        if line == GRADLE_TUNE_BEGIN:
+            inside = True
+        elif line == GRADLE_TUNE_END:
+            inside = False
+        elif not inside:
+            if line.startswith(GRADLE_TUNE_DISABLED):
+                line = line[len(GRADLE_TUNE_DISABLED):]
+            kept.append(line)
+    while kept and not kept[-1].strip():
+        kept.pop()
+    if properties:
+        for index, line in enumerate(kept):
+            key = line.split("=", 1)[0].strip()
+            if "=" in line and not line.lstrip().startswith("#") and key in properties:
+                kept[index] = GRADLE_TUNE_DISABLED + line
+        kept += ["", GRADLE_TUNE_BEGIN] + [f"{key}={value}" for key, value in properties.items()] + [GRADLE_TUNE_END]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write("\n".join(kept) + "\n")
+    os.replace(temp_path, path)
+
+def read_gradle_managed_block(path=GRADLE_PROPERTIES_FILE):
+    """Properties currently in the managed block of gradle.properties, or None if there is no block"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return None
+    if GRADLE_TUNE_BEGIN not in lines:
+        return None
+    properties = {}
+    for line in lines[lines.index(GRADLE_TUNE_BEGIN) + 1:]:
+        if line == GRADLE_TUNE_END:
+            break
+        if "=" in line and not line.lstrip().startswith("#"):
+            key, value = line.split("=", 1)
+            properties[key.strip()] = value.strip()
+    return properties
+
+def prewarm_gradle_daemon():
+    """Starts the Gradle daemon in the background so the next build skips JVM startup"""
+    wrapper = os.path.join("android", "gradlew.bat" if platform.system() == "Windows" else "gradlew")
+    if not os.path.isfile(wrapper):
+        print(f"{YELLOW}Warning: {wrapper} not found; run one Android build first so Flutter generates it.{NC}")
+        return False
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(GRADLE_PREWARM_LOG, 'w', encoding='utf-8') as log:
+        # Its own session, so it outlives this script and Ctrl+C here
+        subprocess.Popen([os.path.abspath(wrapper), "--daemon", "--quiet", "help"], cwd="android",
+                         stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                         start_new_session=platform.system() != "Windows")
+    print(f"{GREEN}✓ Gradle daemon warming up in the background (log: {GRADLE_PREWARM_LOG}).{NC}")
+    return True
+
+def report_gradle_timings(tuned_at):
+    """Median Gradle build step times from the build history, before and after tuning"""
+    if not tuned_at or not os.path.isfile(BUILD_HISTORY_FILE):
+        return
+    # The Gradle steps of the build pipelines (build_apk_split is apk-split's single-target stage)
+    gradle_steps = [f"build_{target}" for target in BUILD_TARGETS] + ["build_apk_split"]
+    with contextlib.closing(open_build_history()) as connection:
+        rows = connection.execute(
+            "SELECT steps.name, runs.started >= ?, steps.seconds FROM steps JOIN runs ON runs.id = steps.run_id"
+            f" WHERE steps.status = 'done' AND steps.name IN ({', '.join('?' * len(gradle_steps))})"
+            " ORDER BY steps.run_id DESC", [tuned_at] + gradle_steps).fetchall()
+    timings = {}
+    for name, after, seconds in rows:
+        samples = timings.setdefault(name, ([], []))[1 if after else 0]
+        if len(samples) < STATS_BASELINE_RUNS:
+            samples.append(seconds)
+    if not timings:
+        return
+    print(f"\n{BLUE}Build step      before tuning     after tuning{NC}")
+    for name, (before, after) in sorted(timings.items()):
+        def describe(samples):
+            return f"{percentile(samples, 50):7.1f}s ({len(samples):>2})" if samples else f"{'-':>8}     "
+        change = ""
+        if before and after:
+            delta = (percentile(after, 50) - percentile(before, 50)) * 100 / percentile(before, 50)
+            change = f"  {GREEN if delta < 0 else RED}{delta:+.0f}%{NC}"
+        print(f"{name:<15} {describe(before)}    {describe(after)}{change}")
+    print("  (median seconds, number of builds in parentheses)")
+
+def gradle_tune(tune_args):
+    """
+    Tunes android/gradle.properties for this host
+    (gradle-tune [--prewarm] [--reset] [--dry-run])
+    """
+    if not os.path.isfile(GRADLE_PROPERTIES_FILE):
+        print(f"{RED}Error: {GRADLE_PROPERTIES_FILE} not found.{NC}")
+        return False
+    state = read_json(GRADLE_TUNE_STATE_FILE, {})
+    if "--reset" in tune_args:
+        write_gradle_properties(None)
+        write_json_atomic(GRADLE_TUNE_STATE_FILE, {})
+        print(f"{GREEN}✓ Removed the gradle-tune block from {GRADLE_PROPERTIES_FILE}.{NC}")
+        return True
+    cores, memory_mb = detect_host_resources()
+    memory_text = f"{memory_mb / 1024:.1f} GB RAM" if memory_mb else "unknown RAM (assuming 4 GB)"
+    print(f"{YELLOW}Host: {cores} cores, {memory_text}{NC}\n")
+    properties = gradle_tuned_properties(cores, memory_mb)
+    for key, value in properties.items():
+        print(f"  {key}={value}")
+    if "--dry-run" in tune_args:
+        return True
+    # The file itself is checked too: a checkout or manual edit may have dropped the block
+    if state.get("properties") != properties or read_gradle_managed_block() != properties:
+        write_gradle_properties(properties)
+        state = {"properties": properties, "tuned_at": time.time(), "host": {"cores": cores, "memory_mb": memory_mb}}
+        write_json_atomic(GRADLE_TUNE_STATE_FILE, state)
+        print(f"\n{GREEN}✓ Updated the managed block in {GRADLE_PROPERTIES_FILE}.{NC}")
+    else:
+        print(f"\n{BLUE}{GRADLE_PROPERTIES_FILE} is already tuned for this host "
+              f"(since {time.strftime('%Y-%m-%d %H:%M', time.localtime(state['tuned_at']))}).{NC}")
+    report_gradle_timings(state.get("tuned_at"))
+    if "--prewarm" in tune_args:
+        return prewarm_gradle_daemon()
+    return True
+
+# ============================================================================
+# MATRIX BUILDS
+# ============================================================================
+
+MATRIX_RESULTS_DIR = "build/matrix"
+# Memory one concurrent release build needs (Gradle, Kotlin daemon, Dart frontend)
+MATRIX_MEMORY_PER_BUILD_MB = 4096
+# Cores one concurrent release build keeps busy
+MATRIX_CORES_PER_BUILD = 4
+# Never copied into a build directory
+MATRIX_COPY_IGNORED = shutil.ignore_patterns("build", ".dart_tool", STATE_DIR, ".git", "*.symbols")
+# Gitignored signing inputs a worktree doesn't get from git; the keystore named by
+# key.properties' storeFile is copied as well
+MATRIX_SIGNING_FILES = ["android/key.properties", "android/**/*.jks", "android/**/*.keystore"]
+
+def parse_matrix_entry(text):
+    """
+    Parses `artifact[:flavor[:target-platform]]`, e.g. apk:prod:android-arm64 or aab:staging
+    Returns:
+        Dict with artifact, flavor, platform and a filesystem-safe name
+    """
+    parts = text.split(":")
+    artifact = parts[0].lower()
+    if artifact not in BUILD_TARGETS or len(parts) > 3:
+        print(f"{RED}Error: Invalid matrix entry '{text}'. Use artifact[:flavor[:target-platform]] "
+              f"with artifact one of {', '.join(BUILD_TARGETS)}.{NC}")
+        sys.exit(1)
+    flavor = parts[1] if len(parts) > 1 and parts[1] else None
+    target_platform = parts[2] if len(parts) > 2 and parts[2] else None
+    name = "-".join(part for part in (artifact, flavor, target_platform) if part)
+    return {"artifact": artifact, "flavor": flavor, "platform": target_platform, "name": name}
+
+def matrix_build_command(entry):
+    """Build command of one matrix entry; symbols go to build/symbols inside its directory"""
+    cmd_list = []
+    source = BUILD_TARGETS[entry["artifact"]]["cmd"]
+    index = 0
+    while index < len(source):
+        if source[index] == "--target-platform" and entry["platform"]:
+            index += 2
+            continue
+        if not source[index].startswith("--split-debug-info="):
+            cmd_list.append(source[index])
+        index += 1
+    if entry["platform"]:
+        cmd_list += ["--target-platform", entry["platform"]]
+    if entry["flavor"]:
+        cmd_list += ["--flavor", entry["flavor"]]
+    return cmd_list + ["--split-debug-info=build/symbols"]
+
+def matrix_concurrency(count):
+    """How many matrix builds this host can run side by side"""
+    cores, memory_mb = detect_host_resources()
+    limit = max(1, cores // MATRIX_CORES_PER_BUILD)
+    if memory_mb:
+        limit = min(limit, max(1, memory_mb // MATRIX_MEMORY_PER_BUILD_MB))
+    return min(limit, count), cores, memory_mb
+
+def matrix_signing_files():
+    """Signing files of the project (see MATRIX_SIGNING_FILES) that exist, relative to the root"""
+    paths = [path for pattern in MATRIX_SIGNING_FILES for path in glob.glob(pattern, recursive=True)]
+    if os.path.isfile("android/key.properties"):
+        with open("android/key.properties", 'r', encoding='utf-8') as file:
+            match = re.search(r'^storeFile\s*=\s*(.+)$', file.read(), re.MULTILINE)
+        if match and not os.path.isabs(match.group(1).strip()):
+            # Resolved like Gradle's file() in the app module
+            store_file = os.path.normpath(os.path.join("android", "app", match.group(1).strip()))
+            if os.path.isfile(store_file) and not store_file.startswith(".."):
+                paths.append(store_file)
+    return sorted(set(paths))
+
+def copy_into(paths, directory):
+    """Copies files (relative to the project root) to the same place under directory"""
+    for path in paths:
+        target = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(target) or directory, exist_ok=True)
+        shutil.copy2(path, target)
+
+def create_build_directory(path, use_worktree):
+    """
+    Creates an isolated copy of the project at path: a detached git worktree of
+    HEAD with the uncommitted changes, untracked files and signing files added,
+    or a plain copy outside git
+    Returns:
+        None, or why the directory doesn't match the working tree
+    """
+    if use_worktree:
+        result = subprocess.run(["git", "worktree", "add", "--detach", "--quiet", path, "HEAD"],
+                                capture_output=True, text=True)
+        if result.returncode == 0:
+            diff = subprocess.run(["git", "diff", "HEAD", "--binary"], capture_output=True)
+            if diff.stdout:
+                applied = subprocess.run(["git", "apply", "--whitespace=nowarn"], cwd=path, input=diff.stdout,
+                                         capture_output=True)
+                if applied.returncode != 0:
+                    return f"could not apply the uncommitted changes: {applied.stderr.decode('utf-8', errors='ignore').strip()}"
+            # New features, generated code and the like that aren't committed yet
+            untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard", "-z"],
+                                       capture_output=True, text=True).stdout.split("\0")
+            try:
+                copy_into([name for name in untracked if name and os.path.isfile(name)
+                           and not MATRIX_COPY_IGNORED(".", name.split("/"))] + matrix_signing_files(), path)
+            except OSError as e:
+                return f"could not copy untracked files: {e}"
+            return None
+        print(f"{YELLOW}Warning: git worktree failed ({result.stderr.strip()}); copying the project instead.{NC}")
+    shutil.copytree(".", path, ignore=MATRIX_COPY_IGNORED, symlinks=True)
+    return None
+
+def remove_build_directory(path, use_worktree):
+    """Removes a directory made by create_build_directory()"""
+    if use_worktree:
+        subprocess.run(["git", "worktree", "remove", "--force", path], capture_output=True)
+    shutil.rmtree(path, ignore_errors=True)
+
+def matrix_action(entry, directory, results_dir, with_build_runner, with_l10n):
+    """
+    Pipeline action building one matrix entry in its own directory and copying
+    its outputs and symbols to results_dir/<entry name>
+    """
+    def action():
+        entry_results = os.path.join(results_dir, entry["name"])
+        os.makedirs(entry_results, exist_ok=True)
+        commands = [["flutter", "pub", "get"]]
+        if with_l10n:
+            # Generated localizations are gitignored (or synthetic) and missing in a fresh worktree
+            commands.append(["flutter", "gen-l10n"])
+        if with_build_runner:
+            commands.append(BUILD_RUNNER_CMD)
+        commands.append(matrix_build_command(entry))
+        with open(os.path.join(entry_results, "build.log"), 'w', encoding='utf-8') as log:
+            for cmd_list in commands:
+                log.write(f"$ {' '.join(cmd_list)}\n")
+                log.flush()
+                try:
+                    returncode = subprocess.run(cmd_list, cwd=directory, stdout=log, stderr=subprocess.STDOUT,
+                                                shell=platform.system() == "Windows").returncode
+                except OSError as e:
+                    log.write(f"{e}\n")
+                    returncode = None
+                if returncode != 0:
+                    return "failed", f"{' '.join(cmd_list)} failed, see {log.name}\n"
+        outputs = (glob.glob(os.path.join(directory, "build/app/outputs/flutter-apk/*.apk"))
+                   + glob.glob(os.path.join(directory, "build/app/outputs/bundle/**/*.aab"), recursive=True)
+                   + glob.glob(os.path.join(directory, "build/symbols/*")))
+        for path in filter(os.path.isfile, outputs):
+            target_dir = os.path.join(entry_results, "symbols") if path.endswith(".symbols") else entry_results
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.copy2(path, target_dir)
+        store_symbols(os.path.join(entry_results, "symbols"), entry["name"])
+        return "done", ""
+    return action
+
+def matrix_build(matrix_args):
+    """
+    Builds several (artifact, flavor, target-platform) combinations side by side,
+    each in its own worktree so build/ and the split-debug-info symbols never collide
+    (matrix <entry>... [--from <file>] [--limit <n>] [--out <dir>] [--keep])
+    """
+    from_file = pop_option(matrix_args, "--from")
+    limit = pop_option(matrix_args, "--limit")
+    results_dir = pop_option(matrix_args, "--out", MATRIX_RESULTS_DIR)
+    keep = pop_flag(matrix_args, "--keep")
+    texts = list(matrix_args)
+    if from_file:
+        with open(from_file, 'r', encoding='utf-8') as file:
+            texts += [word for line in file for word in line.split('#', 1)[0].split()]
+    entries = list({entry["name"]: entry for entry in map(parse_matrix_entry, texts)}.values())
+    if not entries:
+        print(f"{RED}Error: No matrix entries given.{NC}")
+        print(f"Usage: {sys.argv[0]} matrix apk:prod:android-arm64 aab:staging ... [--from <file>] [--limit <n>] [--out <dir>] [--keep]")
+        return False
+
+    concurrency, cores, memory_mb = matrix_concurrency(len(entries))
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            print(f"{RED}Error: --limit expects a positive number.{NC}")
+            sys.exit(1)
+        concurrency = min(int(limit), len(entries))
+    memory_text = f"{memory_mb / 1024:.0f} GB" if memory_mb else "unknown memory"
+    print(f"{YELLOW}Building {len(entries)} combinations, {concurrency} at a time ({cores} cores, {memory_text})...{NC}\n")
+
+    use_worktree = subprocess.run(["git", "rev-parse", "--is-inside-work-tree"],
+                                  capture_output=True, text=True).stdout.strip() == "true"
+    with_build_runner = bool(build_runner_sources()[0])
+    with_l10n = os.path.isfile("l10n.yaml") or bool(glob.glob(f"{read_l10n_config()['arb-dir']}/*.arb"))
+    # Each build gets its share of the host in its own gradle.properties
+    properties = gradle_tuned_properties(max(1, cores // concurrency), (memory_mb or 0) // concurrency or None)
+    workspace = tempfile.mkdtemp(prefix="flutter_matrix_")
+    results_dir = os.path.abspath(results_dir)
+    directories = {}
+    setup_errors = {}
+    try:
+        for entry in entries:
+            # Created one after another: git serializes worktree changes anyway
+            directory = os.path.join(workspace, entry["name"])
+            directories[entry["name"]] = directory
+            shutil.rmtree(os.path.join(results_dir, entry["name"]), ignore_errors=True)
+            try:
+                error = create_build_directory(directory, use_worktree)
+            except (OSError, subprocess.SubprocessError) as e:
+                error = str(e)
+            if error:
+                setup_errors[entry["name"]] = error
+                continue
+            if os.path.isfile(os.path.join(directory, GRADLE_PROPERTIES_FILE)):
+                write_gradle_properties(properties, os.path.join(directory, GRADLE_PROPERTIES_FILE))
+        states = {}
+        success = run_pipeline([
+            stage(entry["name"], matrix_build_command(entry), f"Building {entry['name']}...",
+                  action=(lambda error=setup_errors[entry["name"]]: ("failed", f"Build directory: {error}\n"))
+                  if entry["name"] in setup_errors else
+                  matrix_action(entry, directories[entry["name"]], results_dir, with_build_runner, with_l10n))
+            for entry in entries
+        ], max_workers=concurrency, states=states, fail_fast=False)
+    finally:
+        if keep:
+            print(f"\n{BLUE}Build directories kept in {workspace}{NC}")
+        else:
+            for directory in directories.values():
+                remove_build_directory(directory, use_worktree)
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    summary = []
+    print(f"\n{BLUE}{'Combination':<36} {'Status':<8} {'Time':>8}  Outputs{NC}")
+    for entry in entries:
+        state = states.get(entry["name"], {})
+        entry_results = os.path.join(results_dir, entry["name"])
+        outputs = sorted(name for name in os.listdir(entry_results)
+                         if name.endswith((".apk", ".aab"))) if os.path.isdir(entry_results) else []
+        seconds = state["end"] - state["start"] if state.get("end") else None
+        summary.append(dict(entry, status=state.get("status"), seconds=seconds, outputs=outputs,
+                            symbols=sorted(os.listdir(os.path.join(entry_results, "symbols")))
+                            if os.path.isdir(os.path.join(entry_results, "symbols")) else []))
+        color = GREEN if state.get("status") == "done" else RED
+        sizes = ", ".join(f"{name} ({format_bytes(os.path.getsize(os.path.join(entry_results, name)))})" for name in outputs)
+        time_text = f"{seconds:.1f}s" if seconds is not None else "-"
+        print(f"{entry['name']:<36} {color}{state.get('status', '-'):<8}{NC} {time_text:>8}  {sizes}")
+    write_json_atomic(os.path.join(results_dir, "summary.json"), {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"), "concurrency": concurrency, "builds": summary})
+    print(f"\n{BLUE}Outputs, symbols and logs in {os.path.relpath(results_dir)}/ (summary.json){NC}")
+    return success
+
+# ============================================================================
+# GIT TAG FUNCTIONS
+# ============================================================================
+
+def get_version_from_pubspec():
+    """Get the version from pubspec.yaml using regex"""
+    if os.path.isfile("pubspec.yaml"):
+        with open("pubspec.yaml", 'r', encoding='utf-8') as file:
+            try:
+                content = file.read()
+                # Use regex to find the version field in pubspec.yaml
+                version_match = re.search(r'^version:\s*(.+)$', content, re.MULTILINE)
+                if version_match:
+                    version = version_match.group(1).strip()
+                    # Remove quotes if present and split by + to get only version number
+                    version = version.strip('"\'').split('+')[0]
+                    return version
+                else:
+                    print(f"{RED}Error: Could not find 'version' field in pubspec.yaml.{NC}")
+                    return None
+            except Exception as e:
+                print(f"{RED}Error: Could not read pubspec.yaml: {e}{NC}")
+                return None
+    else:
+        print(f"{RED}Error: pubspec.yaml not found in the current directory.{NC}")
+        print(f"Please run this command from the root of a Flutter project.")
+        return None
+
+def create_and_push_tag():
+    """Create git tag from pubspec version and push to remote"""
+    print(f"{YELLOW}Creating and pushing git tag...{NC}\n")
+    
+    # Get version from pubspec.yaml
+    version = get_version_from_pubspec()
+    if not version:
+        return False
+    
+    tag_name = f"v{version}"
+    
+    print(f"{BLUE}Version found: {version}{NC}")
+    print(f"{BLUE}Tag name: {tag_name}{NC}\n")
+    
+    # Check if tag already exists
+    try:
+        result = subprocess.run(["git", "tag", "-l", tag_name], 
                               capture_output=True, text=True)
         if result.stdout.strip():
             print(f"{YELLOW}Warning: Tag {tag_name} already exists locally.{NC}")
@@ -418,30 +2615,1683 @@ def create_and_push_tag():
 def uninstall_app():
     """Uninstall the app from connected device"""
     print(f"{YELLOW}Uninstalling app from device...{NC}\n")
-    success = run_flutter_command(["adb", "uninstall", "com.royalcourtbd.dhaka_bus"], "Uninstalling app...                                 ")
+    success = run_flutter_command(["adb", "uninstall", APP_PACKAGE], "Uninstalling app...                                 ")
     if success:
         print(f"\n{GREEN}✓ App uninstalled successfully!{NC}")
     else:
         print(f"\n{RED}✗ Failed to uninstall app!{NC}")
     return success
 
-def create_page(page_name):
-    """Create page structure"""
+def create_page(page_args):
+    """
+    Create page structure
+    Parameters:
+        page_args: Feature names and/or `--from <features.txt>`
+    """
     print(f"{YELLOW}Creating page...{NC}\n")
-    if not page_name:
+    if not page_args:
         print(f"{RED}Error: Page name is required.{NC}")
         print(f"Usage: {sys.argv[0]} page <page_name>")
         sys.exit(1)
-    # Run the create_page with the page name
-    try:
-        subprocess.run(["python3", "create_page.py", "page", page_name], check=True)
-    except subprocess.CalledProcessError:
-        print(f"{RED}Error: Failed to run page generator.{NC}")
+    page_generator = load_page_generator()
+    page_names, template_dir = page_generator.parse_page_args(page_args)
+    if not page_names:
+        print(f"{RED}Error: Page name is required.{NC}")
         sys.exit(1)
-    except FileNotFoundError:
+    page_generator.generate_pages(page_names, template_dir)
+
+def list_features(feature_args):
+    """
+    List the project's features and flag incomplete or orphaned DI wiring
+    Parameters:
+        feature_args: `--json` and/or `--check`
+    """
+    load_page_generator().list_features(feature_args)
+
+def load_page_generator():
+    """
+    Import create_page.py from the project (or next to this script). It runs
+    in-process: one interpreter, one pubspec parse and one service locator
+    write for a whole batch of pages.
+    """
+    sys.path.insert(0, os.getcwd())
+    sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        page_generator = importlib.import_module("create_page")
+    except ImportError:
         print(f"{RED}Error: create_page.py not found.{NC}")
         print("Make sure create_page.py exists in the current directory.")
         sys.exit(1)
+    finally:
+        del sys.path[0:2]
+    return page_generator
+
+# ============================================================================
+# CHANGED FILES (--changed)
+# ============================================================================
+
+# Refs whose merge-base with HEAD --changed compares against, in order, when --base isn't given
+CHANGED_BASE_REFS = ["@{upstream}", "origin/HEAD", "origin/main", "origin/master", "main", "master"]
+# Length of one batch's command line; cmd.exe, which runs flutter/dart on Windows, stops at 8191
+CHANGED_BATCH_CHARS = 8000 if platform.system() == "Windows" else 100000
+
+# Full-tree command of each code step, and the command the changed paths are appended to
+CODE_COMMANDS = {
+    "analyze": (["flutter", "analyze"], ["flutter", "analyze"]),
+    "format": (["dart", "format", "."], ["dart", "format"]),
+    "fix": (["dart", "fix", "--apply"], ["dart", "fix", "--apply"]),
+}
+# `dart fix` takes one path per run and each run starts an analysis server, so
+# beyond this many changed files a single whole-tree run is faster
+CHANGED_FIX_MAX_FILES = 8
+# `flutter analyze` issue lines:   error • Message • lib/main.dart:12:5 • code
+ANALYZE_ISSUE_PATTERN = re.compile(r"^\s*(error|warning|info)\s+[•-]\s.+[•-]\s+\S+:\d+:\d+\s+[•-]\s+\S+\s*$")
+# `dart format` summary:  Formatted 3 files (1 changed) in 0.12 seconds.
+FORMAT_SUMMARY_PATTERN = re.compile(r"^Formatted (\d+) files? \((\d+) changed\)")
+
+def git_lines(git_args):
+    """Output lines of a git command, or None if it fails (not a repository, unknown ref)"""
+    try:
+        result = subprocess.run(["git"] + git_args, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return [line for line in result.stdout.splitlines() if line]
+
+def changed_dart_files(base=None, staged=False):
+    """
+    Finds the Dart files changed on this branch: everything that differs from the
+    merge-base with base (committed, uncommitted and untracked), or only what is
+    staged in the index.
+    Parameters:
+        base: Ref to compare against; defaults to the first of CHANGED_BASE_REFS that exists
+        staged: Compare the index with HEAD instead
+    Returns:
+        (files, description); files is None when git can't tell
+    """
+    if staged:
+        files = git_lines(["diff", "--cached", "--name-only", "--diff-filter=ACMR", "--relative", "--", "*.dart"])
+        description = "staged in the index"
+    else:
+        merge_base = None
+        for ref in [base] if base else CHANGED_BASE_REFS:
+            merge_base = git_lines(["merge-base", "HEAD", ref])
+            if merge_base:
+                break
+        if not merge_base:
+            return None, f"no merge-base with {base or ' / '.join(CHANGED_BASE_REFS)}"
+        files = git_lines(["diff", "--name-only", "--diff-filter=ACMR", "--relative", merge_base[0], "--", "*.dart"])
+        untracked = git_lines(["ls-files", "--others", "--exclude-standard", "--", "*.dart"])
+        if files is not None:
+            files += untracked or []
+        description = f"since {merge_base[0][:10]} (merge-base with {ref})"
+    if files is None:
+        return None, "git diff failed"
+    return sorted({path for path in files if os.path.isfile(path)}), description
+
+def changed_files_option(args):
+    """
+    Handles `--changed [--base <ref>] [--staged]` for the analyze/format/fix steps
+    Returns:
+        Changed Dart files, or None for the whole tree (no --changed, or git can't tell)
+    """
+    base = pop_option(args, "--base")
+    staged = pop_flag(args, "--staged")
+    if not pop_flag(args, "--changed"):
+        if base or staged:
+            print(f"{RED}Error: --base and --staged only apply with --changed.{NC}")
+            sys.exit(1)
+        return None
+    files, description = changed_dart_files(base, staged)
+    if files is None:
+        print(f"{YELLOW}Can't determine the changed files ({description}); checking the whole tree.{NC}\n")
+        return None
+    print(f"{BLUE}{len(files)} changed Dart file(s) {description}.{NC}\n")
+    return files
+
+def batch_paths(cmd_list, paths, limit=CHANGED_BATCH_CHARS):
+    """Splits paths into groups whose command line (cmd_list + group) stays under limit characters"""
+    base_length = len(" ".join(cmd_list))
+    batches = []
+    length = base_length
+    for path in paths:
+        if batches and length + len(path) + 1 <= limit:
+            batches[-1].append(path)
+            length += len(path) + 1
+        else:
+            batches.append([path])
+            length = base_length + len(path) + 1
+    return batches
+
+def run_batch(cmd_list):
+    """Runs one batch to completion and returns (returncode, stdout, stderr)"""
+    try:
+        process = start_process(cmd_list)
+    except OSError as e:
+        return 1, "", str(e)
+    stdout, stderr = process.communicate()
+    return process.returncode, stdout or "", stderr or ""
+
+def aggregate_analyze(results, file_count):
+    """Merges the batches' analyzer output into one sorted issue list and summary"""
+    issues = set()
+    other = []
+    for returncode, stdout, stderr in results:
+        for line in (stdout + stderr).splitlines():
+            if ANALYZE_ISSUE_PATTERN.match(line):
+                issues.add(line.rstrip())
+        if returncode != 0 and not any(ANALYZE_ISSUE_PATTERN.match(line) for line in stdout.splitlines()):
+            # The batch failed for another reason (bad path, analyzer crash)
+            other.append((stdout + stderr).strip())
+    lines = sorted(issues, key=lambda line: line.split(" • ")[-2:] if " • " in line else [line])
+    summary = f"{len(issues)} issue(s) found in {file_count} changed file(s)." if issues else \
+        f"No issues found in {file_count} changed file(s)!"
+    return "\n".join(lines + [summary] + other)
+
+def aggregate_format(results, file_count):
+    """Merges the batches' `dart format` output into one list of rewritten files and a total"""
+    formatted = 0
+    changed = 0
+    lines = []
+    for returncode, stdout, stderr in results:
+        for line in (stdout + stderr).splitlines():
+            match = FORMAT_SUMMARY_PATTERN.match(line)
+            if match:
+                formatted += int(match.group(1))
+                changed += int(match.group(2))
+            elif line.strip():
+                lines.append(line.rstrip())
+    return "\n".join(lines + [f"Formatted {formatted or file_count} changed file(s) ({changed} rewritten)."])
+
+def run_code_batches(kind, files):
+    """
+    Runs analyze/format/fix over just the given files: the paths are split into
+    batches that fit a command line and the batches run side by side.
+    `dart fix` takes a single path, so it runs once per file (or once over the
+    whole tree above CHANGED_FIX_MAX_FILES files).
+    Returns:
+        (status, aggregated output) for a pipeline stage action
+    """
+    if not files:
+        return "done", "No changed Dart files."
+    cmd_list = CODE_COMMANDS[kind][1]
+    if kind == "fix":
+        batches = [[path] for path in files] if len(files) <= CHANGED_FIX_MAX_FILES else [[]]
+    else:
+        batches = batch_paths(cmd_list, files)
+    with ThreadPoolExecutor(max_workers=min(len(batches), max_parallel_stages)) as pool:
+        results = list(pool.map(lambda batch: run_batch(cmd_list + batch), batches))
+    if kind == "analyze":
+        output = aggregate_analyze(results, len(files))
+    elif kind == "format":
+        output = aggregate_format(results, len(files))
+    else:
+        output = "\n".join((stdout + stderr).strip() for _, stdout, stderr in results if (stdout + stderr).strip())
+    status = "failed" if any(returncode != 0 for returncode, _, _ in results) else "done"
+    return status, output
+
+def code_stage(kind, name, description, deps=None, files=None):
+    """
+    An analyze, format or fix stage over the whole tree, or over files only
+    (see run_code_batches) when --changed found them
+    """
+    if files is None:
+        return stage(name, CODE_COMMANDS[kind][0], description, deps)
+    return stage(name, CODE_COMMANDS[kind][1] + files, f"{description.rstrip('.')} ({len(files)} changed)...", deps,
+                 action=lambda: run_code_batches(kind, files))
+
+def check_code(kind, code_args):
+    """Runs analyze, format or fix on its own (analyze|format|fix [--changed [--base <ref>] [--staged]])"""
+    files = changed_files_option(code_args)
+    descriptions = {"analyze": "Analyzing code...", "format": "Formatting code...", "fix": "Fixing code issues..."}
+    return run_pipeline([code_stage(kind, kind, descriptions[kind], files=files)])
+
+# ============================================================================
+# TESTS (sharded flutter test)
+# ============================================================================
+
+# Memory one `flutter test` shard needs (tool, frontend compiler and flutter_tester processes)
+TEST_SHARD_MEMORY_MB = 1536
+# Cores one shard keeps busy; the rest of the host goes to its --concurrency
+TEST_CORES_PER_SHARD = 2
+TEST_JUNIT_FILE = os.path.join("build", "test-results", "junit.xml")
+# Tests and files listed in the slowest report (--slowest)
+TEST_SLOWEST = 10
+# package:test's exit code when a shard has no tests to run
+TEST_NO_TESTS_EXIT_CODE = 79
+
+def resolve_test_files(test_args):
+    """
+    Test files a `flutter test` run covers: the files and directories passed
+    among test_args, or every *_test.dart under test/ when none are
+    """
+    paths = [arg for arg in test_args if not arg.startswith("-") and os.path.exists(arg)]
+    if not paths:
+        return glob.glob("test/**/*_test.dart", recursive=True)
+    test_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            test_files += glob.glob(os.path.join(path, "**", "*_test.dart"), recursive=True)
+        else:
+            test_files.append(path)
+    return sorted(set(test_files))
+
+def test_shard_count(test_files):
+    """
+    How many shards to run side by side: one per TEST_CORES_PER_SHARD cores,
+    within memory, and never more than there are test files
+    Returns:
+        (shards, concurrency per shard)
+    """
+    cores, memory_mb = detect_host_resources()
+    shards = max(1, cores // TEST_CORES_PER_SHARD)
+    if memory_mb:
+        shards = min(shards, max(1, memory_mb // TEST_SHARD_MEMORY_MB))
+    shards = max(1, min(shards, len(test_files)))
+    return shards, max(1, cores // shards)
+
+def handle_test_event(state, event):
+    """
+    Folds one event of the `--reporter json` protocol into a shard's state:
+    suites by id, running tests, and finished results with their errors
+    """
+    kind = event.get("type")
+    if kind == "suite":
+        state["suites"][event["suite"]["id"]] = event["suite"].get("path") or "(unknown)"
+    elif kind == "testStart":
+        test = event["test"]
+        path = state["suites"].get(test.get("suiteID"), "(unknown)")
+        state["running"][test["id"]] = {"file": path, "name": test.get("name", ""), "start": event["time"], "errors": []}
+        file_times = state["files"].setdefault(path, [event["time"], event["time"]])
+        file_times[0] = min(file_times[0], event["time"])
+    elif kind == "error":
+        test = state["running"].get(event.get("testID"))
+        if test is not None:
+            test["errors"].append(f"{event.get('error', '')}\n{event.get('stackTrace', '')}".strip())
+    elif kind == "testDone":
+        test = state["running"].pop(event["testID"], None)
+        if test is None:
+            return
+        state["files"][test["file"]][1] = max(state["files"][test["file"]][1], event["time"])
+        # Hidden tests are the "loading <file>" steps; they only matter when loading fails
+        if event.get("hidden") and event.get("result") == "success":
+            return
+        state["results"].append({
+            "file": test["file"],
+            "name": test["name"],
+            "result": "skipped" if event.get("skipped") else event.get("result", "error"),
+            "seconds": (event["time"] - test["start"]) / 1000,
+            "errors": test["errors"],
+            "shard": state["shard"],
+        })
+    elif kind == "done":
+        state["success"] = event.get("success")
+
+def test_shard_command(shard, total, concurrency, test_args):
+    """`flutter test` command line of one shard (shard is 0-based)"""
+    return ["flutter", "test", "--reporter", "json", "--total-shards", str(total),
+            "--shard-index", str(shard), "--concurrency", str(concurrency)] + test_args
+
+def test_shard_action(cmd_list, shard, states):
+    """
+    Pipeline action running one shard with the JSON reporter. Events are parsed
+    as they stream in; the shard's state lands in states[shard].
+    """
+    def action():
+        state = {"shard": shard + 1, "suites": {}, "running": {}, "files": {}, "results": [], "success": None}
+        states[shard] = state
+        try:
+            process = start_process(cmd_list)
+        except OSError as e:
+            return "failed", str(e)
+
+        def on_line(stream_name, line):
+            if stream_name != "stdout" or not line.startswith("{"):
+                return
+            try:
+                handle_test_event(state, json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                # Not a reporter event (tool output that happens to start with a brace)
+                pass
+
+        _, stderr = finish_capture(capture_output(process, on_line=on_line))
+        failed = [result for result in state["results"] if result["result"] in ("failure", "error")]
+        if process.returncode == 0 or (process.returncode == TEST_NO_TESTS_EXIT_CODE and not failed):
+            return "done", stderr
+        # The failures themselves are listed in the merged summary
+        summary = f"{len(failed)} test(s) failed in this shard." if failed else f"flutter test exited with {process.returncode}."
+        return "failed", "\n".join(text for text in (stderr.strip(), summary) if text)
+    return action
+
+def write_junit_report(results, path):
+    """Writes merged test results as JUnit XML, one <testsuite> per test file"""
+    files = {}
+    for result in results:
+        files.setdefault(result["file"], []).append(result)
+    root = ElementTree.Element("testsuites", {
+        "tests": str(len(results)),
+        "failures": str(sum(result["result"] == "failure" for result in results)),
+        "errors": str(sum(result["result"] == "error" for result in results)),
+        "skipped": str(sum(result["result"] == "skipped" for result in results)),
+        "time": f"{sum(result['seconds'] for result in results):.3f}",
+    })
+    for path_name in sorted(files):
+        cases = files[path_name]
+        suite = ElementTree.SubElement(root, "testsuite", {
+            "name": path_name,
+            "tests": str(len(cases)),
+            "failures": str(sum(case["result"] == "failure" for case in cases)),
+            "errors": str(sum(case["result"] == "error" for case in cases)),
+            "skipped": str(sum(case["result"] == "skipped" for case in cases)),
+            "time": f"{sum(case['seconds'] for case in cases):.3f}",
+        })
+        classname = os.path.splitext(path_name)[0].replace("/", ".").replace("\\", ".")
+        for case in cases:
+            element = ElementTree.SubElement(suite, "testcase", {
+                "classname": classname, "name": case["name"], "time": f"{case['seconds']:.3f}"})
+            if case["result"] in ("failure", "error"):
+                text = "\n\n".join(case["errors"])
+                failure = ElementTree.SubElement(element, case["result"], {"message": (text.splitlines() or [""])[0]})
+                failure.text = text
+            elif case["result"] == "skipped":
+                ElementTree.SubElement(element, "skipped")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    ElementTree.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+def print_test_summary(states, stage_states, slowest):
+    """Prints the merged result of every shard: failures, slowest tests and files, shard balance"""
+    results = [result for state in states.values() for result in state["results"]]
+    counts = {kind: sum(result["result"] == kind for result in results) for kind in ("success", "failure", "error", "skipped")}
+    failed = [result for result in results if result["result"] in ("failure", "error")]
+    if failed:
+        print(f"\n{RED}Failed tests:{NC}")
+        for result in failed:
+            print(f"  {CROSS} {result['file']}: {result['name']} {BLUE}(shard {result['shard']}){NC}")
+            for line in (result["errors"][0].splitlines() if result["errors"] else [])[:6]:
+                print(f"      {line}")
+    if slowest and results:
+        print(f"\n{BLUE}Slowest tests:{NC}")
+        for result in sorted(results, key=lambda result: result["seconds"], reverse=True)[:slowest]:
+            print(f"  {result['seconds']:7.2f}s  {result['file']}  {result['name']}")
+        files = {}
+        for state in states.values():
+            for path, (start, end) in state["files"].items():
+                entry = files.setdefault(path, {"seconds": 0.0, "tests": 0, "shards": set()})
+                # Per shard, a file takes from its first test start (including loading) to its last test
+                entry["seconds"] += (end - start) / 1000
+                entry["shards"].add(state["shard"])
+        for result in results:
+            files[result["file"]]["tests"] += 1
+        print(f"\n{BLUE}Slowest files:{NC}")
+        for path, entry in sorted(files.items(), key=lambda item: item[1]["seconds"], reverse=True)[:slowest]:
+            shards = ", ".join(str(shard) for shard in sorted(entry["shards"]))
+            print(f"  {entry['seconds']:7.2f}s  {path}  ({entry['tests']} tests, shard {shards})")
+    durations = {name: state["end"] - state["start"] for name, state in stage_states.items()
+                 if state["start"] and state["end"]}
+    if len(durations) > 1:
+        balance = ", ".join(f"{name.split(':')[1]}: {seconds:.1f}s" for name, seconds in sorted(durations.items()))
+        print(f"\n{BLUE}Shard wall times: {balance}{NC}")
+    color = RED if failed else GREEN
+    print(f"\n{color}{counts['success']} passed, {counts['failure'] + counts['error']} failed, "
+          f"{counts['skipped']} skipped across {len(states)} shard(s).{NC}")
+
+@timer_decorator
+def run_tests(test_args):
+    """
+    Runs `flutter test` split into shards running side by side
+    (test [--shards n] [--junit file] [--slowest n] [flutter test arguments/paths])
+    Returns:
+        True if every test passed
+    """
+    shards = pop_option(test_args, "--shards")
+    junit_path = pop_option(test_args, "--junit", TEST_JUNIT_FILE)
+    slowest = pop_option(test_args, "--slowest", str(TEST_SLOWEST))
+    if (shards is not None and (not shards.isdigit() or int(shards) < 1)) or not slowest.isdigit():
+        print(f"{RED}Error: --shards expects a positive number and --slowest a number of tests.{NC}")
+        sys.exit(1)
+    test_files = resolve_test_files(test_args)
+    if not test_files and not test_args:
+        print(f"{YELLOW}No test files found under test/.{NC}")
+        return True
+    total, concurrency = test_shard_count(test_files)
+    if shards is not None:
+        total = int(shards)
+        concurrency = max(1, detect_host_resources()[0] // total)
+    print(f"{YELLOW}Running tests in {total} shard(s), {concurrency} test file(s) at a time each...{NC}\n")
+    states = {}
+    stage_states = {}
+    stages = []
+    for shard in range(total):
+        cmd_list = test_shard_command(shard, total, concurrency, test_args)
+        stages.append(stage(f"test:{shard + 1}", cmd_list, f"Running tests (shard {shard + 1}/{total})...",
+                            action=test_shard_action(cmd_list, shard, states)))
+    run_pipeline(stages, max_workers=total, states=stage_states, fail_fast=False)
+    results = [result for _, state in sorted(states.items()) for result in state["results"]]
+    print_test_summary(states, stage_states, int(slowest))
+    if junit_path and states:
+        write_junit_report(results, junit_path)
+        print(f"{BLUE}JUnit report written to {junit_path}{NC}")
+    return all(stage_states[name]["status"] == "done" for name in stage_states)
+
+# ============================================================================
+# BUILD_RUNNER DAEMON
+# ============================================================================
+
+BUILD_RUNNER_WATCH_CMD = ["dart", "run", "build_runner", "watch", "--delete-conflicting-outputs"]
+BUILD_RUNNER_DAEMON_FILE = os.path.join(STATE_DIR, "build_runner_daemon.json")
+BUILD_RUNNER_DAEMON_LOG = os.path.join(STATE_DIR, "build_runner_watch.log")
+BUILD_RUNNER_DAEMON_TIMEOUT = 600
+# The watch log is truncated once it grows past this size
+BUILD_RUNNER_LOG_LIMIT = 5 * 1048576
+
+# build_runner progress lines across versions ("[INFO] Succeeded after 4.1s with 3 outputs",
+# "Built with build_runner in 4s; wrote 3 outputs.", "[SEVERE] Failed after 2.0s", ...)
+BUILD_RUNNER_STARTED_PATTERN = re.compile(r"Starting Build|Building new asset graph|Running build")
+BUILD_RUNNER_SUCCEEDED_PATTERN = re.compile(r"Succeeded after|Built with build_runner")
+BUILD_RUNNER_FAILED_PATTERN = re.compile(r"Failed after|Failed to build")
+
+def is_process_alive(pid):
+    """Checks whether a process with the given PID is still running"""
+    if not pid:
+        return False
+    if platform.system() == "Windows":
+        # os.kill(pid, 0) would terminate the process on Windows
+        result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True)
+        return str(pid) in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def build_runner_daemon_status():
+    """Returns the daemon's state dict if a build_runner watch daemon is running, otherwise None"""
+    state = read_json(BUILD_RUNNER_DAEMON_FILE, None)
+    if not state or not is_process_alive(state.get("pid")):
+        return None
+    return state
+
+def start_build_runner_daemon():
+    """Starts `build_runner watch` in the background unless it is already running"""
+    state = build_runner_daemon_status()
+    if state:
+        print(f"{BLUE}build_runner daemon already running (PID {state['pid']}).{NC}")
+        return True
+    os.makedirs(STATE_DIR, exist_ok=True)
+    # The supervisor is this script in daemon mode; it outlives the current command
+    cmd_list = [sys.executable, os.path.abspath(__file__), "_build-runner-daemon"]
+    options = {}
+    if platform.system() == "Windows":
+        options["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options["start_new_session"] = True
+    process = subprocess.Popen(cmd_list, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, **options)
+    write_json_atomic(BUILD_RUNNER_DAEMON_FILE, {
+        "pid": process.pid,
+        "state": "starting",
+        "started_at": time.time(),
+        "build_started_at": time.time(),
+        "result_at": None,
+    })
+    print(f"{GREEN}✓ build_runner daemon started (PID {process.pid}).{NC}")
+    print(f"{BLUE}  Log: {BUILD_RUNNER_DAEMON_LOG}{NC}")
+    return True
+
+def stop_build_runner_daemon():
+    """Stops the build_runner watch daemon and everything it started"""
+    state = build_runner_daemon_status()
+    if not state:
+        print(f"{YELLOW}No build_runner daemon is running.{NC}")
+        return False
+    pid = state["pid"]
+    if platform.system() == "Windows":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(pid)], capture_output=True)
+    else:
+        try:
+            # The daemon leads its own session, so this also reaches dart and build_runner
+            os.killpg(pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        os.remove(BUILD_RUNNER_DAEMON_FILE)
+    except FileNotFoundError:
+        pass
+    print(f"{GREEN}✓ build_runner daemon stopped (PID {pid}).{NC}")
+    return True
+
+def build_runner_daemon_worker():
+    """
+    Daemon mode (`_build-runner-daemon`): runs `build_runner watch`, writes its
+    timestamped output to the watch log and keeps the daemon state file current.
+    """
+    process = start_process(BUILD_RUNNER_WATCH_CMD)
+    state = read_json(BUILD_RUNNER_DAEMON_FILE, {})
+    state.update(pid=os.getpid(), watch_pid=process.pid, state="starting")
+    write_json_atomic(BUILD_RUNNER_DAEMON_FILE, state)
+
+    def stop(sig, frame):
+        process.terminate()
+    signal.signal(signal.SIGTERM, stop)
+
+    with open(BUILD_RUNNER_DAEMON_LOG, 'w', encoding='utf-8') as log:
+        def on_line(stream_name, line):
+            now = time.time()
+            with print_lock:
+                if log.tell() > BUILD_RUNNER_LOG_LIMIT:
+                    log.seek(0)
+                    log.truncate()
+                log.write(f"{time.strftime('%H:%M:%S', time.localtime(now))} {line.rstrip()}\n")
+                log.flush()
+                if BUILD_RUNNER_SUCCEEDED_PATTERN.search(line) or BUILD_RUNNER_FAILED_PATTERN.search(line):
+                    if state["state"] != "building":
+                        state["build_started_at"] = now
+                    state["state"] = "succeeded" if BUILD_RUNNER_SUCCEEDED_PATTERN.search(line) else "failed"
+                    state["result_at"] = now
+                elif BUILD_RUNNER_STARTED_PATTERN.search(line) and state["state"] != "building":
+                    state["state"] = "building"
+                    state["build_started_at"] = now
+                else:
+                    return
+                write_json_atomic(BUILD_RUNNER_DAEMON_FILE, state)
+
+        finish_capture(capture_output(process, on_line=on_line))
+    state["state"] = "stopped"
+    write_json_atomic(BUILD_RUNNER_DAEMON_FILE, state)
+
+def wait_for_build_runner_daemon(timeout=BUILD_RUNNER_DAEMON_TIMEOUT):
+    """
+    Waits until the daemon has finished a build that started after the last
+    change to build_runner's inputs.
+    Returns:
+        True on success, False if that build failed or timed out, None if no
+        daemon is running (any more)
+    """
+    newest_input = 0
+    for pattern in build_runner_inputs():
+        for path in glob.glob(pattern, recursive=True):
+            newest_input = max(newest_input, os.path.getmtime(path))
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = build_runner_daemon_status()
+        if not state or state.get("state") == "stopped":
+            return None
+        if state.get("state") in ("succeeded", "failed") and state.get("build_started_at", 0) >= newest_input:
+            return state["state"] == "succeeded"
+        time.sleep(0.2)
+    return False
+
+def build_runner_daemon_log_tail(lines=40):
+    """Last lines of the daemon's watch log, for failure output"""
+    try:
+        with open(BUILD_RUNNER_DAEMON_LOG, 'r', encoding='utf-8', errors='ignore') as file:
+            return "".join(deque(file, maxlen=lines))
+    except OSError:
+        return ""
+
+def build_runner_via_daemon():
+    """
+    Pipeline action used instead of a fresh build_runner run while the daemon is up.
+    Falls back to a normal build if the daemon went away.
+    Returns:
+        (status, output)
+    """
+    result = wait_for_build_runner_daemon()
+    if result is None:
+        process = start_process(BUILD_RUNNER_CMD)
+        stdout, stderr = finish_capture(capture_output(process))
+        return ("done" if process.returncode == 0 else "failed"), stdout + stderr
+    return ("done", "") if result else ("failed", build_runner_daemon_log_tail())
+
+# ============================================================================
+# DEV LOOP (run)
+# ============================================================================
+
+RUN_WATCH_DIR = "lib"
+# Quiet period after the last file change before reloading, in seconds (--debounce ms)
+RUN_DEBOUNCE = 0.3
+RUN_POLL_INTERVAL = 0.1
+# Edits a hot reload can't apply: top-level declarations and initializers, enum
+# bodies and main(). When their text changes the loop hot restarts instead.
+# Declarations are matched at column 0 only, so statements in function bodies
+# (`  count = count + 1;`) stay hot reloadable.
+STRUCTURAL_PATTERN = re.compile(
+    r"^(?:(?:abstract|sealed|base|final|interface)\s+)*(?:class|mixin|extension|typedef)\b[^{;]*"
+    r"|^enum\s+\w+[^{]*\{[^}]*\}"
+    r"|^(?:final|const|var|late)\b.*"
+    r"|^(?![ \t])[\w<>?, ]+\s+\w+\s*=.*"
+    r"|^(?:[\w<>]+\s+)?main\s*\([^)]*\)[^{]*\{[\s\S]*?^\}",
+    re.MULTILINE,
+)
+
+def snapshot_dart_files(directory):
+    """mtime of every .dart file below directory, found with os.scandir"""
+    snapshot = {}
+    pending = [directory]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.name.endswith(".dart"):
+                try:
+                    snapshot[entry.path] = entry.stat().st_mtime_ns
+                except OSError:
+                    pass
+    return snapshot
+
+def structure_signature(path):
+    """Hash of the parts of a Dart file a hot reload can't apply"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+            declarations = STRUCTURAL_PATTERN.findall(file.read())
+    except OSError:
+        return None
+    return hashlib.sha256("\n".join(declarations).encode('utf-8')).hexdigest()
+
+def send_daemon_request(process, state, method, params):
+    """Writes one JSON-RPC request to `flutter run --machine` and returns its id"""
+    state["next_id"] += 1
+    message = json.dumps([{"id": state["next_id"], "method": method, "params": params}])
+    process.stdin.write(message + "\n")
+    process.stdin.flush()
+    return state["next_id"]
+
+def run_dev_loop(cmd_list, watch_dir=RUN_WATCH_DIR, debounce=RUN_DEBOUNCE):
+    """
+    Runs the app with `flutter run --machine` and hot reloads it as files under
+    watch_dir change. Edits are batched until debounce seconds pass without a
+    change. Added or removed files and edits to top-level declarations trigger
+    a hot restart, as does a hot reload the VM rejects. Reload latency is
+    reported per change.
+    Parameters:
+        cmd_list: The `flutter run --machine` command (any process speaking its
+                  JSON protocol on stdin/stdout works, e.g. a stub)
+        watch_dir: Directory whose .dart files are watched
+        debounce: Quiet period in seconds before a reload is sent
+    Returns:
+        True if the app ran and stopped normally
+    """
+    events = queue.Queue()
+
+    def on_line(stream_name, line):
+        # The daemon protocol is one JSON array per line; anything else is build output
+        text = line.strip()
+        if stream_name == "stdout" and text.startswith("[{") and text.endswith("}]"):
+            try:
+                for message in json.loads(text):
+                    events.put(message)
+                return
+            except ValueError:
+                pass
+        if text:
+            print_tail_line(stream_name, line)
+
+    try:
+        process = subprocess.Popen(
+            cmd_list, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            shell=platform.system() == "Windows", text=True, encoding='utf-8', errors='ignore',
+        )
+    except OSError as e:
+        print(f"{RED}Error: Could not start {cmd_list[0]}: {e}{NC}")
+        return False
+    capture = capture_output(process, on_line=on_line)
+    launched = time.time()
+    state = {"next_id": 0, "app_id": None, "stopped": False}
+    snapshot = snapshot_dart_files(watch_dir)
+    signatures = {path: structure_signature(path) for path in snapshot}
+    pending_changes = {}
+    last_change = None
+    in_flight = None
+    latencies = {"reload": [], "restart": []}
+
+    def request_reload(full_restart, changes, detected):
+        request_id = send_daemon_request(process, state, "app.restart", {
+            "appId": state["app_id"], "fullRestart": full_restart, "pause": False,
+            "reason": "manual" if full_restart else "save",
+        })
+        kind = "restart" if full_restart else "reload"
+        span = begin_span(f"hot {kind}", "reload", {"files": sorted(changes)})
+        return {"id": request_id, "kind": kind, "changes": changes, "detected": detected, "sent": time.time(), "span": span}
+
+    # Ctrl+C stops the app through the protocol instead of killing the script
+    interrupted = threading.Event()
+    previous_handler = signal.signal(signal.SIGINT, lambda sig, frame: interrupted.set())
+    try:
+        while process.poll() is None and not state["stopped"]:
+            if interrupted.is_set():
+                print(f"\n{YELLOW}Stopping app...{NC}")
+                if state["app_id"]:
+                    with contextlib.suppress(OSError):
+                        send_daemon_request(process, state, "app.stop", {"appId": state["app_id"]})
+                break
+            try:
+                message = events.get(timeout=RUN_POLL_INTERVAL)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                event = message.get("event")
+                params = message.get("params", {})
+                if event == "app.start":
+                    state["app_id"] = params.get("appId")
+                    print(f"{YELLOW}Launching on {params.get('deviceId', 'device')}...{NC}")
+                elif event == "app.started":
+                    print(f"{GREEN}✓ App started in {time.time() - launched:.1f}s. Watching {watch_dir}/ for changes (Ctrl+C to stop).{NC}")
+                elif event == "app.progress" and params.get("message") and not params.get("finished"):
+                    print(f"  {BLUE}{params['message']}{NC}")
+                elif event in ("app.log", "daemon.logMessage"):
+                    text = params.get("log") or params.get("message") or ""
+                    print_tail_line("stderr" if params.get("error") or params.get("level") == "error" else "stdout", text)
+                elif event == "app.stop":
+                    state["stopped"] = True
+                elif in_flight and message.get("id") == in_flight["id"]:
+                    result = message.get("result") or {}
+                    ok = "error" not in message and result.get("code", 0) == 0
+                    elapsed = time.time() - in_flight["sent"]
+                    end_span(in_flight["span"], status="done" if ok else "failed")
+                    files = sorted(in_flight["changes"])
+                    changed = os.path.relpath(files[0]) + (f" (+{len(files) - 1} more)" if len(files) > 1 else "")
+                    if ok:
+                        latencies[in_flight["kind"]].append(elapsed)
+                        print(f"  {CHECKMARK} Hot {in_flight['kind']:<7} {elapsed * 1000:6.0f} ms  "
+                              f"(change → app {(time.time() - in_flight['detected']) * 1000:.0f} ms)  {changed}")
+                        in_flight = None
+                    elif in_flight["kind"] == "reload":
+                        reason = message.get("error") or result.get("message") or "rejected"
+                        print(f"  {YELLOW}Hot reload failed ({reason}); hot restarting...{NC}")
+                        in_flight = request_reload(True, in_flight["changes"], in_flight["detected"])
+                    else:
+                        print(f"  {CROSS} {RED}Hot restart failed: {message.get('error') or result.get('message')}{NC}")
+                        in_flight = None
+
+            if state["app_id"] is None:
+                continue
+            current = snapshot_dart_files(watch_dir)
+            if current != snapshot:
+                for path in set(snapshot) | set(current):
+                    if path not in current or path not in snapshot:
+                        pending_changes[path] = "restart"
+                        signatures[path] = structure_signature(path) if path in current else None
+                    elif current[path] != snapshot[path]:
+                        signature = structure_signature(path)
+                        if signature != signatures.get(path):
+                            pending_changes[path] = "restart"
+                        else:
+                            pending_changes.setdefault(path, "reload")
+                        signatures[path] = signature
+                snapshot = current
+                last_change = time.time()
+            if pending_changes and in_flight is None and time.time() - last_change >= debounce:
+                full_restart = "restart" in pending_changes.values()
+                in_flight = request_reload(full_restart, dict(pending_changes), last_change)
+                pending_changes = {}
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+        with contextlib.suppress(OSError):
+            process.stdin.close()
+        finish_capture(capture)
+
+    for kind, values in latencies.items():
+        if values:
+            print(f"{BLUE}{len(values)} hot {kind}(s): median {percentile(values, 50) * 1000:.0f} ms, "
+                  f"p95 {percentile(values, 95) * 1000:.0f} ms{NC}")
+    if state["app_id"] is None and process.returncode:
+        print(f"{RED}✗ flutter run exited with code {process.returncode} before the app started.{NC}")
+        return False
+    return True
+
+def run_app(run_args):
+    """
+    Dev loop: `run [-d <device>] [--debounce <ms>] [flutter run options...]`
+    """
+    debounce = pop_option(run_args, "--debounce")
+    try:
+        debounce = RUN_DEBOUNCE if debounce is None else int(debounce) / 1000
+    except ValueError:
+        print(f"{RED}Error: --debounce expects milliseconds.{NC}")
+        sys.exit(1)
+    print(f"{YELLOW}Starting dev loop...{NC}\n")
+    return run_dev_loop(["flutter", "run", "--machine"] + run_args, debounce=debounce)
+
+# ============================================================================
+# BUILD HISTORY
+# ============================================================================
+
+# Every command's steps, timings and exit codes, queried by `stats`
+BUILD_HISTORY_FILE = os.path.join(STATE_DIR, "build_history.sqlite3")
+# Commands that are not builds (or run against stub tools) and stay out of the history
+BUILD_HISTORY_IGNORED_COMMANDS = {"stats", "logs", "symbolize", "bench", "run", "_build-runner-daemon"}
+
+BUILD_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    command TEXT NOT NULL,
+    argv TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    exit_code INTEGER NOT NULL,
+    git_commit TEXT,
+    git_dirty INTEGER,
+    host TEXT,
+    platform TEXT,
+    cpus INTEGER
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    status TEXT,
+    exit_code INTEGER,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_by_name ON steps(name, run_id);
+CREATE INDEX IF NOT EXISTS runs_by_command ON runs(command, id);
+"""
+
+# Number of past runs a step's baseline median is taken over (--window)
+STATS_BASELINE_RUNS = 20
+# Number of latest runs compared against the baseline
+STATS_RECENT_RUNS = 3
+# A step whose recent median is this much slower than its baseline is flagged (--threshold, percent)
+STATS_REGRESSION_THRESHOLD = 20.0
+
+def open_build_history():
+    """Opens (and if needed creates) the history database"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    connection = sqlite3.connect(BUILD_HISTORY_FILE, timeout=10)
+    connection.executescript(BUILD_HISTORY_SCHEMA)
+    return connection
+
+def git_revision():
+    """(commit, dirty) of the working tree, or (None, None) outside a git repository"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10)
+        if commit.returncode != 0:
+            return None, None
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, timeout=30)
+        return commit.stdout.strip(), int(bool(status.stdout.strip()))
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+
+def record_build_history(args, started, exit_code):
+    """
+    Appends this invocation's steps (from the trace spans) to the history database
+    Parameters:
+        args: Command line with global options removed
+        started: time.time() when the command started
+        exit_code: Process exit code (non-zero if a step failed)
+    """
+    if not args or args[0].lower() in BUILD_HISTORY_IGNORED_COMMANDS:
+        return
+    steps = [span for span in trace_spans if span["category"] == "step" and span["end"]]
+    if not steps and not any(span["category"] == "command" for span in trace_spans):
+        return
+    commit, dirty = git_revision()
+    try:
+        with contextlib.closing(open_build_history()) as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (started, command, argv, seconds, exit_code, git_commit, git_dirty, host, platform, cpus)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (started, " ".join(arg.lower() for arg in args if arg.lower() in BUILD_TARGETS) or args[0].lower(),
+                 json.dumps(args), time.time() - started, exit_code, commit, dirty,
+                 platform.node(), f"{platform.system()} {platform.machine()}", os.cpu_count()))
+            connection.executemany(
+                "INSERT INTO steps (run_id, name, status, exit_code, seconds) VALUES (?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, span["args"].get("stage") or span["args"].get("cmd") or span["name"],
+                  span["args"].get("status"), span["args"].get("exit_code"), span["end"] - span["start"])
+                 for span in steps])
+    except sqlite3.Error as e:
+        print(f"{YELLOW}Warning: Could not record build history: {e}{NC}")
+
+def rolling_comparison(samples, baseline_runs, threshold):
+    """
+    Compares the latest samples with the ones before them
+    Parameters:
+        samples: Durations, newest first
+    Returns:
+        (recent_median, baseline_median, change_percent, regressed); the
+        baseline values are None until there are enough samples
+    """
+    recent = samples[:STATS_RECENT_RUNS]
+    baseline = samples[STATS_RECENT_RUNS:STATS_RECENT_RUNS + baseline_runs]
+    recent_median = percentile(recent, 50)
+    if len(baseline) < STATS_RECENT_RUNS:
+        return recent_median, None, None, False
+    baseline_median = percentile(baseline, 50)
+    change = (recent_median - baseline_median) * 100 / baseline_median if baseline_median else 0.0
+    return recent_median, baseline_median, change, change > threshold
+
+def show_build_stats(stats_args):
+    """
+    Prints rolling medians per command and per step and flags slowdowns
+    (stats [--window <runs>] [--threshold <percent>] [--command <name>])
+    Returns:
+        False if any step regressed
+    """
+    window = pop_option(stats_args, "--window", str(STATS_BASELINE_RUNS))
+    threshold = pop_option(stats_args, "--threshold", str(STATS_REGRESSION_THRESHOLD))
+    command_filter = pop_option(stats_args, "--command")
+    try:
+        window = int(window)
+        threshold = float(threshold)
+    except ValueError:
+        print(f"{RED}Error: --window expects a number of runs and --threshold a percentage.{NC}")
+        sys.exit(1)
+    if not os.path.isfile(BUILD_HISTORY_FILE):
+        print(f"{YELLOW}No build history yet. It is recorded by every build command.{NC}")
+        return True
+    limit = window + STATS_RECENT_RUNS
+    with contextlib.closing(open_build_history()) as connection:
+        query = "SELECT command, seconds FROM runs WHERE exit_code = 0"
+        params = []
+        if command_filter:
+            query += " AND command = ?"
+            params.append(command_filter)
+        commands = {}
+        for command, seconds in connection.execute(query + " ORDER BY id DESC", params):
+            commands.setdefault(command, [])
+            if len(commands[command]) < limit:
+                commands[command].append(seconds)
+        query = ("SELECT steps.name, steps.seconds FROM steps JOIN runs ON runs.id = steps.run_id"
+                 " WHERE steps.status = 'done'")
+        if command_filter:
+            query += " AND runs.command = ?"
+        steps = {}
+        for name, seconds in connection.execute(query + " ORDER BY steps.run_id DESC", params):
+            steps.setdefault(name, [])
+            if len(steps[name]) < limit:
+                steps[name].append(seconds)
+        total_runs, first_run = connection.execute("SELECT COUNT(*), MIN(started) FROM runs").fetchone()
+
+    print(f"{YELLOW}Build history: {total_runs} runs since "
+          f"{time.strftime('%Y-%m-%d', time.localtime(first_run or time.time()))} "
+          f"(median of the last {STATS_RECENT_RUNS} vs the {window} before them, flag above +{threshold:g}%){NC}")
+    regressions = []
+    for title, rows in (("Command", commands), ("Step", steps)):
+        if not rows:
+            continue
+        width = max(len(title), max(len(name) for name in rows))
+        print(f"\n{BLUE}{title.ljust(width)}  {'runs':>5}  {'recent':>9}  {'baseline':>9}  {'change':>8}{NC}")
+        for name in sorted(rows):
+            recent, baseline, change, regressed = rolling_comparison(rows[name], window, threshold)
+            baseline_text = f"{baseline:8.1f}s" if baseline is not None else f"{'-':>9}"
+            change_text = f"{change:+7.1f}%" if change is not None else f"{'-':>8}"
+            color = RED if regressed else (GREEN if change is not None and change < -threshold else NC)
+            print(f"{name.ljust(width)}  {len(rows[name]):>5}  {recent:8.1f}s  {baseline_text}  {color}{change_text}{NC}")
+            if regressed and title == "Step":
+                regressions.append((name, change))
+    if regressions:
+        print()
+        for name, change in regressions:
+            print(f"{CROSS} {RED}{name} is {change:.0f}% slower than its baseline{NC}")
+        return False
+    return True
+
+# ============================================================================
+# LOG ARCHIVE
+# ============================================================================
+
+# Every step's full output, gzipped per build, with an index `logs` reads.
+# Kept in STATE_DIR rather than build/ because the pipelines start with `flutter clean`.
+LOG_ARCHIVE_DIR = os.path.join(STATE_DIR, "logs")
+LOG_INDEX_FILE = os.path.join(LOG_ARCHIVE_DIR, "index.json")
+# Builds kept in the archive; older ones are deleted when a build finishes
+LOG_ARCHIVE_BUILDS = 30
+# Errors extracted and indexed per failed step
+LOG_STEP_ERRORS = 50
+# Lines of the failed step's log `logs` prints (--lines)
+LOG_TAIL_LINES = 40
+
+# Structured errors in tool output. Each pattern yields file, line and message groups.
+LOG_ERROR_PATTERNS = [
+    # flutter analyze:   error • Undefined name 'x' • lib/main.dart:12:5 • undefined_identifier
+    ("analyzer", re.compile(r"^\s*(?P<severity>error|warning|info)\s+[•-]\s+(?P<message>.+?)\s+[•-]\s+"
+                            r"(?P<file>[^\s:]+):(?P<line>\d+):\d+\s+[•-]\s+\S+\s*$")),
+    # dart analyze --format=machine:  ERROR|COMPILE_TYPE_ERROR|CODE|/abs/lib/main.dart|12|5|3|Message
+    ("analyzer", re.compile(r"^(?P<severity>ERROR|WARNING|INFO)\|\w+\|\w+\|(?P<file>[^|]+)\|(?P<line>\d+)\|\d+\|\d+\|(?P<message>.+)$")),
+    # Dart compiler (flutter build, build_runner):  lib/main.dart:12:5: Error: Message
+    ("dart", re.compile(r"^(?P<file>\S+\.dart):(?P<line>\d+):\d+: (?P<severity>Error|Warning): (?P<message>.+)$")),
+    # Kotlin:  e: file:///abs/MainActivity.kt:10:5 Unresolved reference: foo
+    ("gradle", re.compile(r"^(?P<severity>e|w): (?:file://)?(?P<file>\S+?\.kts?):(?P<line>\d+):\d+ (?P<message>.+)$")),
+    # Kotlin (older):  e: /abs/MainActivity.kt: (10, 5): Unresolved reference: foo
+    ("gradle", re.compile(r"^(?P<severity>e|w): (?P<file>\S+?\.kts?): \((?P<line>\d+), \d+\): (?P<message>.+)$")),
+    # javac:  /abs/Plugin.java:12: error: cannot find symbol
+    ("gradle", re.compile(r"^(?P<file>\S+\.java):(?P<line>\d+): (?P<severity>error|warning): (?P<message>.+)$")),
+    # AAPT:  ERROR: /abs/res/layout/main.xml:12: AAPT: error: resource not found
+    ("gradle", re.compile(r"^(?P<severity>ERROR):\s*(?P<file>\S+?):(?P<line>\d+):\s*(?:AAPT: )?(?:error: )?(?P<message>.+)$")),
+]
+# build_runner reports `[SEVERE] builder on lib/foo.dart:` with the message on the following lines
+BUILD_RUNNER_SEVERE_PATTERN = re.compile(r"^\[SEVERE\]\s+(?P<builder>.*?)(?: on (?P<file>[^\s:]+)(?::(?P<line>\d+))?)?:\s*(?P<message>.*)$")
+# Gradle's failure summary: `* What went wrong:` followed by the message up to a blank line
+GRADLE_FAILURE_HEADER = "* What went wrong:"
+
+# Characters replaced in a step name to make its log file name
+STEP_LOG_NAME_PATTERN = re.compile(r"[^\w.-]+")
+
+# Command line of this invocation; None while archiving is off (bench, logs, ...)
+log_archive_args = None
+# Index entry of the running build, created when its first step starts
+log_build = None
+log_lock = threading.Lock()
+
+def save_log_build():
+    """Stores the running build's entry in the index (called with log_lock held)"""
+    index = read_json(LOG_INDEX_FILE, {"builds": []})
+    builds = [build for build in index.get("builds", []) if build.get("id") != log_build["id"]]
+    builds.append(log_build)
+    write_json_atomic(LOG_INDEX_FILE, {"builds": builds})
+
+def open_step_log(name, description, cmd_list):
+    """
+    Starts a step's compressed log in the running build's archive directory
+    Parameters:
+        name: Step (stage) name
+        description: Step description shown in the progress display
+        cmd_list: Command the step runs
+    Returns:
+        Log handle for write_step_log()/close_step_log(), or None while archiving is off
+    """
+    global log_build
+    if log_archive_args is None:
+        return None
+    with log_lock:
+        if log_build is None:
+            build_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+            log_build = {"id": build_id, "argv": log_archive_args, "started": time.time(),
+                         "exit_code": None, "steps": []}
+        directory = os.path.join(LOG_ARCHIVE_DIR, log_build["id"])
+        sequence = len(log_build["steps"]) + 1
+        log_build["steps"].append({"name": name, "status": "running"})
+        entry_index = len(log_build["steps"]) - 1
+    try:
+        os.makedirs(directory, exist_ok=True)
+        file_name = f"{sequence:03d}-{STEP_LOG_NAME_PATTERN.sub('_', name)[:60]}.log.gz"
+        handle = gzip.open(os.path.join(directory, file_name), 'wt', encoding='utf-8', compresslevel=6)
+    except OSError as e:
+        print(f"{YELLOW}Warning: Could not archive the output of {name}: {e}{NC}")
+        return None
+    return {"name": name, "description": description, "cmd": command_line(cmd_list), "file": file_name,
+            "path": os.path.join(directory, file_name), "handle": handle, "index": entry_index,
+            "lines": 0, "lock": threading.Lock()}
+
+def write_step_log(log, text):
+    """Appends output (one line or a block) to a step log; safe to call from both reader threads"""
+    if not isinstance(text, str):
+        text = text.decode('utf-8', errors='ignore')
+    with log["lock"]:
+        if log["handle"] is None:
+            return
+        log["handle"].write(text if text.endswith("\n") else text + "\n")
+        log["lines"] += text.count("\n") + (0 if text.endswith("\n") else 1)
+
+def close_step_log(log, status, exit_code, span):
+    """
+    Finishes a step log and records it in the index. The errors of a failed
+    step are extracted now, so `logs` can show them without reading the log.
+    Returns:
+        The step's index entry, or None while archiving is off
+    """
+    if log is None:
+        return None
+    with log["lock"]:
+        handle, log["handle"] = log["handle"], None
+    if handle is None:
+        return None
+    try:
+        handle.close()
+        size = os.path.getsize(log["path"])
+    except OSError:
+        size = 0
+    entry = {
+        "name": log["name"], "description": log["description"], "cmd": log["cmd"], "file": log["file"],
+        "status": status, "exit_code": exit_code, "lines": log["lines"], "bytes": size,
+        "seconds": round((span["end"] or time.time()) - span["start"], 3),
+        "errors": extract_log_errors(log["path"], LOG_STEP_ERRORS) if status == "failed" else [],
+    }
+    with log_lock:
+        log_build["steps"][log["index"]] = entry
+        try:
+            save_log_build()
+        except OSError as e:
+            print(f"{YELLOW}Warning: Could not update the log index: {e}{NC}")
+    return entry
+
+def finish_log_archive(exit_code):
+    """Records the running build's exit code and deletes the oldest archived builds"""
+    if log_build is None:
+        return
+    with log_lock:
+        log_build["exit_code"] = exit_code
+        # Steps still marked running were interrupted
+        log_build["steps"] = [step for step in log_build["steps"] if step.get("status") != "running"]
+        try:
+            save_log_build()
+            index = read_json(LOG_INDEX_FILE, {"builds": []})
+            builds = index.get("builds", [])
+            if len(builds) > LOG_ARCHIVE_BUILDS:
+                for build in builds[:-LOG_ARCHIVE_BUILDS]:
+                    shutil.rmtree(os.path.join(LOG_ARCHIVE_DIR, build["id"]), ignore_errors=True)
+                write_json_atomic(LOG_INDEX_FILE, {"builds": builds[-LOG_ARCHIVE_BUILDS:]})
+        except OSError as e:
+            print(f"{YELLOW}Warning: Could not update the log index: {e}{NC}")
+
+def read_log_lines(path):
+    """Yields the lines of a compressed step log one at a time, tolerating a truncated file"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                yield line.rstrip("\n")
+    except (OSError, EOFError):
+        # A log cut short by an interrupted build ends without the gzip trailer
+        return
+
+def iter_log_errors(lines):
+    """
+    Yields structured errors (tool, severity, file, line, message) found in log
+    lines, keeping only the few lines of context multi-line reports need
+    """
+    pending = None
+    for text in lines:
+        stripped = text.strip()
+        if pending is not None:
+            # Message lines following a build_runner [SEVERE] or Gradle failure header
+            if stripped and not stripped.startswith(("[", "* ")):
+                pending["message"] = f"{pending['message']} {stripped.lstrip('> ')}".strip()
+                if pending["tool"] == "build_runner" or len(pending["message"]) > 300:
+                    # build_runner's first message line says it all; Gradle's is capped
+                    yield pending
+                    pending = None
+                continue
+            if not stripped and not pending["message"]:
+                # Blank line between the header and the message
+                continue
+            if pending["message"]:
+                yield pending
+            pending = None
+        if stripped == GRADLE_FAILURE_HEADER:
+            pending = {"tool": "gradle", "severity": "error", "file": None, "line": None, "message": ""}
+            continue
+        match = BUILD_RUNNER_SEVERE_PATTERN.match(stripped)
+        if match:
+            error = {"tool": "build_runner", "severity": "error", "file": match.group("file"),
+                     "line": int(match.group("line")) if match.group("line") else None,
+                     "message": match.group("message").strip()}
+            if error["message"]:
+                yield error
+            else:
+                pending = error
+            continue
+        for tool, pattern in LOG_ERROR_PATTERNS:
+            match = pattern.match(text)
+            if match:
+                severity = match.group("severity").lower()
+                yield {"tool": tool, "severity": {"e": "error", "w": "warning"}.get(severity, severity),
+                       "file": match.group("file"), "line": int(match.group("line")),
+                       "message": match.group("message").strip()}
+                break
+    if pending is not None and pending["message"]:
+        yield pending
+
+def extract_log_errors(path, limit=None):
+    """Streams a compressed step log and returns its distinct errors, at most limit of them"""
+    errors = []
+    seen = set()
+    for error in iter_log_errors(read_log_lines(path)):
+        key = (error["file"], error["line"], error["message"])
+        if key in seen:
+            continue
+        seen.add(key)
+        errors.append(error)
+        if limit is not None and len(errors) >= limit:
+            break
+    return errors
+
+def format_log_error(error):
+    """One error as `file:line: message`"""
+    color = RED if error["severity"] == "error" else YELLOW
+    location = error["file"] or error["tool"]
+    if error["line"] is not None:
+        location = f"{location}:{error['line']}"
+    return f"  {color}{location}{NC}: {error['message']}"
+
+def archived_step(name):
+    """Index entry of the running build's latest step called name, if archived"""
+    if log_build is None:
+        return None
+    with log_lock:
+        return next((step for step in reversed(log_build["steps"]) if step.get("name") == name), None)
+
+def show_step_errors(entry):
+    """Prints the errors extracted from a failed step and where its full log is"""
+    if not entry:
+        return
+    if entry["errors"]:
+        print(f"\n{RED}Errors ({entry['name']}):{NC}")
+        for error in entry["errors"]:
+            print(format_log_error(error))
+    print(f"{BLUE}Full log: {sys.argv[0]} logs {log_build['id']} --step {entry['file'][:3]} --full{NC}")
+
+def find_archived_step(builds, build_id=None, step=None):
+    """
+    Picks the build and step `logs` shows: by default the newest failed step
+    Parameters:
+        build_id: Build id (or a unique prefix), or None to search from the newest build
+        step: Step number, file name or name substring; defaults to the build's failed step
+    Returns:
+        (build, step) entries; step is None if nothing matches
+    """
+    if build_id:
+        builds = [build for build in builds if build["id"].startswith(build_id)]
+        if not builds:
+            return None, None
+    for build in reversed(builds):
+        steps = build.get("steps", [])
+        if step:
+            matches = [s for s in steps if s["file"].startswith(step.zfill(3) + "-") or step in s["name"]]
+        else:
+            matches = [s for s in steps if s["status"] == "failed"]
+        if matches:
+            return build, matches[-1]
+        if build_id:
+            return build, None
+    return None, None
+
+def show_logs(logs_args):
+    """
+    Shows archived build logs (logs [<build>] [--step <n|name>] [--list] [--full] [--lines n]).
+    Without arguments, shows the errors and last lines of the newest failed step.
+    Returns:
+        True if a log was found
+    """
+    list_builds = pop_flag(logs_args, "--list")
+    full = pop_flag(logs_args, "--full")
+    step = pop_option(logs_args, "--step")
+    tail = pop_option(logs_args, "--lines", str(LOG_TAIL_LINES))
+    if not tail.isdigit():
+        print(f"{RED}Error: --lines expects a number of lines.{NC}")
+        sys.exit(1)
+    builds = read_json(LOG_INDEX_FILE, {"builds": []}).get("builds", [])
+    if not builds:
+        print(f"{YELLOW}No archived logs yet. Every build step's output is archived in {LOG_ARCHIVE_DIR}.{NC}")
+        return False
+
+    if list_builds:
+        for build in reversed(builds):
+            failed = [s for s in build["steps"] if s["status"] == "failed"]
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(build["started"]))
+            status = CHECKMARK if build.get("exit_code") == 0 else CROSS
+            print(f"{status} {build['id']}  {started}  {' '.join(build['argv']):<24} "
+                  f"{len(build['steps'])} steps" + (f", {RED}failed: {failed[-1]['name']}{NC}" if failed else ""))
+        return True
+
+    build, entry = find_archived_step(builds, logs_args[0] if logs_args else None, step)
+    if build is None:
+        print(f"{YELLOW}No archived build matches '{logs_args[0]}'.{NC}" if logs_args
+              else f"{GREEN}No failed steps in the last {len(builds)} archived builds.{NC}")
+        return not logs_args
+    if entry is None:
+        print(f"{YELLOW}Build {build['id']} has no {'step ' + step if step else 'failed step'}. Steps:{NC}")
+        for s in build["steps"]:
+            print(f"  {s['file'][:3]}  {s['status']:<7} {s['name']}")
+        return False
+
+    path = os.path.join(LOG_ARCHIVE_DIR, build["id"], entry["file"])
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(build["started"]))
+    print(f"{YELLOW}{build['id']}  ({started}, {' '.join(build['argv'])}){NC}")
+    color = RED if entry["status"] == "failed" else GREEN
+    print(f"{color}{entry['description']} {entry['status']} (exit {entry['exit_code']}, {entry['seconds']:.1f}s): {entry['cmd']}{NC}")
+    if full:
+        for line in read_log_lines(path):
+            print(line)
+        return True
+    if entry["errors"]:
+        print(f"\n{RED}Errors:{NC}")
+        for error in entry["errors"]:
+            print(format_log_error(error))
+    if int(tail):
+        lines = deque(read_log_lines(path), maxlen=int(tail))
+        omitted = entry["lines"] - len(lines)
+        print(f"\n{BLUE}Last {len(lines)} of {entry['lines']} lines"
+              + (f" ({format_bytes(entry['bytes'])} compressed, --full for all):" if omitted > 0 else ":") + NC)
+        for line in lines:
+            print(f"  {line}")
+    print(f"\n{BLUE}{path}{NC}")
+    return True
+
+# ============================================================================
+# BENCHMARK FUNCTIONS
+# ============================================================================
+
+# Fake flutter/dart/adb used by `bench`. It looks up its latency, output volume
+# and exit code in the profile and fakes the files the pipelines check for.
+BENCH_STUB_SCRIPT = r'''
+import glob, json, os, re, shutil, sys, time
+
+command = " ".join([os.path.basename(sys.argv[0])] + sys.argv[1:])
+with open(os.environ["FLUTTER_BUILD_BENCH_PROFILE"], encoding="utf-8") as file:
+    profile = json.load(file)
+keys = [key for key in profile if command.startswith(key)]
+spec = profile[max(keys, key=len)] if keys else {}
+
+def touch(path, size=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(os.urandom(size))
+
+def run_tests(args):
+    # Speaks the --reporter json protocol; each shard takes a contiguous slice of every file's tests
+    total = int(args[args.index("--total-shards") + 1]) if "--total-shards" in args else 1
+    index = int(args[args.index("--shard-index") + 1]) if "--shard-index" in args else 0
+    clock = time.time()
+    def emit(event):
+        event["time"] = int((time.time() - clock) * 1000)
+        print(json.dumps(event), flush=True)
+    emit({"type": "start", "protocolVersion": "0.1.1", "pid": os.getpid()})
+    test_id = 0
+    failures = 0
+    paths = sorted(glob.glob("test/**/*_test.dart", recursive=True))
+    for suite_id, path in enumerate(paths):
+        with open(path, encoding="utf-8") as file:
+            names = [match[1] for match in re.findall(r"\b(?:test|testWidgets)\(\s*(['\"])(.+?)\1", file.read())]
+        emit({"type": "suite", "suite": {"id": suite_id, "platform": "vm", "path": path}})
+        for name in [f"loading {path}"] + names[index * len(names) // total:(index + 1) * len(names) // total]:
+            test_id += 1
+            emit({"type": "testStart", "test": {"id": test_id, "name": name, "suiteID": suite_id, "groupIDs": []}})
+            time.sleep(spec.get("test_latency", 0) * float(os.environ.get("FLUTTER_BUILD_BENCH_SCALE", "1")))
+            failed = any(pattern in name for pattern in spec.get("failing", []))
+            if failed:
+                failures += 1
+                emit({"type": "error", "testID": test_id, "error": "Expected: <1> Actual: <0>",
+                      "stackTrace": f"{path} 1:1  main", "isFailure": True})
+            emit({"type": "testDone", "testID": test_id, "result": "failure" if failed else "success",
+                  "skipped": False, "hidden": name.startswith("loading ")})
+    emit({"type": "allSuites", "count": len(paths)})
+    emit({"type": "done", "success": not failures})
+    return failures
+
+def run_machine():
+    # Speaks the `flutter run --machine` protocol: launches, then answers app.restart and app.stop
+    # from stdin. Handled events are appended to .bench_run_events for the bench's fake developer.
+    scale = float(os.environ.get("FLUTTER_BUILD_BENCH_SCALE", "1"))
+    app_id = "bench-app"
+    def emit(message):
+        print(json.dumps([message]), flush=True)
+    def record(name):
+        with open(".bench_run_events", "a", encoding="utf-8") as file:
+            file.write(name + "\n")
+    emit({"event": "daemon.connected", "params": {"version": "0.6.1", "pid": os.getpid()}})
+    emit({"event": "app.start", "params": {"appId": app_id, "deviceId": "emulator-5554", "directory": os.getcwd(),
+                                           "supportsRestart": True, "launchMode": "run", "mode": "debug"}})
+    emit({"event": "app.progress", "params": {"appId": app_id, "id": "1", "progressId": "launch",
+                                              "message": "Running Gradle task 'assembleDebug'..."}})
+    time.sleep(spec.get("launch_latency", 0) * scale)
+    emit({"event": "app.progress", "params": {"appId": app_id, "id": "1", "progressId": "launch", "finished": True}})
+    emit({"event": "app.started", "params": {"appId": app_id}})
+    record("app.started")
+    for line in sys.stdin:
+        try:
+            requests = json.loads(line)
+        except ValueError:
+            continue
+        for request in requests:
+            method = request.get("method")
+            if method == "app.restart":
+                full_restart = request.get("params", {}).get("fullRestart")
+                time.sleep(spec.get("restart_latency" if full_restart else "reload_latency", 0) * scale)
+                emit({"id": request.get("id"), "result": {"code": 0, "message": ""}})
+                record("app.restart")
+            elif method == "app.stop":
+                emit({"event": "app.stop", "params": {"appId": app_id}})
+                emit({"id": request.get("id"), "result": True})
+                record("app.stop")
+                return
+            else:
+                emit({"id": request.get("id"), "error": f"Unknown method {method}"})
+
+if command == "flutter --version --machine":
+    print(json.dumps({"frameworkVersion": "3.24.0", "frameworkRevision": "bench", "engineRevision": "bench",
+                      "dartSdkVersion": "3.5.0"}))
+elif command == "flutter clean":
+    shutil.rmtree(".dart_tool", ignore_errors=True)
+    shutil.rmtree("build", ignore_errors=True)
+elif command.startswith("flutter pub"):
+    directory = sys.argv[sys.argv.index("--directory") + 1] if "--directory" in sys.argv else "."
+    touch(os.path.join(directory, ".dart_tool/package_config.json"))
+elif command == "flutter gen-l10n":
+    touch("lib/l10n/app_localizations.dart")
+elif command.startswith("flutter build apk") and "--split-per-abi" in command:
+    for abi in ("arm64-v8a", "armeabi-v7a", "x86_64"):
+        touch(f"build/app/outputs/flutter-apk/app-{abi}-release.apk", 1 << 16)
+elif command.startswith("flutter build apk"):
+    touch("build/app/outputs/flutter-apk/app-release.apk", 1 << 16)
+elif command.startswith("flutter build appbundle"):
+    touch("build/app/outputs/bundle/release/app-release.aab", 1 << 16)
+elif command.startswith("flutter test"):
+    if run_tests(sys.argv[1:]):
+        spec.setdefault("exit", 1)
+elif command.startswith("flutter run") and "--machine" in sys.argv:
+    run_machine()
+elif command == "adb devices":
+    print("List of devices attached\nemulator-5554\tdevice")
+elif command.startswith("adb -s") and "getprop ro.product.cpu.abilist" in command:
+    print("arm64-v8a,armeabi-v7a,armeabi")
+elif command.startswith("adb"):
+    # Installed packages per serial live in .bench_devices.json so `dumpsys package` can report them
+    args = sys.argv[3:] if sys.argv[1:2] == ["-s"] else sys.argv[1:]
+    serial = sys.argv[2] if sys.argv[1:2] == ["-s"] else "emulator-5554"
+    devices = {}
+    if os.path.isfile(".bench_devices.json"):
+        with open(".bench_devices.json", encoding="utf-8") as file:
+            devices = json.load(file)
+    if args[:1] == ["install"]:
+        with open("pubspec.yaml", encoding="utf-8") as file:
+            version = re.search(r"^version:\s*([^+\s]+)\+?(\d*)", file.read(), re.MULTILINE)
+        devices[serial] = {"versionName": version[1] if version else "1.0.0",
+                           "versionCode": (version[2] if version else "") or "1",
+                           "lastUpdateTime": time.strftime("%Y-%m-%d %H:%M:%S")}
+        print("Performing Streamed Install\nSuccess")
+    elif args[:1] == ["uninstall"]:
+        print("Success" if devices.pop(serial, None) else "Failure [DELETE_FAILED_INTERNAL_ERROR]")
+    elif args[:3] == ["shell", "dumpsys", "package"] and serial in devices:
+        package = devices[serial]
+        print(f"Packages:\n  Package [{args[3]}] (4f2a1c9):\n    versionCode={package['versionCode']} minSdk=21 targetSdk=34\n"
+              f"    versionName={package['versionName']}\n    lastUpdateTime={package['lastUpdateTime']}")
+    with open(".bench_devices.json", "w", encoding="utf-8") as file:
+        json.dump(devices, file)
+
+line = "[stub] " + command + " " + "." * 60 + "\n"
+sys.stdout.write(line * int(spec.get("lines", 0)))
+sys.stdout.flush()
+time.sleep(spec.get("latency", 0) * float(os.environ.get("FLUTTER_BUILD_BENCH_SCALE", "1")))
+sys.exit(spec.get("exit", 0))
+'''
+
+BENCH_STUB_TOOLS = ["flutter", "dart", "adb", "xdg-open", "open"]
+
+# Latency (seconds) and output lines per command prefix; the longest matching prefix wins
+BENCH_DEFAULT_PROFILE = {
+    "flutter clean": {"latency": 0.3, "lines": 10},
+    "flutter pub": {"latency": 0.8, "lines": 80},
+    "flutter gen-l10n": {"latency": 0.4, "lines": 5},
+    "dart run build_runner": {"latency": 1.5, "lines": 300},
+    "flutter build": {"latency": 3.0, "lines": 3000},
+    "flutter analyze": {"latency": 1.2, "lines": 50},
+    # Per test latency; "failing": name substrings of tests that fail
+    "flutter test": {"latency": 0.5, "lines": 0, "test_latency": 0.2},
+    "dart format": {"latency": 0.5, "lines": 100},
+    "dart fix": {"latency": 0.8, "lines": 50},
+    # Launch, hot reload and hot restart latency of the `run` dev loop
+    "flutter run": {"latency": 0, "lines": 0, "launch_latency": 2.0, "reload_latency": 0.2, "restart_latency": 0.8},
+    "adb": {"latency": 0.4, "lines": 2},
+}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def create_bench_sandbox(profile):
+    """
+    Creates a throwaway copy of the project (pubspec + lib/) with stub tools on PATH.
+    Returns:
+        (sandbox_dir, bin_dir)
+    """
+    sandbox = tempfile.mkdtemp(prefix="flutter_build_bench_")
+    for name in ("pubspec.yaml", "pubspec.lock", "l10n.yaml", "build.yaml"):
+        if os.path.isfile(name):
+            shutil.copy2(name, sandbox)
+    for directory in ("lib", "test"):
+        if os.path.isdir(directory):
+            shutil.copytree(directory, os.path.join(sandbox, directory))
+    bin_dir = os.path.join(sandbox, ".bench_bin")
+    os.makedirs(bin_dir)
+    for tool in BENCH_STUB_TOOLS:
+        tool_path = os.path.join(bin_dir, tool)
+        with open(tool_path, 'w', encoding='utf-8') as file:
+            file.write(f"#!{sys.executable}\n{BENCH_STUB_SCRIPT}")
+        os.chmod(tool_path, 0o755)
+    with open(os.path.join(sandbox, ".bench_profile.json"), 'w', encoding='utf-8') as file:
+        json.dump(profile, file, indent=2)
+    return sandbox, bin_dir
+
+@timer_decorator
+def run_benchmark(pipelines, runs=5, scale=1.0, profile_path=None, json_path=None, cached=False):
+    """
+    Benchmarks the orchestrator against stub flutter/dart/adb executables.
+    Parameters:
+        pipelines: Pipeline names from BENCH_PIPELINES
+        runs: Runs per pipeline
+        scale: Multiplier applied to every stub latency
+        profile_path: Optional JSON file overriding BENCH_DEFAULT_PROFILE entries
+        json_path: Optional file to write the raw results to
+        cached: Keep the step cache on; by default every run executes every step
+    """
+    global use_step_cache, artifact_cache_dir
+    if platform.system() == "Windows":
+        print(f"{RED}Error: bench needs a POSIX shell to run the stub toolchain.{NC}")
+        return False
+    profile = dict(BENCH_DEFAULT_PROFILE)
+    if profile_path:
+        with open(profile_path, 'r', encoding='utf-8') as file:
+            profile.update(json.load(file))
+
+    print(f"{YELLOW}Benchmarking {', '.join(pipelines)} ({runs} runs each, latency x{scale})...{NC}\n")
+    original_dir = os.getcwd()
+    original_path = os.environ.get("PATH", "")
+    sandbox, bin_dir = create_bench_sandbox(profile)
+    os.environ["PATH"] = bin_dir + os.pathsep + original_path
+    os.environ["FLUTTER_BUILD_BENCH_PROFILE"] = os.path.join(sandbox, ".bench_profile.json")
+    os.environ["FLUTTER_BUILD_BENCH_SCALE"] = str(scale)
+    results = {}
+    original_cache = use_step_cache
+    use_step_cache = cached
+    # Stub builds must never land in (or be served from) the real artifact cache
+    original_artifact_cache = artifact_cache_dir
+    artifact_cache_dir = None
+    try:
+        os.chdir(sandbox)
+        for pipeline in pipelines:
+            walls, cpus, steps = [], [], {}
+            for run in range(runs):
+                first_span = len(trace_spans)
+                wall_start, cpu_start = time.time(), time.process_time()
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    BENCH_PIPELINES[pipeline]()
+                walls.append(time.time() - wall_start)
+                # process_time() covers every thread of this process, not the stub children
+                cpus.append(time.process_time() - cpu_start)
+                for span in trace_spans[first_span:]:
+                    if span["category"] == "step" and span["end"]:
+                        steps.setdefault(span["name"], []).append(span["end"] - span["start"])
+                print(f"  {pipeline} run {run + 1}/{runs}: {walls[-1]:.2f}s wall, {cpus[-1] * 1000:.0f} ms CPU", flush=True)
+            results[pipeline] = {"wall": walls, "cpu": cpus, "steps": steps}
+    finally:
+        os.chdir(original_dir)
+        os.environ["PATH"] = original_path
+        use_step_cache = original_cache
+        artifact_cache_dir = original_artifact_cache
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    for pipeline, result in results.items():
+        print(f"\n{BLUE}{pipeline}{NC}  wall p50 {percentile(result['wall'], 50):.2f}s  p95 {percentile(result['wall'], 95):.2f}s"
+              f"  |  orchestrator CPU p50 {percentile(result['cpu'], 50) * 1000:.0f} ms  p95 {percentile(result['cpu'], 95) * 1000:.0f} ms")
+        for name, durations in result["steps"].items():
+            print(f"  {name:<40} p50 {percentile(durations, 50):6.2f}s  p95 {percentile(durations, 95):6.2f}s  (n={len(durations)})")
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump({"runs": runs, "scale": scale, "profile": profile, "results": results}, file, indent=2)
+        print(f"\n{BLUE}Results written to {json_path}{NC}")
+    return True
+
+# File edits the `run` bench pipeline makes before stopping the app
+BENCH_DEV_LOOP_EDITS = 3
+BENCH_DEV_LOOP_TIMEOUT = 60
+
+def bench_dev_loop():
+    """
+    `run` bench pipeline: launches the stub app, then edits a Dart file and waits
+    for its hot reload BENCH_DEV_LOOP_EDITS times before pressing Ctrl+C
+    """
+    path = os.path.join(RUN_WATCH_DIR, "bench_dev_loop.dart")
+    events_path = ".bench_run_events"
+
+    def write_edit(edit):
+        os.makedirs(RUN_WATCH_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f"String benchDevLoop() {{\n  var count = 0;\n  count = count + {edit};\n  return 'edit $count';\n}}\n")
+
+    def wait_for(event, count):
+        deadline = time.time() + BENCH_DEV_LOOP_TIMEOUT
+        while not finished.is_set() and time.time() < deadline:
+            with contextlib.suppress(OSError), open(events_path, 'r', encoding='utf-8') as file:
+                if file.read().split().count(event) >= count:
+                    return
+            time.sleep(RUN_POLL_INTERVAL / 2)
+
+    def developer():
+        wait_for("app.started", 1)
+        for edit in range(1, BENCH_DEV_LOOP_EDITS + 1):
+            write_edit(edit)
+            wait_for("app.restart", edit)
+        if not finished.is_set():
+            os.kill(os.getpid(), signal.SIGINT)
+
+    write_edit(0)
+    with contextlib.suppress(OSError):
+        os.remove(events_path)
+    finished = threading.Event()
+    threading.Thread(target=developer, daemon=True).start()
+    try:
+        return run_dev_loop(["flutter", "run", "--machine"])
+    finally:
+        finished.set()
+
+# Pipelines `bench` can run, by command name
+BENCH_PIPELINES = {
+    "apk": build_apk,
+    "setup": full_setup,
+    "cleanup": cleanup_project,
+    "release-run": release_run,
+    "test": lambda: run_tests([]),
+    "run": bench_dev_loop,
+}
 
 def show_usage():
     """Show usage information"""
@@ -450,56 +4300,234 @@ def show_usage():
     print("  apk          Build release APK (Full Process)")
     print("  apk-split    Build APK with --split-per-abi")
     print("  aab          Build release AAB")
+    print(f"               Several targets share one prepare phase: {sys.argv[0]} apk aab apk-split")
     print("  lang         Generate localization files")
-    print("  db           Run build_runner")
-    print("  setup        Perform full project setup")
+    print("  db           Run build_runner (db --watch starts a background watch daemon, db --stop ends it)")
+    print("  setup        Perform full project setup (setup --changed analyzes/formats only changed Dart files)")
     print("  cache-repair Repair pub cache")
-    print("  cleanup      Clean project and get dependencies")
-    print("  release-run  Build & install release APK on connected device")
+    print("  cleanup      Clean project and get dependencies (cleanup --changed fixes/formats only changed Dart files)")
+    print("  analyze, format, fix")
+    print("               Run one code step (usage: analyze|format|fix [--changed [--base <ref>] [--staged]])")
+    print("               --changed: Dart files changed since the merge-base with --base (default: upstream/main)")
+    print("               or, with --staged, the files staged in the index")
+    print("  test         Run flutter test in parallel shards; prints the slowest tests and writes a JUnit report")
+    print(f"               (usage: {sys.argv[0]} test [--shards n] [--junit file] [--slowest n] [paths/flutter test options])")
+    print("  run          Run the app and hot reload/restart on changes in lib/ (usage: run [-d <device>] [--debounce <ms>])")
+    print("  release-run  Build & install release APK on all connected devices")
     print("  uninstall    Uninstall app from connected device")
     print("  pod          Update iOS pods")
     print("  tag          Create and push git tag from pubspec version")
-    print("  page         Create page structure (usage: {sys.argv[0]} page <page_name>)")
+    print("  page         Create page structure (usage: {sys.argv[0]} page <page_name> [<page_name> ...] | page --from <features.txt> [--templates <dir>])")
+    print("  matrix       Build artifact:flavor:platform combinations in parallel worktrees")
+    print(f"               (usage: {sys.argv[0]} matrix apk:prod:android-arm64 aab:staging ... [--from file] [--limit n] [--out dir] [--keep])")
+    print("  gradle-tune  Size Gradle parallelism, workers and JVM heap to this host (usage: gradle-tune [--prewarm] [--reset] [--dry-run])")
+    print("  stats        Rolling build/step time medians and slowdowns (usage: stats [--window n] [--threshold %] [--command c])")
+    print("  symbolize    Decode obfuscated stack traces with the stored symbols of the release that crashed")
+    print(f"               (usage: {sys.argv[0]} symbolize <trace file|->... [--out dir] [--version v] [--abi a] | --list | --import <dir>)")
+    print("  logs         Show the errors and output of the last failed step (usage: logs [<build>] [--step n] [--list] [--full] [--lines n])")
+    print("  size         Break down APK/AAB sizes and diff them against the previous build")
+    print("  features     List features and check their DI wiring (usage: features [--json] [--check])")
+    print("  bench        Benchmark pipelines against stub tools")
+    print(f"               (usage: {sys.argv[0]} bench [apk setup cleanup release-run test run] [--runs n] [--scale x] [--profile file.json] [--json out.json] [--cached])")
+    print("\nOptions:")
+    print("  --force, --no-cache  Run every step even if its inputs are unchanged (rebuild cached artifacts, reinstall APKs)")
+    print("                       (flutter clean is never cached: every build that cleans starts from a clean tree)")
+    print("  --tail               Print command output live while it runs")
+    print("  --resume             Continue a failed pipeline from the step that failed")
+    print("  --trace <file>       Write a Chrome/Perfetto trace of every step (and <file>.summary.json)")
+    print(f"  --jobs <n>           Maximum pipeline stages run in parallel (default: {max_parallel_stages})")
+    print("  --artifact-cache <d> Directory of the release artifact cache, or 'off' (default: $FLUTTER_BUILD_ARTIFACT_CACHE")
+    print("                       or ~/.cache/flutter_build/artifacts)")
+    print(f"  --artifact-cache-size <MB>  Evict least recently used artifacts above this size (default: {artifact_cache_limit() // 1048576})")
+    print(f"  --size-threshold <%> Flag artifacts that grew more than this since the previous build (default: {size_growth_threshold})")
     sys.exit(1)
 
+def pop_flag(args, *names):
+    """Removes every occurrence of the given flags from args and reports whether any was present"""
+    found = False
+    for name in names:
+        while name in args:
+            args.remove(name)
+            found = True
+    return found
+
+def pop_option(args, name, default=None):
+    """Removes `name <value>` from args and returns the value"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    if index + 1 >= len(args):
+        print(f"{RED}Error: {name} requires a value.{NC}")
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
 def main():
     """Main function"""
+    global use_step_cache, max_parallel_stages, live_tail, trace_file, resume_pipeline, size_growth_threshold
+    global artifact_cache_dir, artifact_cache_max_bytes, log_archive_args
     # Create required directories if they don't exist
     os.makedirs("build/app/outputs/flutter-apk", exist_ok=True)
     os.makedirs("build/app/outputs/bundle/release", exist_ok=True)
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    if pop_flag(args, "--force", "--no-cache"):
+        use_step_cache = False
+    live_tail = pop_flag(args, "--tail")
+    resume_pipeline = pop_flag(args, "--resume")
+    trace_file = pop_option(args, "--trace")
+    jobs = pop_option(args, "--jobs")
+    if jobs is not None:
+        if not jobs.isdigit() or int(jobs) < 1:
+            print(f"{RED}Error: --jobs expects a positive number.{NC}")
+            sys.exit(1)
+        max_parallel_stages = int(jobs)
+    threshold = pop_option(args, "--size-threshold")
+    if threshold is not None:
+        try:
+            size_growth_threshold = float(threshold)
+        except ValueError:
+            print(f"{RED}Error: --size-threshold expects a percentage.{NC}")
+            sys.exit(1)
+    artifact_cache_dir = pop_option(args, "--artifact-cache", artifact_cache_dir)
+    if artifact_cache_dir == "off":
+        artifact_cache_dir = None
+    cache_size = pop_option(args, "--artifact-cache-size")
+    if cache_size is not None:
+        if not cache_size.isdigit():
+            print(f"{RED}Error: --artifact-cache-size expects a size in MB.{NC}")
+            sys.exit(1)
+        artifact_cache_max_bytes = int(cache_size) * 1048576
+    if len(args) < 1:
         show_usage()
-    command = sys.argv[1].lower()
-    if command == "apk":
-        build_apk()
+    started = time.time()
+    exit_code = 1
+    if args[0].lower() not in BUILD_HISTORY_IGNORED_COMMANDS:
+        log_archive_args = list(args)
+    try:
+        run_command(args)
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        raise
+    finally:
+        steps = [span for span in trace_spans if span["category"] == "step"]
+        if any(span["end"] is None for span in steps):
+            # Interrupted mid-step (Ctrl+C exits with 0)
+            exit_code = 130
+        elif any(span["args"].get("status") == "failed" for span in steps):
+            exit_code = exit_code or 1
+        record_build_history(args, started, exit_code)
+        finish_log_archive(exit_code)
+        # Also export when a step failed or the run was interrupted
+        if trace_file:
+            export_trace(trace_file)
+
+def run_command(args):
+    """Dispatches the command in args (global options already removed)"""
+    command = args[0].lower()
+    targets = list(dict.fromkeys(arg.lower() for arg in args))
+    if len(targets) > 1 and all(target in BUILD_TARGETS for target in targets):
+        if build_targets(targets) is False:
+            sys.exit(1)
+    elif command == "apk":
+        if build_apk() is False:
+            sys.exit(1)
     elif command == "apk-split":
-        build_apk_split_per_abi()
+        if build_apk_split_per_abi() is False:
+            sys.exit(1)
     elif command == "aab":
-        build_aab()
+        if build_aab() is False:
+            sys.exit(1)
     elif command == "lang":
-        generate_lang()
+        if generate_lang() is False:
+            sys.exit(1)
     elif command == "db":
-        run_build_runner()
+        if run_build_runner(watch="--watch" in args, stop="--stop" in args) is False:
+            sys.exit(1)
+    elif command == "_build-runner-daemon":
+        build_runner_daemon_worker()
     elif command == "setup":
-        full_setup()
+        if full_setup(changed_files_option(args[1:])) is False:
+            sys.exit(1)
     elif command == "cache-repair":
-        repair_cache()
+        if repair_cache() is False:
+            sys.exit(1)
     elif command == "cleanup":
-        cleanup_project()
+        if cleanup_project(changed_files_option(args[1:])) is False:
+            sys.exit(1)
+    elif command in ("analyze", "format", "fix"):
+        if not check_code(command, args[1:]):
+            sys.exit(1)
     elif command == "release-run":
-        release_run()
+        if release_run() is False:
+            sys.exit(1)
     elif command == "uninstall":
-        uninstall_app()
+        if uninstall_app() is False:
+            sys.exit(1)
     elif command == "pod":
-        update_pods()
+        if update_pods() is False:
+            sys.exit(1)
     elif command == "tag":
-        create_and_push_tag()
+        if create_and_push_tag() is False:
+            sys.exit(1)
     elif command == "page":
-        if len(sys.argv) < 3:
+        if len(args) < 2:
             print(f"{RED}Error: Page name is required.{NC}")
             print(f"Usage: {sys.argv[0]} page <page_name>")
             sys.exit(1)
-        create_page(sys.argv[2])
+        create_page(args[1:])
+    elif command == "run":
+        if not run_app(args[1:]):
+            sys.exit(1)
+    elif command == "matrix":
+        if not matrix_build(args[1:]):
+            sys.exit(1)
+    elif command == "gradle-tune":
+        if not gradle_tune(args[1:]):
+            sys.exit(1)
+    elif command == "stats":
+        if not show_build_stats(args[1:]):
+            sys.exit(1)
+    elif command == "test":
+        if not run_tests(args[1:]):
+            sys.exit(1)
+    elif command == "symbolize":
+        if not symbolize(args[1:]):
+            sys.exit(1)
+    elif command == "logs":
+        if not show_logs(args[1:]):
+            sys.exit(1)
+    elif command == "size":
+        if not show_artifact_sizes():
+            sys.exit(1)
+    elif command == "features":
+        list_features(args[1:])
+    elif command == "bench":
+        runs = pop_option(args, "--runs", "5")
+        scale = pop_option(args, "--scale", "1")
+        profile_path = pop_option(args, "--profile")
+        json_path = pop_option(args, "--json")
+        cached = pop_flag(args, "--cached")
+        pipelines = [arg.lower() for arg in args[1:]] or list(BENCH_PIPELINES)
+        unknown = [p for p in pipelines if p not in BENCH_PIPELINES]
+        try:
+            scale = float(scale)
+        except ValueError:
+            scale = None
+        error = None
+        if unknown:
+            error = f"Unknown pipeline {', '.join(unknown)}."
+        elif not runs.isdigit() or int(runs) < 1:
+            error = "--runs expects a positive number."
+        elif scale is None or not 0 <= scale < float("inf"):
+            error = "--scale expects a non-negative number."
+        if error:
+            print(f"{RED}Error: {error}{NC}")
+            print(f"Available pipelines: {', '.join(BENCH_PIPELINES)}")
+            print(f"Usage: {sys.argv[0]} bench [{' '.join(BENCH_PIPELINES)}] [--runs n] [--scale x] [--profile file.json] [--json out.json] [--cached]")
+            sys.exit(1)
+        run_benchmark(pipelines, runs=int(runs), scale=scale, profile_path=profile_path, json_path=json_path, cached=cached)
     else:
         show_usage()
 
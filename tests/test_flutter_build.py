@@ -0,0 +1,239 @@
+"""Tests for flutter_build.py, run against the bench stub toolchain (python -m pytest tests)"""
+import json
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import flutter_build  # noqa: E402
+
+@pytest.fixture
+def stub_project(tmp_path, monkeypatch):
+    """
+    A small Flutter project in a bench sandbox: stub flutter/dart/adb first on
+    PATH, zero latency and no output lines. Yields the sandbox directory.
+    """
+    (tmp_path / "pubspec.yaml").write_text("name: app\nversion: 1.0.0+1\n", encoding="utf-8")
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "main.dart").write_text("void main() {}\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    profile = {key: dict(spec, lines=0) for key, spec in flutter_build.BENCH_DEFAULT_PROFILE.items()}
+    sandbox, bin_dir = flutter_build.create_bench_sandbox(profile)
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.setenv("FLUTTER_BUILD_BENCH_PROFILE", os.path.join(sandbox, ".bench_profile.json"))
+    monkeypatch.setenv("FLUTTER_BUILD_BENCH_SCALE", "0")
+    monkeypatch.setattr(flutter_build, "pub_packages", None)
+    monkeypatch.setattr(flutter_build, "use_step_cache", True)
+    monkeypatch.chdir(sandbox)
+    yield sandbox
+    shutil.rmtree(sandbox, ignore_errors=True)
+
+def set_stub_spec(command, **spec):
+    """Overrides the stub profile entry of a command prefix, e.g. to make it fail"""
+    path = os.environ["FLUTTER_BUILD_BENCH_PROFILE"]
+    with open(path, encoding="utf-8") as file:
+        profile = json.load(file)
+    profile[command] = dict(profile.get(command, {}), **spec)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(profile, file)
+
+def run_main(monkeypatch, *args):
+    """Runs flutter_build.main() with args and returns its exit code"""
+    monkeypatch.setattr(sys, "argv", ["flutter_build.py", *args])
+    try:
+        flutter_build.main()
+    except SystemExit as e:
+        return e.code or 0
+    return 0
+
+COUNTER_PAGE = """import 'package:flutter/material.dart';
+
+const double padding = 8;
+Map<String, int> limits = {'a': 1};
+
+class CounterState extends State<Counter> {
+  int count = 0;
+  int _value = 0;
+
+  void increment() {
+    count = count + 1;
+    setState(() {
+      _value = 3;
+    });
+  }
+
+  int compare(int a, int b) {
+    return a == b ? 1 : 2;
+  }
+}
+"""
+
+def signature_after_edit(tmp_path, old, new):
+    """Structure signatures of COUNTER_PAGE before and after replacing old with new"""
+    path = tmp_path / "counter.dart"
+    path.write_text(COUNTER_PAGE, encoding="utf-8")
+    before = flutter_build.structure_signature(str(path))
+    assert old in COUNTER_PAGE
+    path.write_text(COUNTER_PAGE.replace(old, new), encoding="utf-8")
+    return before, flutter_build.structure_signature(str(path))
+
+@pytest.mark.parametrize("old, new", [
+    ("count = count + 1;", "count = count + 2;"),
+    ("_value = 3;", "_value = 4;"),
+    ("return a == b ? 1 : 2;", "return a == b ? 2 : 1;"),
+])
+def test_edit_inside_method_body_is_hot_reloadable(tmp_path, old, new):
+    before, after = signature_after_edit(tmp_path, old, new)
+    assert before == after
+
+@pytest.mark.parametrize("old, new", [
+    ("const double padding = 8;", "const double padding = 16;"),
+    ("Map<String, int> limits = {'a': 1};", "Map<String, int> limits = {'a': 2};"),
+    ("class CounterState extends State<Counter>", "class CounterState extends BaseState<Counter>"),
+])
+def test_top_level_declaration_change_needs_restart(tmp_path, old, new):
+    before, after = signature_after_edit(tmp_path, old, new)
+    assert before != after
+
+def test_concurrent_record_step_keeps_every_entry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pubspec.yaml").write_text("name: app\n", encoding="utf-8")
+    start = threading.Barrier(16)
+
+    def record(index):
+        start.wait()
+        flutter_build.record_step(["flutter", "pub", "get", "--directory", f"packages/p{index}"], ["pubspec.yaml"])
+
+    threads = [threading.Thread(target=record, args=(index,)) for index in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(flutter_build.load_step_cache()) == 16
+
+def test_parallel_pub_get_caches_every_package(stub_project):
+    for package in ("a", "b", "c", "d"):
+        os.makedirs(os.path.join("packages", package))
+        with open(os.path.join("packages", package, "pubspec.yaml"), "w", encoding="utf-8") as file:
+            file.write(f"name: {package}\n")
+    stages = flutter_build.pub_stages("pub_get", ["flutter", "pub", "get"], "Getting dependencies...", cached=True)
+    assert flutter_build.run_pipeline(stages, max_workers=len(stages))
+    assert len(flutter_build.load_step_cache()) == len(stages) == 5
+
+    states = {}
+    assert flutter_build.run_pipeline(stages, max_workers=len(stages), states=states)
+    assert {state["status"] for state in states.values()} == {"cached"}
+
+def test_adb_devices_ignores_daemon_notices(stub_project):
+    adb = os.path.join(stub_project, ".bench_bin", "adb")
+    with open(adb, "w", encoding="utf-8") as file:
+        file.write("#!/bin/sh\n"
+                   "echo '* daemon not running; starting now at tcp:5037' >&2\n"
+                   "echo '* daemon started successfully' >&2\n"
+                   "echo '* daemon started successfully'\n"
+                   "printf 'List of devices attached\\nemulator-5554\\tdevice\\nR58M123\\tunauthorized\\n\\n'\n")
+    assert flutter_build.list_adb_devices() == (["emulator-5554"], [("R58M123", "unauthorized")])
+
+@pytest.mark.parametrize("command, stub_command", [
+    ("lang", "flutter gen-l10n"),
+    ("cache-repair", "flutter pub cache"),
+])
+def test_failing_command_exits_non_zero(stub_project, monkeypatch, command, stub_command):
+    assert run_main(monkeypatch, command) == 0
+    set_stub_spec(stub_command, exit=1)
+    assert run_main(monkeypatch, command, "--force") == 1
+
+def test_source_tree_hash_covers_dot_file_assets(stub_project):
+    with open(".env", "w", encoding="utf-8") as file:
+        file.write("API_URL=https://staging.example.com\n")
+    before = flutter_build.source_tree_hash()
+    with open(".env", "w", encoding="utf-8") as file:
+        file.write("API_URL=https://example.com\n")
+    assert flutter_build.source_tree_hash() != before
+
+    # Tool state doesn't invalidate the cache
+    before = flutter_build.source_tree_hash()
+    os.makedirs(".dart_tool", exist_ok=True)
+    with open(os.path.join(".dart_tool", "package_config.json"), "w", encoding="utf-8") as file:
+        file.write("{}")
+    with open(".flutter-plugins-dependencies", "w", encoding="utf-8") as file:
+        file.write("{}")
+    assert flutter_build.source_tree_hash() == before
+
+def test_malformed_artifact_cache_size_falls_back_to_default(monkeypatch, capsys):
+    monkeypatch.setenv("FLUTTER_BUILD_ARTIFACT_CACHE_MB", "4GB")
+    monkeypatch.setattr(flutter_build, "artifact_cache_max_bytes", None)
+    assert flutter_build.artifact_cache_limit() == flutter_build.ARTIFACT_CACHE_DEFAULT_MB * 1048576
+    assert "FLUTTER_BUILD_ARTIFACT_CACHE_MB='4GB'" in capsys.readouterr().out
+
+def test_clean_is_never_cached(stub_project):
+    for _ in range(2):
+        states = {}
+        assert flutter_build.run_pipeline(flutter_build.prepare_stages(), states=states)
+        assert states["clean"]["status"] == "done"
+        # The clean wiped what pub get produced, so it can't be served from the cache either
+        assert states["pub_get"]["status"] == "done"
+
+def test_step_cache_skips_unchanged_inputs(stub_project):
+    os.makedirs(os.path.join("lib", "l10n"))
+    with open(os.path.join("lib", "l10n", "app_en.arb"), "w", encoding="utf-8") as file:
+        file.write('{"hello": "Hello"}')
+    stages = [flutter_build.stage("gen_l10n", ["flutter", "gen-l10n"], "Generating localizations...",
+                                  inputs=flutter_build.gen_l10n_inputs(), outputs=flutter_build.gen_l10n_outputs())]
+    statuses = []
+    for edit in (None, None, '{"hello": "Hi"}'):
+        if edit:
+            with open(os.path.join("lib", "l10n", "app_en.arb"), "w", encoding="utf-8") as file:
+                file.write(edit)
+        states = {}
+        assert flutter_build.run_pipeline(stages, states=states)
+        statuses.append(states["gen_l10n"]["status"])
+    assert statuses == ["done", "cached", "done"]
+
+def test_resume_restarts_from_the_failed_step(stub_project, monkeypatch):
+    def stages():
+        return flutter_build.prepare_stages() + [
+            flutter_build.stage("build_apk", flutter_build.BUILD_TARGETS["apk"]["cmd"], "Building APK...", deps=["build_runner"]),
+        ]
+
+    set_stub_spec("flutter build", exit=1)
+    states = {}
+    assert not flutter_build.run_pipeline(stages(), states=states, checkpoint_name="apk")
+    assert states["build_apk"]["status"] == "failed"
+
+    set_stub_spec("flutter build", exit=0)
+    monkeypatch.setattr(flutter_build, "resume_pipeline", True)
+    states = {}
+    assert flutter_build.run_pipeline(stages(), states=states, checkpoint_name="apk")
+    assert {name: state["status"] for name, state in states.items()} == {
+        "clean": "resumed", "pub_get": "resumed", "build_runner": "resumed", "build_apk": "done",
+    }
+
+def test_artifact_cache_restores_after_the_batch_clean(stub_project, monkeypatch, tmp_path):
+    monkeypatch.setattr(flutter_build, "artifact_cache_dir", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(flutter_build, "toolchain_version_info", None)
+    apk = os.path.join(flutter_build.APK_OUTPUT_DIR, "app-release.apk")
+
+    assert flutter_build.build_targets(["apk"]) is not False
+    with open(apk, "rb") as file:
+        built = file.read()
+    # The stub writes random bytes, so identical content means the APK came from the cache
+    assert flutter_build.build_targets(["apk", "aab"]) is not False
+    with open(apk, "rb") as file:
+        assert file.read() == built
+    assert os.path.isfile("build/app/outputs/bundle/release/app-release.aab")
+
+    with open(os.path.join("lib", "main.dart"), "a", encoding="utf-8") as file:
+        file.write("// changed\n")
+    assert flutter_build.build_targets(["apk"]) is not False
+    with open(apk, "rb") as file:
+        assert file.read() != built
+
+def test_dev_loop_hot_reloads_method_body_edits(stub_project, capsys):
+    assert flutter_build.bench_dev_loop()
+    output = capsys.readouterr().out
+    assert f"{flutter_build.BENCH_DEV_LOOP_EDITS} hot reload(s)" in output
+    assert "hot restart(s)" not in output